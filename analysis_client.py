@@ -0,0 +1,360 @@
+import re
+import json
+import time
+import traceback
+from contextlib import nullcontext
+
+from llm_cache import prompt_fingerprint
+from rate_limiter import estimate_tokens
+
+
+# Client d'analyse de CV réutilisable.
+# - Un seul GenerativeModel par processus (au lieu d'un modèle + une session de chat par CV).
+# - Un seul appel generate_content par CV : le gabarit statique est passé une fois
+#   en system_instruction, la structure du JSON est imposée par response_schema.
+# - Cache LLM et limiteur Gemini optionnels.
+# - Mode lot (optionnel) : plusieurs CV courts dans une seule requête, identifiés par un id,
+#   la réponse (tableau JSON) étant redécoupée par CV ; tout CV manquant ou mal formé
+#   dans la réponse est ré-analysé seul.
+
+# À incrémenter à chaque modification du prompt ou du schéma (invalide le cache LLM)
+PROMPT_VERSION = "v2"
+
+# Schéma de la sortie structurée (format OpenAPI accepté par google-generativeai)
+_STRING = {"type": "STRING"}
+_NULLABLE_STRING = {"type": "STRING", "nullable": True}
+_STRING_LIST = {"type": "ARRAY", "items": _STRING}
+
+CV_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "candidat": {
+            "type": "OBJECT",
+            "properties": {
+                "nom_prenom": _STRING,
+                "mail": _STRING,
+                "num_tel": _STRING,
+                "profil": _STRING,
+            },
+            "required": ["nom_prenom", "mail", "num_tel", "profil"],
+        },
+        "cv": {
+            "type": "OBJECT",
+            "properties": {
+                "date_insertion": _STRING,
+                "cv_text": _STRING,
+                "cv_text_nonpretraite": _STRING,
+                "competences": _STRING_LIST,
+                "experience": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "poste": _STRING,
+                            "entreprise": _STRING,
+                            "date_debut": _STRING,
+                            "date_fin": _STRING,
+                            "missions": _STRING_LIST,
+                        },
+                    },
+                },
+                "resume_cv": _STRING,
+                "commitment": _NULLABLE_STRING,
+                "disponibilite": _NULLABLE_STRING,
+                "exp_salaire": {"type": "NUMBER"},
+                "domaine_etude": _STRING,
+                "langues": _STRING_LIST,
+                "education": _STRING_LIST,
+            },
+            "required": [
+                "date_insertion", "cv_text", "competences", "experience", "resume_cv",
+                "exp_salaire", "domaine_etude", "langues", "education",
+            ],
+        },
+    },
+    "required": ["candidat", "cv"],
+}
+
+# Gabarit statique, construit une seule fois à l'import
+SYSTEM_INSTRUCTION = """Tu reçois le texte d'un CV. Extrais et structure ses informations dans le JSON défini par le schéma de réponse.
+
+Notes :
+- "date_insertion" correspond à la date du jour au format YYYY-MM-DD.
+- "commitment" et "disponibilite" sont "null" par défaut si non spécifié.
+- "exp_salaire" vaut un nombre, par exemple 150000.
+- Tu dois essayer de deviner, extraire ou adapter au mieux.
+- S'il n'y a pas d'information, mets des chaînes vides ou "null".
+- Pas de commentaire, uniquement le JSON demandé.
+"""
+
+SYSTEM_INSTRUCTION_TOKENS = estimate_tokens(SYSTEM_INSTRUCTION)
+
+# Mode lot : un élément par CV, repéré par l'id donné dans le prompt. Le texte du CV n'est pas
+# recopié dans la réponse (jetons de sortie, et risque de troncature sur un lot) : analyze_batch
+# le rattache à chaque résultat, qui a ainsi la même forme qu'une analyse individuelle.
+_CV_TEXT_FIELDS = ("cv_text", "cv_text_nonpretraite")
+_BATCH_CV_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        field: schema for field, schema in CV_RESPONSE_SCHEMA["properties"]["cv"]["properties"].items()
+        if field not in _CV_TEXT_FIELDS
+    },
+    "required": [
+        field for field in CV_RESPONSE_SCHEMA["properties"]["cv"]["required"] if field not in _CV_TEXT_FIELDS
+    ],
+}
+
+CV_BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": _STRING,
+            "candidat": CV_RESPONSE_SCHEMA["properties"]["candidat"],
+            "cv": _BATCH_CV_SCHEMA,
+        },
+        "required": ["id", "candidat", "cv"],
+    },
+}
+
+BATCH_SYSTEM_INSTRUCTION = """Tu reçois plusieurs CV, chacun précédé d'une ligne "=== CV id=<id> ===".
+Pour chaque CV, extrais et structure ses informations dans un élément du tableau JSON défini par le schéma de réponse,
+en recopiant exactement son id dans le champ "id". Ne mélange jamais les informations de deux CV.
+Ne recopie pas le texte des CV dans la réponse.
+
+Notes :
+- "date_insertion" correspond à la date du jour au format YYYY-MM-DD.
+- "commitment" et "disponibilite" sont "null" par défaut si non spécifié.
+- "exp_salaire" vaut un nombre, par exemple 150000.
+- Tu dois essayer de deviner, extraire ou adapter au mieux.
+- S'il n'y a pas d'information, mets des chaînes vides ou "null".
+- Pas de commentaire, uniquement le JSON demandé.
+"""
+
+BATCH_SYSTEM_INSTRUCTION_TOKENS = estimate_tokens(BATCH_SYSTEM_INSTRUCTION)
+
+DEFAULT_BATCH_TOKEN_BUDGET = 30_000  # tokens d'entrée par requête en mode lot
+DEFAULT_BATCH_MAX_ITEMS = 10
+
+
+def pack_batches(items, token_budget=DEFAULT_BATCH_TOKEN_BUDGET, max_items=DEFAULT_BATCH_MAX_ITEMS):
+    """
+    Regroupe des (cv_id, cv_text) en lots dont l'estimation de tokens d'entrée
+    (gabarit compris) respecte token_budget, avec au plus max_items CV par lot.
+    Un CV qui dépasse seul le budget forme son propre lot.
+    """
+    batches = []
+    current = []
+    current_tokens = BATCH_SYSTEM_INSTRUCTION_TOKENS
+    for cv_id, cv_text in items:
+        tokens = estimate_tokens(cv_text) + 10  # + ligne de séparation
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_tokens = BATCH_SYSTEM_INSTRUCTION_TOKENS
+        current.append((cv_id, cv_text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_valid_analysis(result):
+    return (
+        isinstance(result, dict)
+        and isinstance(result.get("candidat"), dict)
+        and isinstance(result.get("cv"), dict)
+    )
+
+
+def parse_response(response_text):
+    """
+    Nettoie la réponse brute (balises ```...```) et tente de la parser en JSON.
+    Renvoie (texte nettoyé, objet parsé ou None).
+    """
+    response_text = response_text.strip()
+    response_text = re.sub(r"```(?:json)?(.*?)```", r"\1", response_text, flags=re.DOTALL)
+    try:
+        return response_text, json.loads(response_text)
+    except json.JSONDecodeError:
+        return response_text, None
+
+
+class AnalysisClient:
+    def __init__(self, model_name, generation_config, limiter=None, cache=None,
+                 replay=False, refresh=False, retries=3, model=None, batch_model=None):
+        """
+        model / batch_model : objets exposant generate_content(), utiles pour substituer
+        l'API (benchmarks) ; par défaut des genai.GenerativeModel créés une seule fois
+        (le modèle du mode lot n'est créé qu'à sa première utilisation).
+        """
+        self.model_name = model_name
+        self.generation_config = dict(
+            generation_config,
+            response_mime_type="application/json",
+            response_schema=CV_RESPONSE_SCHEMA,
+        )
+        self.limiter = limiter
+        self.cache = cache
+        self.replay = replay
+        self.refresh = refresh
+        self.retries = retries
+
+        if model is None:
+            import google.generativeai as genai
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=self.generation_config,
+                system_instruction=SYSTEM_INSTRUCTION,
+            )
+        self._model = model
+        self._batch_model = batch_model
+        self.batch_generation_config = dict(
+            generation_config,
+            response_mime_type="application/json",
+            response_schema=CV_BATCH_RESPONSE_SCHEMA,
+        )
+
+    def _cache_key(self, cv_text):
+        return prompt_fingerprint(self.model_name, self.generation_config, PROMPT_VERSION, cv_text)
+
+    def _slot(self, tokens):
+        if self.limiter is None:
+            return nullcontext()
+        return self.limiter.slot(tokens=tokens)
+
+    def _get_batch_model(self):
+        if self._batch_model is None:
+            import google.generativeai as genai
+            self._batch_model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.batch_generation_config,
+                system_instruction=BATCH_SYSTEM_INSTRUCTION,
+            )
+        return self._batch_model
+
+    def _cached(self, cache_key):
+        """
+        Réponse en cache utilisable pour cette clé, ou None.
+        """
+        if self.cache is None or self.refresh:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached and (cached["parsed"] is not None or self.replay):
+            return cached["parsed"] if cached["parsed"] is not None else cached["raw"]
+        return None
+
+    def analyze(self, cv_text):
+        """
+        Renvoie le JSON structuré du CV (dict), la réponse brute si elle
+        n'est pas un JSON valide, ou None en cas d'échec.
+        """
+        cache_key = self._cache_key(cv_text)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        if self.replay:
+            print("Mode replay : aucune réponse en cache pour ce CV, pas d'appel API.")
+            return None
+
+        for attempt in range(self.retries):
+            try:
+                with self._slot(estimate_tokens(cv_text) + SYSTEM_INSTRUCTION_TOKENS):
+                    response = self._model.generate_content(cv_text)
+
+                response_text, parsed = parse_response(response.text)
+                if self.cache is not None:
+                    self.cache.put(cache_key, self.model_name, PROMPT_VERSION, response_text, parsed)
+
+                # En cas d'erreur de parsing, on renvoie la chaîne brute pour debug
+                return parsed if parsed is not None else response_text
+
+            except Exception as e:
+                if "429" in str(e):
+                    if self.limiter is not None:
+                        # Le limiteur a déjà réduit la concurrence et suspendu les appels
+                        print(f"Erreur 429 (rate limit) - tentative {attempt+1}/{self.retries}, "
+                              f"concurrence Gemini réduite à {self.limiter.current_limit}.")
+                    else:
+                        delay = 10 * 2 ** attempt
+                        print(f"Erreur 429 (rate limit) - tentative {attempt+1}/{self.retries}, "
+                              f"nouvel essai dans {delay}s.")
+                        time.sleep(delay)
+                else:
+                    print(f"Erreur lors de l'analyse du CV : {str(e)}")
+                    print(traceback.format_exc())
+                    break
+
+        return None
+
+    def analyze_batch(self, items):
+        """
+        Analyse plusieurs CV (liste de (cv_id, cv_text)) en une seule requête.
+        Renvoie un dict {cv_id: résultat} ; les CV absents ou mal formés dans
+        la réponse du lot sont ré-analysés individuellement via analyze().
+        Les résultats sont mis en cache sous la même clé qu'une analyse individuelle.
+        """
+        results = {}
+        pending = []
+        for cv_id, cv_text in items:
+            cached = self._cached(self._cache_key(cv_text))
+            if cached is not None:
+                results[cv_id] = cached
+            else:
+                pending.append((cv_id, cv_text))
+
+        if not pending:
+            return results
+        if len(pending) == 1 or self.replay:
+            for cv_id, cv_text in pending:
+                results[cv_id] = self.analyze(cv_text)
+            return results
+
+        # Ids courts et stables dans le prompt, reconvertis ensuite en cv_id
+        by_prompt_id = {str(i): (cv_id, cv_text) for i, (cv_id, cv_text) in enumerate(pending, start=1)}
+        prompt = "\n\n".join(
+            f"=== CV id={prompt_id} ===\n{cv_text}" for prompt_id, (_, cv_text) in by_prompt_id.items()
+        )
+
+        parsed = None
+        tokens = estimate_tokens(prompt) + BATCH_SYSTEM_INSTRUCTION_TOKENS
+        for attempt in range(self.retries):
+            try:
+                with self._slot(tokens):
+                    response = self._get_batch_model().generate_content(prompt)
+                _, parsed = parse_response(response.text)
+                break
+            except Exception as e:
+                if "429" in str(e):
+                    print(f"Erreur 429 (rate limit) sur un lot de {len(pending)} CV - "
+                          f"tentative {attempt+1}/{self.retries}.")
+                    if self.limiter is None:
+                        time.sleep(10 * 2 ** attempt)
+                else:
+                    print(f"Erreur lors de l'analyse d'un lot de {len(pending)} CV : {str(e)}")
+                    break
+
+        if isinstance(parsed, list):
+            for element in parsed:
+                if not isinstance(element, dict):
+                    continue
+                prompt_id = str(element.pop("id", ""))
+                if prompt_id not in by_prompt_id or not _is_valid_analysis(element):
+                    continue
+                cv_id, cv_text = by_prompt_id.pop(prompt_id)
+                element["cv"]["cv_text"] = cv_text
+                if self.cache is not None:
+                    self.cache.put(
+                        self._cache_key(cv_text), self.model_name, PROMPT_VERSION,
+                        json.dumps(element, ensure_ascii=False), element,
+                    )
+                results[cv_id] = element
+
+        # Reprise individuelle des CV manquants ou mal formés
+        if by_prompt_id:
+            print(f"{len(by_prompt_id)} CV sur {len(pending)} sans résultat valide dans le lot, "
+                  f"analyse individuelle.")
+        for cv_id, cv_text in by_prompt_id.values():
+            results[cv_id] = self.analyze(cv_text)
+
+        return results
@@ -0,0 +1,331 @@
+import os
+import re
+import argparse
+from threading import Lock
+
+import numpy as np
+
+from preprocessing import preprocess_text
+from vector_store import VectorStore, default_store_dir
+from model_registry import default_registry
+
+
+# Recherche approchée des plus proches voisins (similarité cosinus) sur les vecteurs de CV.
+# Index IVF en NumPy, un par espace (modèle d'embedding) :
+#   - les vecteurs sont normalisés puis répartis en nlist listes par k-means sphérique ;
+#   - une requête n'est comparée qu'aux vecteurs des nprobe listes aux centroïdes les plus proches.
+# Tant que l'index compte moins de AUTO_TRAIN_SIZE vecteurs, il reste « plat » (une seule liste,
+# recherche exacte) : à cette taille un produit matriciel complet prend moins d'une milliseconde.
+# Les ajouts après l'entraînement vont dans la liste du centroïde le plus proche ; si la collection
+# a beaucoup grossi depuis, train() recalcule les centroïdes et redistribue tout.
+
+AUTO_TRAIN_SIZE = 20_000
+DEFAULT_NPROBE = 16
+KMEANS_ITERATIONS = 10
+# Points tirés par liste pour l'entraînement du k-means
+TRAIN_POINTS_PER_LIST = 64
+# Lignes traitées par produit matriciel (mémoire bornée)
+ASSIGN_CHUNK = 65_536
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def default_nlist(count):
+    """
+    Nombre de listes pour count vecteurs : ~racine carrée, entre 1 et 4096.
+    """
+    return int(np.clip(np.sqrt(count), 1, 4096))
+
+
+def _nearest_centroid(vectors, centroids):
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        assignments[start:start + ASSIGN_CHUNK] = np.argmax(
+            vectors[start:start + ASSIGN_CHUNK] @ centroids.T, axis=1
+        )
+    return assignments
+
+
+def _kmeans(vectors, nlist, iterations, rng):
+    """
+    k-means sphérique : centroïdes normalisés, affectation par produit scalaire maximal.
+    """
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest_centroid(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        lists, starts = np.unique(assignments[order], return_index=True)
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        # Une liste vide repart d'un point tiré au hasard
+        empty = np.setdiff1d(np.arange(nlist), lists)
+        centroids[lists] = _normalize(sums)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    def __init__(self, dim, nlist=None, nprobe=DEFAULT_NPROBE, auto_train_size=AUTO_TRAIN_SIZE):
+        """
+        nlist : nombre de listes (None = default_nlist au moment de l'entraînement).
+        nprobe : listes parcourues par requête (compromis rappel / latence).
+        auto_train_size : taille à partir de laquelle add() entraîne l'index (0 = jamais).
+        """
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.auto_train_size = auto_train_size
+        self.centroids = None
+        # Génération du VectorStore à laquelle l'index est à jour (voir CVSearch._sync)
+        self.generation = 0
+        self._vectors = [np.empty((0, dim), dtype=np.float32)]
+        self._ids = [np.empty(0, dtype=np.int64)]
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._ids)
+
+    def _append(self, vectors, ids, assignments):
+        order = np.argsort(assignments, kind="stable")
+        lists, starts = np.unique(assignments[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for list_number, start, end in zip(lists, starts, ends):
+            selected = order[start:end]
+            self._vectors[list_number] = np.concatenate([self._vectors[list_number], vectors[selected]])
+            self._ids[list_number] = np.concatenate([self._ids[list_number], ids[selected]])
+
+    def add(self, vectors, ids):
+        """
+        Ajoute des vecteurs (n x dim) et leurs identifiants entiers (lignes du VectorStore).
+        """
+        vectors = _normalize(np.asarray(vectors).reshape(-1, self.dim))
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if len(vectors) != len(ids):
+            raise ValueError(f"{len(vectors)} vecteurs pour {len(ids)} identifiants")
+        if not len(ids):
+            return
+        if self.trained:
+            self._append(vectors, ids, _nearest_centroid(vectors, self.centroids))
+            return
+        self._append(vectors, ids, np.zeros(len(ids), dtype=np.int64))
+        if self.auto_train_size and len(self) >= self.auto_train_size:
+            self.train()
+
+    def remove(self, ids):
+        """
+        Retire les vecteurs de ces identifiants (avant de les ajouter à nouveau, remplacés).
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        for list_number, list_ids in enumerate(self._ids):
+            keep = ~np.isin(list_ids, ids)
+            if not keep.all():
+                self._vectors[list_number] = self._vectors[list_number][keep]
+                self._ids[list_number] = list_ids[keep]
+
+    def train(self, sample=None, iterations=KMEANS_ITERATIONS, seed=0):
+        """
+        Calcule les centroïdes, puis redistribue les vecteurs déjà ajoutés.
+        sample : vecteurs d'entraînement (par défaut, un tirage parmi les vecteurs de l'index) ;
+        entraîner sur un échantillon avant les add() évite de tout redistribuer ensuite.
+        """
+        vectors = np.concatenate(self._vectors)
+        ids = np.concatenate(self._ids)
+        self._vectors = self._ids = None
+        rng = np.random.default_rng(seed)
+        if sample is None:
+            if not len(ids):
+                raise ValueError("index vide : rien à entraîner")
+            nlist = min(self.nlist or default_nlist(len(ids)), len(ids))
+            sample_size = min(len(ids), nlist * TRAIN_POINTS_PER_LIST)
+            sample = vectors[rng.choice(len(ids), sample_size, replace=False)]
+        else:
+            sample = _normalize(np.asarray(sample).reshape(-1, self.dim))
+            nlist = min(self.nlist or default_nlist(max(len(ids), len(sample))), len(sample))
+        centroids = _kmeans(sample, nlist, iterations, rng)
+
+        self.centroids = centroids
+        self._vectors = [np.empty((0, self.dim), dtype=np.float32) for _ in range(nlist)]
+        self._ids = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._append(vectors, ids, _nearest_centroid(vectors, centroids))
+
+    def search_vectors(self, queries, k=10, nprobe=None):
+        """
+        k plus proches voisins de chaque requête (n x dim) : (scores, ids), tableaux n x k
+        triés par similarité décroissante ; complétés par -inf / -1 s'il y a moins de k résultats.
+        """
+        queries = _normalize(np.asarray(queries).reshape(-1, self.dim))
+        nprobe = min(nprobe or self.nprobe, len(self._ids))
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        if self.trained:
+            centroid_scores = queries @ self.centroids.T
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.zeros((len(queries), 1), dtype=np.int64)
+
+        for i, query in enumerate(queries):
+            candidate_scores = np.concatenate([self._vectors[p] @ query for p in probes[i]])
+            candidate_ids = np.concatenate([self._ids[p] for p in probes[i]])
+            count = min(k, len(candidate_ids))
+            if not count:
+                continue
+            top = np.argpartition(-candidate_scores, count - 1)[:count]
+            top = top[np.argsort(-candidate_scores[top])]
+            scores[i, :count] = candidate_scores[top]
+            ids[i, :count] = candidate_ids[top]
+        return scores, ids
+
+    def save(self, path):
+        """
+        Enregistre l'index (.npz) ; l'écriture passe par un fichier temporaire.
+        """
+        offsets = np.cumsum([0] + [len(ids) for ids in self._ids])
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            np.savez(
+                f,
+                dim=self.dim,
+                nprobe=self.nprobe,
+                auto_train_size=self.auto_train_size,
+                generation=self.generation,
+                centroids=self.centroids if self.trained else np.empty((0, self.dim), dtype=np.float32),
+                vectors=np.concatenate(self._vectors),
+                ids=np.concatenate(self._ids),
+                offsets=offsets,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(int(data["dim"]), nprobe=int(data["nprobe"]), auto_train_size=int(data["auto_train_size"]))
+            offsets = data["offsets"]
+            vectors = data["vectors"]
+            ids = data["ids"]
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+            # Index enregistré avant le suivi des générations : seules les nouvelles lignes sont ajoutées
+            index.generation = int(data["generation"]) if "generation" in data else 0
+        index._vectors = [vectors[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        index._ids = [ids[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        return index
+
+
+class CVSearch:
+    """
+    Recherche de CV par texte libre (offre d'emploi, compétences...) sur un VectorStore :
+    un IVFIndex par modèle, enregistré dans <dossier des vecteurs>/ann/.
+    """
+    def __init__(self, vector_store, index_dir=None, models=None, nprobe=DEFAULT_NPROBE):
+        """
+        models : {nom: SentenceTransformer} déjà chargés ; les autres viennent du registre partagé.
+        """
+        self.vector_store = vector_store
+        self.index_dir = index_dir or os.path.join(vector_store.store_dir, "ann")
+        self.models = dict(models or {})
+        self.nprobe = nprobe
+        self._indexes = {}
+        self._lock = Lock()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _index_path(self, model):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        return os.path.join(self.index_dir, f"{safe_name}.ivf.npz")
+
+    def index(self, model):
+        """
+        Index d'un modèle : chargé depuis le disque, complété avec les lignes ajoutées depuis.
+        """
+        if model not in self.vector_store.spaces:
+            raise ValueError(f"modèle inconnu : {model} (espaces : {', '.join(self.vector_store.spaces)})")
+        with self._lock:
+            index = self._indexes.get(model)
+            if index is None:
+                path = self._index_path(model)
+                matrix = self.vector_store.matrix(model)
+                if os.path.exists(path):
+                    index = IVFIndex.load(path)
+                else:
+                    index = IVFIndex(matrix.shape[1], nprobe=self.nprobe)
+                self._indexes[model] = index
+            self._sync(model, index)
+            return index
+
+    def _sync(self, model, index):
+        # L'index contient les len(index) premières lignes du VectorStore, à jour à index.generation ;
+        # les lignes remplacées depuis (CV modifié puis retraité) sont retirées puis réaffectées.
+        generation = self.vector_store.generation
+        if generation == index.generation and len(index) >= len(self.vector_store):
+            return
+        matrix = self.vector_store.matrix(model)
+        indexed = len(index)
+        changed = self.vector_store.rows_changed_since(index.generation)
+        replaced = changed[changed < indexed]
+        if len(replaced):
+            index.remove(replaced)
+        rows = np.union1d(replaced, np.arange(indexed, len(matrix)))
+        for start in range(0, len(rows), ASSIGN_CHUNK):
+            chunk = rows[start:start + ASSIGN_CHUNK]
+            index.add(matrix[chunk], chunk)
+        index.generation = generation
+        index.save(self._index_path(model))
+
+    def rebuild(self, model):
+        """
+        Reconstruit l'index d'un modèle (vecteurs remplacés, centroïdes à recalculer).
+        """
+        with self._lock:
+            path = self._index_path(model)
+            if os.path.exists(path):
+                os.remove(path)
+            self._indexes.pop(model, None)
+        return self.index(model)
+
+    def _model(self, model):
+        if model in self.models:
+            return self.models[model]
+        return default_registry.get(model)
+
+    def encode(self, query_text, model):
+        """
+        Vecteur de la requête, prétraitée comme le texte des CV (test9.preprocess_text).
+        """
+        return self._model(model).encode(preprocess_text(query_text, remove_stopwords=False))
+
+    def search(self, query_text, model, k=10, nprobe=None):
+        """
+        Les k CV les plus proches de query_text pour un modèle : liste de (file_name, score).
+        """
+        index = self.index(model)
+        scores, rows = index.search_vectors(self.encode(query_text, model), k=k, nprobe=nprobe)
+        return [
+            (self.vector_store.record_id(row), float(score))
+            for score, row in zip(scores[0], rows[0]) if row >= 0
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recherche de CV proches d'un texte (index IVF local).")
+    parser.add_argument("results_file", help="Fichier de résultats (ses vecteurs sont dans <fichier>.vectors/)")
+    parser.add_argument("query", help="Texte de la requête (offre, compétences...)")
+    parser.add_argument("--model", help="Modèle / espace (par défaut : le premier)")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    args = parser.parse_args()
+
+    vector_store = VectorStore(default_store_dir(args.results_file))
+    search = CVSearch(vector_store, nprobe=args.nprobe)
+    for file_name, score in search.search(args.query, args.model or vector_store.spaces[0], k=args.k):
+        print(f"{score:.3f}  {file_name}")
+    vector_store.close()
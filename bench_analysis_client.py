@@ -0,0 +1,160 @@
+import time
+import json
+import random
+import argparse
+
+from analysis_client import AnalysisClient, SYSTEM_INSTRUCTION
+from rate_limiter import estimate_tokens
+
+
+# Benchmark : flux historique (GenerativeModel + session de chat à deux tours par CV)
+# contre AnalysisClient (modèle unique, un generate_content par CV).
+# L'API est remplacée par une doublure locale dont la latence dépend d'un coût
+# fixe par requête et du nombre de tokens d'entrée ; aucun appel réseau.
+
+# Gabarit du flux historique (test8.py / test9.py avant AnalysisClient)
+LEGACY_INTRO = "Voici un CV. Veuillez extraire et structurer les informations demandées :"
+LEGACY_TEMPLATE = """Le JSON que je souhaite en sortie doit avoir la forme :
+{
+  "candidat": {
+    "nom_prenom": "...",
+    "mail": "...",
+    "num_tel": "...",
+    "profil": "..."
+  },
+  "cv": {
+    "date_insertion": "YYYY-MM-DD",
+    "cv_text": "...",
+    "cv_text_nonpretraite": "...",
+    "competences": [...],
+    "experience": [
+      {
+        "poste": "...",
+        "entreprise": "...",
+        "date_debut": "...",
+        "date_fin": "...",
+        "missions": [...]
+      }
+    ],
+    "resume_cv": "...",
+    "commitment": "null",
+    "disponibilite": "null",
+    "exp_salaire": 0,
+    "domaine_etude": "...",
+    "langues": [...],
+    "education": [...]
+  }
+}
+
+Notes :
+- "date_insertion" correspond à la date du jour au format YYYY-MM-DD.
+- "commitment" et "disponibilite" sont "null" par défaut si non spécifié.
+- "exp_salaire" vaut un nombre, par exemple 150000.
+- Tu dois essayer de deviner, extraire ou adapter au mieux.
+- S'il n'y a pas d'information, mets des chaînes vides ou "null".
+- Pas de commentaire dans le JSON, juste les champs demandés.
+"""
+LEGACY_FOLLOW_UP = ("Génère uniquement ce JSON, sans balises de code. "
+                    "Pas besoin de phrases supplémentaires ni d'explications.")
+
+FAKE_RESPONSE = json.dumps({"candidat": {"nom_prenom": "X", "mail": "x@example.com",
+                                         "num_tel": "", "profil": ""},
+                            "cv": {"competences": [], "experience": []}})
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeAPI:
+    """
+    Doublure locale de l'API : compte les tokens d'entrée et simule la latence.
+    """
+    def __init__(self, request_overhead, seconds_per_1k_tokens, model_init_cost):
+        self.request_overhead = request_overhead
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.model_init_cost = model_init_cost
+        self.input_tokens = 0
+        self.requests = 0
+
+    def call(self, parts):
+        tokens = sum(estimate_tokens(part) for part in parts)
+        self.input_tokens += tokens
+        self.requests += 1
+        time.sleep(self.request_overhead + tokens / 1000 * self.seconds_per_1k_tokens)
+        return _FakeResponse(FAKE_RESPONSE)
+
+    def GenerativeModel(self, system_instruction=None):
+        time.sleep(self.model_init_cost)
+        return _FakeModel(self, system_instruction)
+
+
+class _FakeModel:
+    def __init__(self, api, system_instruction):
+        self.api = api
+        self.system_instruction = system_instruction
+
+    def generate_content(self, contents):
+        parts = [contents] if isinstance(contents, str) else list(contents)
+        if self.system_instruction:
+            parts.append(self.system_instruction)
+        return self.api.call(parts)
+
+    def start_chat(self, history):
+        return _FakeChat(self, history)
+
+
+class _FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.parts = [part for message in history for part in message["parts"]]
+
+    def send_message(self, message):
+        # Le tour de chat renvoie tout l'historique avec le nouveau message
+        return self.model.api.call(self.parts + [message])
+
+
+def legacy_analyze(api, cv_text):
+    model = api.GenerativeModel()
+    chat_session = model.start_chat(
+        history=[{"role": "user", "parts": [LEGACY_INTRO, cv_text, LEGACY_TEMPLATE]}]
+    )
+    return chat_session.send_message(LEGACY_FOLLOW_UP).text
+
+
+def make_cvs(count, words_per_cv, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["python", "gestion", "projet", "développement", "données", "analyse",
+                  "équipe", "client", "stage", "master", "ingénieur", "commercial"]
+    return [" ".join(rng.choice(vocabulary) for _ in range(words_per_cv)) for _ in range(count)]
+
+
+def run(label, api, analyze, cvs):
+    start = time.perf_counter()
+    for cv_text in cvs:
+        analyze(cv_text)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / len(cvs) * 1000:8.1f} ms/CV "
+          f"{api.input_tokens / len(cvs):8.0f} tokens d'entrée/CV "
+          f"{api.requests / len(cvs):5.1f} requêtes/CV")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du client d'analyse (doublure locale de l'API).")
+    parser.add_argument("--cvs", type=int, default=50)
+    parser.add_argument("--words", type=int, default=600, help="Mots par CV synthétique")
+    parser.add_argument("--request-overhead", type=float, default=0.02, help="Secondes fixes par requête")
+    parser.add_argument("--seconds-per-1k-tokens", type=float, default=0.01)
+    parser.add_argument("--model-init-cost", type=float, default=0.002, help="Secondes par GenerativeModel créé")
+    args = parser.parse_args()
+
+    cvs = make_cvs(args.cvs, args.words)
+    api_args = (args.request_overhead, args.seconds_per_1k_tokens, args.model_init_cost)
+
+    legacy_api = FakeAPI(*api_args)
+    run("Chat par CV (historique)", legacy_api, lambda text: legacy_analyze(legacy_api, text), cvs)
+
+    client_api = FakeAPI(*api_args)
+    client = AnalysisClient("fake-model", {}, model=client_api.GenerativeModel(SYSTEM_INSTRUCTION))
+    run("AnalysisClient", client_api, client.analyze, cvs)
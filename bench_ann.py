@@ -0,0 +1,91 @@
+import time
+import argparse
+
+import numpy as np
+
+from ann_index import IVFIndex, default_nlist, TRAIN_POINTS_PER_LIST, _normalize
+
+
+# Benchmark de l'index IVF (ann_index.py) contre la recherche exacte (produit matriciel complet) :
+# rappel@k et latence par requête, à 10k, 100k et 1M vecteurs, pour plusieurs valeurs de nprobe.
+# Les vecteurs sont synthétiques et regroupés autour de thèmes (comme des CV de quelques métiers),
+# dimension 384 par défaut (all-MiniLM-L12-v2) ; les requêtes sont des points nouveaux, hors index.
+
+GENERATION_CHUNK = 100_000
+
+
+def make_vectors(count, dim, topics, rng, spread):
+    """
+    count vecteurs normalisés : un centre de thème tiré au hasard + bruit gaussien.
+    """
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, GENERATION_CHUNK):
+        size = min(GENERATION_CHUNK, count - start)
+        noise = rng.standard_normal((size, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+        vectors[start:start + size] = _normalize(topics[rng.integers(len(topics), size=size)] + noise)
+    return vectors
+
+
+def exact_search(vectors, query, k):
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def percentile_ms(latencies, q):
+    return np.percentile(latencies, q) * 1000
+
+
+def run(size, dim, queries_count, k, nprobes, topics_count, spread, seed):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((topics_count, dim), dtype=np.float32) / np.sqrt(dim)
+    vectors = make_vectors(size, dim, topics, rng, spread)
+    queries = make_vectors(queries_count, dim, topics, rng, spread)
+
+    latencies = []
+    truth = []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(exact_search(vectors, query, k))
+        latencies.append(time.perf_counter() - start)
+    print(f"\n{size} vecteurs x {dim} (float32, {vectors.nbytes / 2**20:.0f} Mo)")
+    print(f"  Exact        : p50 {percentile_ms(latencies, 50):7.2f} ms  p95 {percentile_ms(latencies, 95):7.2f} ms  "
+          f"rappel@{k} 1.000")
+
+    # Entraînement sur un échantillon, puis ajouts par paquets (comme l'indexation incrémentale)
+    start = time.perf_counter()
+    nlist = default_nlist(size)
+    index = IVFIndex(dim, nlist=nlist, auto_train_size=0)
+    index.train(sample=vectors[rng.choice(size, min(size, nlist * TRAIN_POINTS_PER_LIST), replace=False)])
+    for chunk_start in range(0, size, GENERATION_CHUNK):
+        rows = np.arange(chunk_start, min(chunk_start + GENERATION_CHUNK, size))
+        index.add(vectors[rows], rows)
+    print(f"  Construction : {time.perf_counter() - start:.1f} s ({nlist} listes)")
+    del vectors
+
+    for nprobe in nprobes:
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            _, ids = index.search_vectors(query, k=k, nprobe=nprobe)
+            latencies.append(time.perf_counter() - start)
+            hits += len(np.intersect1d(ids[0], expected))
+        print(f"  IVF nprobe={nprobe:<3}: p50 {percentile_ms(latencies, 50):7.2f} ms  "
+              f"p95 {percentile_ms(latencies, 95):7.2f} ms  rappel@{k} {hits / (k * len(queries)):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark IVF contre recherche exacte (rappel / latence).")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    parser.add_argument("--topics", type=int, default=2000, help="Nombre de thèmes des vecteurs synthétiques")
+    parser.add_argument("--spread", type=float, default=1.0, help="Dispersion autour des thèmes (plus = plus difficile)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in map(int, args.sizes.split(",")):
+        run(size, args.dim, args.queries, args.k, [int(n) for n in args.nprobe.split(",")], args.topics, args.spread, args.seed)
@@ -0,0 +1,67 @@
+import time
+import argparse
+
+import numpy as np
+
+from matcher import CVMatcher
+
+
+# Benchmark de matcher.py : latence d'une requête (offre déjà encodée) sur n CV synthétiques,
+# sans filtre, avec filtres structurés, et par lot d'offres (un seul produit matriciel).
+# Dimensions : 384 (MiniLM), 768 (MPNet), 1536 (les trois modèles concaténés de test9).
+
+DOMAINES = ["informatique", "finance", "marketing", "ressources humaines", "génie civil", "santé"]
+LANGUES = ["Français", "Anglais", "Espagnol", "Allemand", "Arabe"]
+
+
+def make_records(count, rng):
+    return [
+        {
+            "file_name": f"cv_{i}.pdf",
+            "domaine_etude": DOMAINES[rng.integers(len(DOMAINES))],
+            "langues": list(rng.choice(LANGUES, size=rng.integers(1, 4), replace=False)),
+            "exp_salaire": float(rng.integers(20, 120)) * 1000,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche exacte offre -> CV.")
+    parser.add_argument("--cvs", type=int, default=100_000)
+    parser.add_argument("--dims", default="384,768,1536")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    records = make_records(args.cvs, rng)
+    for dim in map(int, args.dims.split(",")):
+        start = time.perf_counter()
+        matcher = CVMatcher(rng.standard_normal((args.cvs, dim), dtype=np.float32), records)
+        load = time.perf_counter() - start
+        query = rng.standard_normal(dim, dtype=np.float32)
+        queries = rng.standard_normal((args.batch, dim), dtype=np.float32)
+        filtered = matcher.mask(domaine="informatique", langues=["anglais"], max_salaire=80000)
+
+        print(f"\n{args.cvs} CVs x {dim} ({matcher.vectors.nbytes / 2**20:.0f} Mo, chargement {load:.1f}s)")
+        p50, p95 = timed(lambda: matcher.search_vectors(query, k=args.k), args.repeat)
+        print(f"  1 offre, sans filtre       : p50 {p50:6.1f} ms  p95 {p95:6.1f} ms")
+        p50, p95 = timed(lambda: matcher.search_vectors(
+            query, k=args.k, mask=matcher.mask(domaine="informatique", langues=["anglais"], max_salaire=80000)
+        ), args.repeat)
+        print(f"  1 offre, filtres ({filtered.mean():.0%} CVs) : p50 {p50:6.1f} ms  p95 {p95:6.1f} ms "
+              f"(masque compris)")
+        p50, p95 = timed(lambda: matcher.search_vectors(queries, k=args.k), max(1, args.repeat // 5))
+        print(f"  lot de {args.batch} offres          : p50 {p50:6.1f} ms  ({p50 / args.batch:.2f} ms par offre)")
+        del matcher
@@ -0,0 +1,57 @@
+import time
+import argparse
+
+import numpy as np
+
+from preprocessing import preprocess_text
+from model_registry import DEFAULT_MODELS
+from onnx_backend import OnnxEmbeddingModel, export_model, DEFAULT_CACHE_DIR
+from bench_preprocessing import load_fixture
+
+
+# Benchmark des backends d'embedding sur CPU : SentenceTransformer (torch, fp32) contre
+# onnxruntime fp32 et int8, en CV/s, avec la similarité cosinus des vecteurs par rapport à torch.
+# Les textes viennent du fichier de CV de bench_preprocessing.py (--fixture), prétraités comme dans test9.
+
+
+def throughput(model, texts, batch_size):
+    model.encode(texts[:batch_size], batch_size=batch_size)  # préchauffage
+    start = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    return len(texts) / (time.perf_counter() - start), vectors
+
+
+def cosine(reference, candidate):
+    return (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark torch / ONNX fp32 / ONNX int8 des modèles d'embedding.")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS))
+    parser.add_argument("--fixture", default="bench_cvs.json")
+    parser.add_argument("--cvs", type=int, default=512, help="Nombre de CV encodés")
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="Threads intra-op (0 = défaut onnxruntime)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    texts = [preprocess_text(text, remove_stopwords=False)
+             for text in load_fixture(args.fixture, args.cvs, args.words)[:args.cvs]]
+    print(f"{len(texts)} CV, lots de {args.batch_size}")
+    for name in args.models.split(","):
+        print(f"\n{name}")
+        torch_rate, reference = throughput(SentenceTransformer(name, device="cpu"), texts, args.batch_size)
+        print(f"  {'torch fp32':<12} {torch_rate:8.1f} CV/s")
+        for quantize in (False, True):
+            export_model(name, quantize=quantize, cache_dir=args.cache_dir)
+            model = OnnxEmbeddingModel(name, quantize=quantize, threads=args.threads or None,
+                                       cache_dir=args.cache_dir)
+            rate, vectors = throughput(model, texts, args.batch_size)
+            similarity = cosine(reference, vectors)
+            print(f"  {'onnx int8' if quantize else 'onnx fp32':<12} {rate:8.1f} CV/s  x{rate / torch_rate:.2f}  "
+                  f"cosinus min {similarity.min():.4f} moyen {similarity.mean():.4f}")
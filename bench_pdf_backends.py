@@ -0,0 +1,51 @@
+import os
+import time
+import argparse
+
+from pdf_backends import available_backends, iter_pdf_pages
+
+
+# Benchmark des backends PDF : pages/s et caractères extraits sur un dossier de PDF de référence.
+# Exemple : python bench_pdf_backends.py ./CV --repeat 3 --max-pages 3
+
+
+def list_pdfs(folder):
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(".pdf")
+    )
+
+
+def run(backend, pdf_files, repeat, max_pages, max_chars):
+    pages = 0
+    chars = 0
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for pdf_file in pdf_files:
+            try:
+                for page_text in iter_pdf_pages(pdf_file, backend=backend,
+                                                max_pages=max_pages, max_chars=max_chars):
+                    pages += 1
+                    chars += len(page_text)
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    print(f"{backend:<12} {pages / elapsed:10.1f} pages/s {elapsed / (len(pdf_files) * repeat) * 1000:8.1f} ms/PDF "
+          f"{chars // repeat:10d} caractères {errors // repeat:4d} erreurs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des backends d'extraction PDF.")
+    parser.add_argument("folder", help="Dossier contenant les PDF de référence")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--max-chars", type=int, default=None)
+    parser.add_argument("--backend", action="append", help="Backend(s) à mesurer (par défaut : tous les installés)")
+    args = parser.parse_args()
+
+    pdf_files = list_pdfs(args.folder)
+    if not pdf_files:
+        raise SystemExit(f"Aucun PDF dans {args.folder}")
+    print(f"{len(pdf_files)} PDF, {args.repeat} passage(s)")
+    for backend in args.backend or available_backends():
+        run(backend, pdf_files, args.repeat, args.max_pages, args.max_chars)
@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import time
+import random
+import string
+import argparse
+
+from preprocessing import preprocess_batch, FRENCH_STOPWORDS
+
+try:
+    from nltk.corpus import stopwords
+    from nltk.tokenize import word_tokenize
+except ImportError:
+    stopwords = None
+
+
+# Benchmark du prétraitement : preprocessing.py contre les versions historiques
+# (NLTK de stock.py et stock3-6, regex ASCII des scripts test*), en CV/s.
+# Les CV synthétiques sont écrits dans un fichier de référence (--fixture, 10 000 CV par défaut)
+# au format des résultats (liste de {"cv_text": ...}) et relus aux exécutions suivantes.
+
+
+def stock_preprocess(text):
+    # Version de stock.py : liste des mots vides rechargée et parcourue pour chaque mot
+    text = text.lower()
+    text = text.translate(str.maketrans("", "", string.punctuation))
+    words = word_tokenize(text)
+    words = [word for word in words if word not in stopwords.words('french')]
+    return ' '.join(words)
+
+
+def nltk_preprocess(text, stop_words):
+    # Version des scripts stock3-6
+    if not text:
+        return ""
+    text = text.lower()
+    text = text.translate(str.maketrans("", "", string.punctuation))
+    tokens = word_tokenize(text)
+    tokens = [t for t in tokens if t not in stop_words]
+    return " ".join(tokens)
+
+
+def regex_preprocess(text):
+    # Version des scripts test* (supprime aussi les lettres accentuées)
+    text = text.lower()
+    return re.sub(r'[^a-z0-9\s]', '', text)
+
+
+def make_cvs(count, words_per_cv, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["Développement", "d'applications", "équipe", "Ingénieur", "données", "(Python/SQL)",
+                  "gestion", "projet", "client,", "été", "à", "les", "de", "Master", "•", "2023;"]
+    vocabulary += sorted(FRENCH_STOPWORDS)[:20]
+    return [" ".join(rng.choice(vocabulary) for _ in range(words_per_cv)) for _ in range(count)]
+
+
+def load_fixture(path, count, words_per_cv):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [cv["cv_text"] for cv in json.load(f)]
+    cvs = make_cvs(count, words_per_cv)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{"cv_text": cv_text} for cv_text in cvs], f, ensure_ascii=False)
+    return cvs
+
+
+def run(label, function, cvs):
+    start = time.perf_counter()
+    function(cvs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {len(cvs) / elapsed:10.0f} CV/s {elapsed:8.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du prétraitement de texte.")
+    parser.add_argument("--fixture", default="bench_cvs.json", help="Fichier de CV de référence (créé s'il n'existe pas)")
+    parser.add_argument("--cvs", type=int, default=10000)
+    parser.add_argument("--words", type=int, default=600, help="Mots par CV synthétique")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--stock-sample", type=int, default=200,
+                        help="CV mesurés pour la version stock.py (quadratique)")
+    args = parser.parse_args()
+
+    cvs = load_fixture(args.fixture, args.cvs, args.words)
+    print(f"{len(cvs)} CV ({args.fixture})")
+
+    if stopwords is not None:
+        # Trop lente pour tout le fichier : mesurée sur un échantillon, débit en CV/s
+        run("NLTK, liste par mot (stock.py)",
+            lambda texts: [stock_preprocess(text) for text in texts], cvs[:args.stock_sample])
+        stop_words = set(stopwords.words('french'))
+        run("NLTK (stock*)", lambda texts: [nltk_preprocess(text, stop_words) for text in texts], cvs)
+    else:
+        print("NLTK non installé : version stock* ignorée")
+    run("Regex ASCII (test*)", lambda texts: [regex_preprocess(text) for text in texts], cvs)
+    run("preprocess_batch", preprocess_batch, cvs)
+    run("preprocess_batch (accents repliés)", lambda texts: preprocess_batch(texts, fold_accents=True), cvs)
+    run(f"preprocess_batch ({args.processes} processus)",
+        lambda texts: preprocess_batch(texts, processes=args.processes), cvs)
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+
+from model_registry import DEFAULT_MODELS
+
+
+# Benchmark du démarrage « à vide » (aucun nouveau CV) de test8.py / test9.py :
+# durée et mémoire maximale (RSS) d'un processus neuf, comparées au chargement des trois
+# SentenceTransformer fait auparavant à l'import. Chaque mesure tourne dans un dossier temporaire
+# (caches et fichiers de résultats vides) ; LLM_CACHE_REPLAY=1 évite d'exiger une clé Gemini.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EAGER_LOAD = (
+    "from sentence_transformers import SentenceTransformer\n"
+    "models = [SentenceTransformer(name) for name in {models!r}]\n"
+)
+
+NOOP_RUN = (
+    "import os, {module}\n"
+    "os.makedirs('cvs_vides', exist_ok=True)\n"
+    "{module}.process_all_cvs('cvs_vides', 'resultats.json')\n"
+    "print('Modèles chargés :', {module}.model_registry.loaded())\n"
+)
+
+
+def measure(label, code, repeat):
+    """
+    Lance code dans un processus neuf ; affiche la durée médiane et le RSS maximal.
+    """
+    durations = []
+    max_rss = 0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as work_dir:
+            env = dict(os.environ, PYTHONPATH=REPO_DIR, LLM_CACHE_REPLAY="1")
+            start = time.perf_counter()
+            process = subprocess.Popen([sys.executable, "-c", code], cwd=work_dir, env=env,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            output = process.stdout.read()
+            _, status, usage = os.wait4(process.pid, 0)
+            durations.append(time.perf_counter() - start)
+            if status != 0:
+                print(f"{label} : échec\n{output}")
+                return
+            # ru_maxrss est en Ko sous Linux
+            max_rss = max(max_rss, usage.ru_maxrss / 1024)
+    durations.sort()
+    loaded = [line for line in output.splitlines() if line.startswith("Modèles chargés")]
+    print(f"{label:<34} {durations[len(durations) // 2]:7.2f} s  RSS max {max_rss:7.0f} Mo  "
+          + (loaded[0] if loaded else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage sans nouveau CV.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scripts", default="test8,test9")
+    args = parser.parse_args()
+
+    measure("Chargement des 3 modèles (avant)", EAGER_LOAD.format(models=DEFAULT_MODELS), args.repeat)
+    for module in args.scripts.split(","):
+        measure(f"{module}.py, aucun nouveau CV", NOOP_RUN.format(module=module), args.repeat)
@@ -0,0 +1,297 @@
+import io
+import os
+import json
+import time
+import uuid
+import argparse
+from datetime import date
+
+import psycopg2
+import psycopg2.extras
+from dotenv import load_dotenv
+
+from preprocessing import preprocess_batch
+from json_stream import iter_batches, iter_records
+from vector_store import load_vector, open_store_for
+
+
+# Chargement en masse des résultats d'analyse (cv.json / journal JSONL, lus en flux) dans PostgreSQL.
+# Au lieu d'un SELECT + INSERT par candidat et d'un commit par CV, chaque lot est :
+#   1. validé et préparé en Python (les enregistrements invalides vont dans le fichier de rejets) ;
+#   2. envoyé par COPY FROM STDIN dans une table temporaire (même types que cv_analysis) ;
+#   3. fusionné en deux requêtes ensemblistes : INSERT ... ON CONFLICT (mail) DO NOTHING
+#      dans candidat, puis INSERT ... SELECT dans cv_analysis ;
+#   4. validé par un seul commit.
+# Si le lot échoue côté base, il est rejoué enregistrement par enregistrement (savepoints)
+# pour isoler les lignes fautives sans perdre les autres.
+# Les vecteurs sont lus dans le dossier binaire du fichier (cv.vectors/) ou dans "cv_vector".
+# Prérequis : contrainte d'unicité sur candidat.mail.
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_REJECT_FILE = "rejets.jsonl"
+
+CV_COLUMNS = [
+    "id_cv", "date_insertion", "cv_text", "cv_pretraite", "cv_vector",
+    "competences", "experience", "resume_cv", "commitment", "disponibilite",
+    "exp_salaire", "domaine_etude", "langue", "id_candidat", "education",
+]
+# Colonnes propres à la table temporaire (candidat et ordre d'origine)
+STAGING_COLUMNS = ["stg_row", "stg_mail", "stg_nom_prenom", "stg_numero_tlfn", "stg_profil"]
+
+
+def connect():
+    """
+    Connexion PostgreSQL à partir des variables d'environnement (DB_HOST, DB_NAME, ...).
+    """
+    load_dotenv()
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        port=os.environ.get("DB_PORT"),
+        sslmode=os.environ.get("DB_SSLMODE")
+    )
+
+
+def _copy_value(value):
+    """
+    Valeur au format texte de COPY (NULL = \\N, caractères spéciaux échappés).
+    """
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _array_literal(values):
+    """
+    Tableau PostgreSQL ({...}) pour text[] ; les éléments sont entre guillemets.
+    """
+    items = ('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values)
+    return "{" + ",".join(items) + "}"
+
+
+def prepare_record(cv_item, education_as_array=False, vector_store=None):
+    """
+    Valide un enregistrement et le convertit en ligne de la table temporaire
+    (hors cv_pretraite, calculé par lot). Lève ValueError si l'enregistrement est invalide.
+    """
+    candidat_info = cv_item.get("candidat", {}) or {}
+    nom_prenom = candidat_info.get("nom_prenom", "") or ""
+    mail = candidat_info.get("mail", "") or ""
+    if not nom_prenom or not mail:
+        raise ValueError("Nom/Prénom ou e-mail manquant")
+
+    cv_info = cv_item.get("cv", {}) or {}
+    try:
+        cv_vector = load_vector(cv_item, vector_store)
+    except (TypeError, ValueError, IndexError):
+        raise ValueError("cv_vector doit être une liste de nombres")
+    cv_vector = "{" + ",".join(map(repr, cv_vector.tolist())) + "}" if cv_vector is not None else "{}"
+
+    date_insertion = cv_info.get("date_insertion") or "2025-01-01"
+    try:
+        date.fromisoformat(str(date_insertion))
+    except ValueError:
+        raise ValueError(f"date_insertion invalide : {date_insertion}")
+
+    exp_salaire = cv_info.get("exp_salaire", 0)
+    if exp_salaire in (None, "", "null"):
+        exp_salaire = 0
+    try:
+        exp_salaire = float(exp_salaire)
+    except (TypeError, ValueError):
+        raise ValueError(f"exp_salaire invalide : {exp_salaire}")
+    if exp_salaire.is_integer():
+        exp_salaire = int(exp_salaire)
+
+    education = cv_info.get("education", [])
+    education = _array_literal(education) if education_as_array else json.dumps(education, ensure_ascii=False)
+
+    return {
+        "id_cv": str(uuid.uuid4()),
+        "date_insertion": str(date_insertion),
+        "cv_text": cv_info.get("cv_text", "") or "",
+        "cv_pretraite": None,
+        "cv_vector": cv_vector,
+        "competences": json.dumps(cv_info.get("competences", []), ensure_ascii=False),
+        "experience": json.dumps(cv_info.get("experience", []), ensure_ascii=False),
+        "resume_cv": (cv_info.get("resume_cv", "") or "")[:255],
+        "commitment": cv_info.get("commitment", None),
+        "disponibilite": cv_info.get("disponibilite", None),
+        "exp_salaire": exp_salaire,
+        "domaine_etude": (cv_info.get("domaine_etude", "") or "")[:255],
+        "langue": json.dumps(cv_info.get("langues", []), ensure_ascii=False),
+        # Identifiant utilisé seulement si le candidat est nouveau
+        "id_candidat": str(uuid.uuid4()),
+        "education": education,
+        "stg_mail": mail[:254],
+        "stg_nom_prenom": nom_prenom[:255],
+        "stg_numero_tlfn": (candidat_info.get("num_tel", "") or "")[:20],
+        "stg_profil": (candidat_info.get("profil", "") or "")[:255],
+    }
+
+
+class BulkLoader:
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, reject_file=DEFAULT_REJECT_FILE, vector_store=None):
+        self.conn = conn
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.reject_file = reject_file
+        self.loaded = 0
+        self.rejected = 0
+        self._cursor = conn.cursor()
+        self._create_staging()
+        self._education_as_array = self._column_is_array("cv_analysis", "education")
+
+    def _create_staging(self):
+        # Table temporaire aux types de cv_analysis (COPY convertit le texte vers ces types)
+        self._cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS staging_cv_analysis
+            (LIKE cv_analysis INCLUDING DEFAULTS);
+            ALTER TABLE staging_cv_analysis
+                ADD COLUMN IF NOT EXISTS stg_row integer,
+                ADD COLUMN IF NOT EXISTS stg_mail text,
+                ADD COLUMN IF NOT EXISTS stg_nom_prenom text,
+                ADD COLUMN IF NOT EXISTS stg_numero_tlfn text,
+                ADD COLUMN IF NOT EXISTS stg_profil text;
+        """)
+        self.conn.commit()
+
+    def _column_is_array(self, table, column):
+        # education est text[] dans les premières versions du schéma (stock3), jsonb ensuite
+        self._cursor.execute("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = %s AND column_name = %s
+        """, (table, column))
+        res = self._cursor.fetchone()
+        return bool(res) and res[0] == "ARRAY"
+
+    def _reject(self, cv_item, error):
+        self.rejected += 1
+        with open(self.reject_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"error": str(error), "record": cv_item}, ensure_ascii=False) + "\n")
+        print(f"Rejet pour {cv_item.get('file_name', '')}: {error}")
+
+    def _copy_and_merge(self, rows):
+        """
+        COPY des lignes dans la table temporaire puis fusion ensembliste.
+        """
+        columns = CV_COLUMNS + STAGING_COLUMNS
+        buffer = io.StringIO()
+        for row_number, row in rows:
+            row["stg_row"] = row_number
+            buffer.write("\t".join(_copy_value(row[column]) for column in columns) + "\n")
+        buffer.seek(0)
+
+        self._cursor.execute("TRUNCATE staging_cv_analysis")
+        self._cursor.copy_expert(
+            f"COPY staging_cv_analysis ({', '.join(columns)}) FROM STDIN", buffer
+        )
+        # Un seul candidat par mail dans le lot (le premier) ; les mails existants sont conservés
+        self._cursor.execute("""
+            INSERT INTO candidat (id_candidat, nom_prenom, mail, numero_tlfn, profil, code)
+            SELECT DISTINCT ON (stg_mail) id_candidat, stg_nom_prenom, stg_mail, stg_numero_tlfn, stg_profil, ''
+            FROM staging_cv_analysis
+            ORDER BY stg_mail, stg_row
+            ON CONFLICT (mail) DO NOTHING
+        """)
+        select_columns = ", ".join("c.id_candidat" if column == "id_candidat" else f"s.{column}"
+                                   for column in CV_COLUMNS)
+        self._cursor.execute(f"""
+            INSERT INTO cv_analysis ({', '.join(CV_COLUMNS)})
+            SELECT {select_columns}
+            FROM staging_cv_analysis s
+            JOIN candidat c ON c.mail = s.stg_mail
+            ORDER BY s.stg_row
+        """)
+
+    def load_batch(self, cv_items):
+        """
+        Charge un lot d'enregistrements ; renvoie le nombre de CV insérés.
+        """
+        rows = []
+        for row_number, cv_item in enumerate(cv_items):
+            try:
+                rows.append((row_number, prepare_record(cv_item, self._education_as_array, self.vector_store)))
+            except Exception as e:
+                self._reject(cv_item, e)
+
+        texts = preprocess_batch([row["cv_text"] for _, row in rows])
+        for (_, row), cv_pretraite in zip(rows, texts):
+            row["cv_pretraite"] = cv_pretraite
+
+        if not rows:
+            return 0
+        try:
+            self._copy_and_merge(rows)
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            print(f"Lot de {len(rows)} CVs en échec ({str(e).strip()}), reprise ligne par ligne.")
+            return self._load_rows_one_by_one(cv_items, rows)
+
+        self.loaded += len(rows)
+        return len(rows)
+
+    def _load_rows_one_by_one(self, cv_items, rows):
+        inserted = 0
+        for row_number, row in rows:
+            self._cursor.execute("SAVEPOINT bulk_row")
+            try:
+                self._copy_and_merge([(row_number, row)])
+            except psycopg2.Error as e:
+                self._cursor.execute("ROLLBACK TO SAVEPOINT bulk_row")
+                self._reject(cv_items[row_number], str(e).strip())
+            else:
+                self._cursor.execute("RELEASE SAVEPOINT bulk_row")
+                inserted += 1
+        self.conn.commit()
+        self.loaded += inserted
+        return inserted
+
+    def load(self, records):
+        """
+        Charge tous les enregistrements par lots de batch_size.
+        """
+        start = time.perf_counter()
+        for batch in iter_batches(records, self.batch_size):
+            self.load_batch(batch)
+            print(f"{self.loaded} CVs insérés, {self.rejected} rejetés "
+                  f"({self.loaded / (time.perf_counter() - start):.0f} CV/s)")
+        return self.loaded
+
+    def close(self):
+        self._cursor.close()
+
+
+def load_results(conn, results_file, batch_size=DEFAULT_BATCH_SIZE, reject_file=DEFAULT_REJECT_FILE):
+    """
+    Charge un fichier de résultats (JSON ou JSONL) ; renvoie (insérés, rejetés).
+    """
+    vector_store = open_store_for(results_file)
+    loader = BulkLoader(conn, batch_size=batch_size, reject_file=reject_file, vector_store=vector_store)
+    try:
+        loader.load(iter_records(results_file))
+    finally:
+        loader.close()
+        if vector_store is not None:
+            vector_store.close()
+    print(f"Chargement terminé : {loader.loaded} CVs insérés, {loader.rejected} rejetés"
+          + (f" (voir {reject_file})" if loader.rejected else "") + ".")
+    return loader.loaded, loader.rejected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chargement en masse des résultats dans PostgreSQL.")
+    parser.add_argument("results_file", help="cv.json (tableau) ou journal .jsonl")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--reject-file", default=DEFAULT_REJECT_FILE)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        load_results(conn, args.results_file, batch_size=args.batch_size, reject_file=args.reject_file)
+    finally:
+        conn.close()
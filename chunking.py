@@ -0,0 +1,156 @@
+import os
+import re
+from threading import Lock
+
+import numpy as np
+
+from vector_store import VectorStore
+
+
+# Découpage des CV longs avant l'embedding.
+# SentenceTransformer tronque chaque texte à max_seq_length jetons (256 à 384 selon le modèle) :
+# sans découpage, un CV long n'est représenté que par sa première demi-page.
+# Le texte est tokenisé une fois (sans troncature) avec le tokenizer du modèle, puis coupé en
+# fenêtres de jetons qui se chevauchent (overlap) ; chaque fenêtre redevient un extrait du texte
+# d'origine grâce aux positions des jetons. Tous les extraits de tous les CV d'un lot sont encodés
+# en un seul appel model.encode, puis regroupés en un vecteur par CV (moyenne ou maximum).
+# Les vecteurs par extrait peuvent être conservés (ChunkStore) pour une recherche plus fine.
+
+POOLING_MODES = ("mean", "max")
+DEFAULT_OVERLAP = 32
+DEFAULT_BATCH_SIZE = 64
+# Jetons spéciaux ajoutés par le tokenizer à chaque extrait ([CLS] ... [SEP], <s> ... </s>)
+SPECIAL_TOKENS = 2
+
+
+def token_offsets(model, text):
+    """
+    Positions (début, fin) des jetons de text dans la chaîne, sans troncature ni jetons spéciaux.
+    """
+    if hasattr(model, "token_offsets"):
+        return model.token_offsets(text)
+    encoding = model.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                               truncation=False, verbose=False)
+    return encoding["offset_mapping"]
+
+
+class Chunker:
+    def __init__(self, overlap=DEFAULT_OVERLAP, pooling="mean", max_tokens=None, max_chunks=None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        """
+        overlap : jetons communs à deux extraits consécutifs.
+        pooling : "mean" ou "max", regroupement des vecteurs d'extraits en un vecteur par CV.
+        max_tokens : taille d'un extrait, jetons spéciaux compris (None = max_seq_length du modèle).
+        max_chunks : nombre maximal d'extraits par CV (None = tout le texte).
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"pooling inconnu : {pooling} (choix : {', '.join(POOLING_MODES)})")
+        self.overlap = overlap
+        self.pooling = pooling
+        self.max_tokens = max_tokens
+        self.max_chunks = max_chunks
+        self.batch_size = batch_size
+
+    def cache_key(self, model_name):
+        """
+        Nom du modèle pour le cache d'embeddings : les vecteurs regroupés ne sont pas ceux du texte tronqué.
+        """
+        return f"{model_name}|chunks-{self.pooling}-{self.overlap}-{self.max_tokens or 'max'}-{self.max_chunks or 'all'}"
+
+    def split(self, model, text):
+        """
+        Extraits de text, sur des frontières de jetons, chevauchement compris.
+        """
+        size = (self.max_tokens or model.max_seq_length) - SPECIAL_TOKENS
+        offsets = token_offsets(model, text)
+        if len(offsets) <= size:
+            return [text]
+        stride = max(size - self.overlap, 1)
+        chunks = []
+        for start in range(0, len(offsets), stride):
+            end = min(start + size, len(offsets))
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+            if end == len(offsets) or (self.max_chunks and len(chunks) >= self.max_chunks):
+                break
+        return chunks
+
+    def pool(self, chunk_vectors):
+        if self.pooling == "max":
+            return chunk_vectors.max(axis=0)
+        return chunk_vectors.mean(axis=0)
+
+    def encode(self, model, texts):
+        """
+        Encode tous les extraits de tous les textes en un appel ; renvoie
+        (matrice des vecteurs regroupés, un par texte ; liste des matrices de vecteurs d'extraits).
+        """
+        chunks = [self.split(model, text) for text in texts]
+        flat = [chunk for text_chunks in chunks for chunk in text_chunks]
+        vectors = np.asarray(model.encode(flat, batch_size=self.batch_size), dtype=np.float32)
+        bounds = np.cumsum([0] + [len(text_chunks) for text_chunks in chunks])
+        chunk_vectors = [vectors[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        pooled = np.vstack([self.pool(matrix) for matrix in chunk_vectors])
+        return pooled, chunk_vectors
+
+
+class ChunkStore:
+    """
+    Vecteurs par extrait, adressés par contenu (hash du texte prétraité, comme EmbeddingCache) :
+    un VectorStore par modèle, identifiants "<hash>:<numéro d'extrait>".
+    """
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self._stores = {}
+        self._lock = Lock()
+
+    def _store(self, model_name):
+        with self._lock:
+            store = self._stores.get(model_name)
+            if store is None:
+                store = VectorStore(os.path.join(self.store_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)))
+                self._stores[model_name] = store
+            return store
+
+    def has(self, model_name, text_hash):
+        return self._store(model_name).row_of(f"{text_hash}:0") is not None
+
+    def add(self, model_name, text_hash, chunk_vectors):
+        store = self._store(model_name)
+        for number, vector in enumerate(chunk_vectors):
+            store.add(f"{text_hash}:{number}", {model_name: vector}, sync=False)
+        store.flush()
+
+    def chunks(self, model_name, text_hash):
+        """
+        Matrice des vecteurs d'extraits d'un texte (vide si absent).
+        """
+        store = self._store(model_name)
+        rows = []
+        while (row := store.row_of(f"{text_hash}:{len(rows)}")) is not None:
+            rows.append(row)
+        return np.asarray(store.matrix(model_name)[rows])
+
+    def search(self, model_name, query_vector, k=10):
+        """
+        Extraits les plus proches (cosinus) d'un vecteur de requête : [(hash du texte, numéro, score)].
+        """
+        store = self._store(model_name)
+        matrix = np.asarray(store.matrix(model_name), dtype=np.float32)
+        if not len(matrix):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        count = min(k, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for row in top:
+            text_hash, number = store.record_id(row).rsplit(":", 1)
+            results.append((text_hash, int(number), float(scores[row])))
+        return results
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
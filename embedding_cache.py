@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+from threading import Lock
+
+import numpy as np
+
+
+# Cache disque des embeddings, adressé par contenu : clé = (nom du modèle, hash du texte prétraité).
+# Les vecteurs sont stockés en float32 dans un fichier mémoire-mappé par modèle
+# (une ligne par entrée) ; l'index (clé -> ligne, date de dernier accès) est dans SQLite.
+# Au-delà de max_entries entrées par modèle, la ligne la moins récemment utilisée est réutilisée (LRU).
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def text_hash(text):
+    """
+    Empreinte SHA-256 du texte prétraité.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._matrices = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS models (
+                model TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                capacity INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (model, last_used)")
+        self._db.commit()
+
+    def _matrix_path(self, model_name):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        return os.path.join(self.cache_dir, f"{safe_name}.f32")
+
+    def _matrix(self, model_name, dim=None):
+        """
+        Ouvre (ou crée, si dim est fourni) la matrice mémoire-mappée d'un modèle.
+        Renvoie None si le modèle n'a encore rien en cache.
+        """
+        if model_name in self._matrices:
+            return self._matrices[model_name]
+
+        row = self._db.execute(
+            "SELECT dim, capacity FROM models WHERE model = ?", (model_name,)
+        ).fetchone()
+        path = self._matrix_path(model_name)
+        if row:
+            stored_dim, capacity = row
+            matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, stored_dim))
+        elif dim is not None:
+            matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(self.max_entries, dim))
+            self._db.execute(
+                "INSERT INTO models (model, dim, capacity) VALUES (?, ?, ?)",
+                (model_name, dim, self.max_entries),
+            )
+        else:
+            return None
+
+        self._matrices[model_name] = matrix
+        return matrix
+
+    def get_many(self, model_name, texts):
+        """
+        Renvoie une liste alignée sur texts : le vecteur en cache (copie numpy) ou None.
+        """
+        with self._lock:
+            matrix = self._matrix(model_name)
+            if matrix is None:
+                self.misses += len(texts)
+                return [None] * len(texts)
+
+            now = time.time()
+            results = []
+            for text in texts:
+                key = text_hash(text)
+                row = self._db.execute(
+                    "SELECT row FROM entries WHERE model = ? AND text_hash = ?", (model_name, key)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._db.execute(
+                    "UPDATE entries SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    (now, model_name, key),
+                )
+                results.append(np.array(matrix[row[0]]))
+            self._db.commit()
+            return results
+
+    def get(self, model_name, text):
+        return self.get_many(model_name, [text])[0]
+
+    def put_many(self, model_name, texts, vectors):
+        """
+        Enregistre les vecteurs des textes ; évince les entrées les moins
+        récemment utilisées quand le modèle a atteint sa capacité.
+        """
+        with self._lock:
+            now = time.time()
+            for text, vector in zip(texts, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                matrix = self._matrix(model_name, dim=vector.shape[0])
+                key = text_hash(text)
+
+                existing = self._db.execute(
+                    "SELECT row FROM entries WHERE model = ? AND text_hash = ?", (model_name, key)
+                ).fetchone()
+                if existing:
+                    row = existing[0]
+                else:
+                    row = self._free_row(model_name, matrix.shape[0])
+                    self._db.execute(
+                        "INSERT INTO entries (model, text_hash, row, last_used) VALUES (?, ?, ?, ?)",
+                        (model_name, key, row, now),
+                    )
+                matrix[row] = vector
+                self._db.execute(
+                    "UPDATE entries SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    (now, model_name, key),
+                )
+            self._db.commit()
+
+    def put(self, model_name, text, vector):
+        self.put_many(model_name, [text], [vector])
+
+    def _free_row(self, model_name, capacity):
+        """
+        Renvoie une ligne libre, ou libère celle de l'entrée la moins récemment utilisée.
+        """
+        count = self._db.execute(
+            "SELECT COUNT(*) FROM entries WHERE model = ?", (model_name,)
+        ).fetchone()[0]
+        if count < capacity:
+            return count
+
+        row, key = self._db.execute(
+            "SELECT row, text_hash FROM entries WHERE model = ? ORDER BY last_used LIMIT 1",
+            (model_name,),
+        ).fetchone()
+        self._db.execute(
+            "DELETE FROM entries WHERE model = ? AND text_hash = ?", (model_name, key)
+        )
+        return row
+
+    def stats(self):
+        """
+        Compteurs de succès / échecs depuis l'ouverture du cache.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.flush()
+            self._matrices.clear()
+            self._db.close()
@@ -0,0 +1,164 @@
+import time
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+from embedding_cache import text_hash
+
+
+# Service d'embeddings par micro-batchs.
+# Les threads de traitement déposent leur texte prétraité dans une file ;
+# une thread dédiée regroupe les demandes (jusqu'à batch_size textes, ou
+# max_wait secondes d'attente), encode le lot une seule fois par modèle
+# SentenceTransformer, puis rend à chaque appelant ses propres vecteurs.
+# Si un EmbeddingCache est fourni, seuls les textes absents du cache sont encodés.
+# Avec un Chunker (chunking.py), les textes longs sont découpés en extraits encodés ensemble
+# puis regroupés, au lieu d'être tronqués par le modèle ; un ChunkStore garde les vecteurs d'extraits.
+# Les vecteurs d'un modèle exécuté par un autre backend (ONNX, int8...) ne sont pas identiques à ceux
+# de torch : variant les range sous une autre clé de cache.
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT = 0.05  # secondes
+
+
+class EmbeddingService:
+    def __init__(self, models, batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, cache=None,
+                 chunker=None, chunk_store=None, variant=None):
+        """
+        models : dict {nom_du_modèle: instance SentenceTransformer}, dans l'ordre
+        où les vecteurs doivent être rendus (utile pour la concaténation).
+        cache : EmbeddingCache optionnel, consulté avant tout encodage.
+        chunker : Chunker optionnel (découpage des textes longs).
+        chunk_store : ChunkStore optionnel (avec chunker), vecteurs d'extraits par hash du texte.
+        variant : exécution des modèles autre que torch (ex. "onnx-int8", voir onnx_backend.backend_variant),
+        ajoutée aux clés du cache et du chunk_store.
+        """
+        self.models = models
+        self.cache = cache
+        self.chunker = chunker
+        self.chunk_store = chunk_store if chunker is not None else None
+        self.variant = variant
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """
+        Dépose un texte dans la file et renvoie un Future dont le résultat
+        est un dict {nom_du_modèle: vecteur numpy}.
+        """
+        if self._closed:
+            raise RuntimeError("EmbeddingService fermé")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text):
+        """
+        Version bloquante de submit() : attend les vecteurs du texte.
+        """
+        return self.submit(text).result()
+
+    def encode_many(self, texts):
+        """
+        Dépose plusieurs textes d'un coup et renvoie la liste des dicts de vecteurs.
+        """
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """
+        Termine les demandes en attente puis arrête la thread d'encodage.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _collect_batch(self):
+        """
+        Attend une première demande puis complète le lot jusqu'à batch_size
+        demandes ou jusqu'à expiration de max_wait.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None, True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _encode_batch(self, texts):
+        """
+        Encode le lot une fois par modèle (uniquement les textes absents du cache).
+        Renvoie une liste de dicts, un par texte.
+        """
+        results = [{} for _ in texts]
+        hashes = [text_hash(text) for text in texts] if self.chunk_store is not None else None
+        for name, model in self.models.items():
+            store_name = name if self.variant is None else f"{name}|{self.variant}"
+            cache_name = store_name if self.chunker is None else self.chunker.cache_key(store_name)
+            if self.cache is not None:
+                vectors = self.cache.get_many(cache_name, texts)
+            else:
+                vectors = [None] * len(texts)
+            if self.chunk_store is not None:
+                # Texte en cache mais extraits jamais conservés : encodé à nouveau
+                vectors = [
+                    vector if vector is not None and self.chunk_store.has(store_name, key) else None
+                    for vector, key in zip(vectors, hashes)
+                ]
+
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                if self.chunker is None:
+                    encoded = model.encode(missing_texts, batch_size=len(missing_texts))
+                else:
+                    encoded, chunk_vectors = self.chunker.encode(model, missing_texts)
+                    if self.chunk_store is not None:
+                        for i, matrix in zip(missing, chunk_vectors):
+                            self.chunk_store.add(store_name, hashes[i], matrix)
+                for i, vector in zip(missing, encoded):
+                    vectors[i] = vector
+                if self.cache is not None:
+                    self.cache.put_many(cache_name, missing_texts, encoded)
+
+            for result, vector in zip(results, vectors):
+                result[name] = vector
+        return results
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect_batch()
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                results = self._encode_batch(texts)
+            except Exception as e:
+                print(f"Erreur lors de l'encodage d'un lot de {len(texts)} textes : {str(e)}")
+                traceback.print_exc()
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
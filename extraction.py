@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from concurrent.futures import Future, as_completed
+
+from docx import Document
+
+from pdf_backends import extract_pdf_text
+
+
+# Extraction du texte des CV (PDF / DOCX).
+# L'extraction est purement CPU (pdfium / PyPDF2, python-docx) et garde le GIL : des threads
+# ne l'exécutent jamais en parallèle. ExtractionPool la répartit sur des processus
+# réutilisés, qui reçoivent des paquets de chemins et ne renvoient que le texte extrait.
+# Un fichier qui dépasse le délai par fichier fait tuer (puis remplacer) son processus,
+# sans interrompre le reste du traitement.
+
+DEFAULT_CHUNK_SIZE = 4
+DEFAULT_TIMEOUT = 60  # secondes par fichier
+MAX_ATTEMPTS = 2  # un fichier présent dans le paquet de deux processus morts est abandonné
+
+
+def extract_text_from_docx(file_path):
+    document = Document(file_path)
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def extract_text_from_pdf(file_path, max_pages=None, max_chars=None):
+    # Backend le plus rapide disponible (pdfium, sinon PyPDF2), lecture page par page
+    return extract_pdf_text(file_path, max_pages=max_pages, max_chars=max_chars)
+
+
+def extract_text(file_path, max_pages=None, max_chars=None):
+    """
+    Texte brut d'un CV selon son extension, ou None si le format n'est pas pris en charge.
+    max_pages / max_chars limitent la lecture des PDF (ex. portfolios de 40 pages).
+    """
+    if file_path.endswith(".docx"):
+        return extract_text_from_docx(file_path)
+    elif file_path.endswith(".pdf"):
+        return extract_text_from_pdf(file_path, max_pages=max_pages, max_chars=max_chars)
+    return None
+
+
+def _worker_main(conn, max_pages, max_chars):
+    """
+    Boucle d'un processus d'extraction : reçoit des paquets [(task_id, path), ...] sur sa
+    connexion et y signale le début puis le résultat de chaque fichier.
+    """
+    while True:
+        try:
+            chunk = conn.recv()
+        except EOFError:
+            return
+        if chunk is None:
+            return
+        for task_id, path in chunk:
+            conn.send(("start", task_id))
+            try:
+                conn.send(("done", task_id, extract_text(path, max_pages, max_chars), None))
+            except Exception as e:
+                conn.send(("done", task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context, limits):
+        # Une connexion par processus : tuer un processus au milieu d'un envoi
+        # ne peut corrompre que sa propre connexion, abandonnée avec lui.
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, *limits), daemon=True)
+        self.process.start()
+        child_conn.close()  # fin de connexion détectée (EOFError) à la mort du processus
+        self.assigned = deque()   # (task_id, path) envoyés et non terminés
+        self.current = None       # task_id en cours
+        self.started_at = None
+
+
+class ExtractionPool:
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_pages=None, max_chars=None):
+        # forkserver : les processus (y compris les remplaçants, créés par le thread de gestion)
+        # sont forkés par un serveur sans threads, jamais par le processus parent et ses threads.
+        # Le serveur ne précharge que ce module ; chaque processus réimporte le script principal
+        # (comme avec spawn, seule méthode sous Windows) : celui-ci ne doit rien créer à l'import
+        # en dehors de if __name__ == "__main__" (voir init_services() dans test9.py).
+        if sys.platform != "win32":
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload([__name__])
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._limits = (max_pages, max_chars)  # limites de lecture des PDF
+        # Réveil du thread de gestion (nouveau fichier, fermeture)
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._lock = threading.Lock()
+        self._pending = deque()   # (task_id, path)
+        self._futures = {}        # task_id -> Future
+        self._next_task_id = 0
+        self._attempts = {}       # task_id -> nombre de processus morts avec ce fichier
+        self._closed = False
+        self.timeouts = 0
+        self.crashes = 0
+
+        worker_count = workers or os.cpu_count() or 4
+        self._workers = [_Worker(self._context, self._limits) for _ in range(worker_count)]
+        self._manager = threading.Thread(target=self._manage, name="extraction-pool", daemon=True)
+        self._manager.start()
+
+    def submit(self, path):
+        """
+        Confie l'extraction d'un fichier au pool. Renvoie un Future du texte brut
+        (None si le format n'est pas pris en charge).
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ExtractionPool fermé")
+            task_id = self._next_task_id
+            self._next_task_id += 1
+            self._futures[task_id] = future
+            self._pending.append((task_id, path))
+            self._wake_writer.send("wake")
+        return future
+
+    def imap(self, paths):
+        """
+        Extrait tous les fichiers ; renvoie (path, texte, erreur) au fil des résultats.
+        """
+        futures = {self.submit(path): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake_writer.send("stop")
+        # Le thread de gestion demande lui-même l'arrêt des processus (seul à écrire sur leurs connexions)
+        self._manager.join()
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._wake_reader.close()
+        self._wake_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Thread de gestion (dans le processus parent)
+
+    def _manage(self):
+        while True:
+            workers = {worker.conn: worker for worker in self._workers}
+            sentinels = [worker.process.sentinel for worker in self._workers]
+            ready = wait([self._wake_reader, *workers, *sentinels], timeout=0.5)
+
+            # Tous les résultats disponibles sont traités avant de contrôler les processus
+            for conn in ready:
+                if conn in workers:
+                    self._receive(workers[conn])
+
+            stop = False
+            while self._wake_reader.poll():
+                stop = self._wake_reader.recv() == "stop" or stop
+            if stop:
+                self._fail_all(RuntimeError("ExtractionPool fermé"))
+                for worker in self._workers:
+                    try:
+                        worker.conn.send(None)
+                    except OSError:
+                        pass
+                return
+
+            try:
+                self._check_workers()
+                self._dispatch()
+            except Exception:
+                traceback.print_exc()
+
+    def _receive(self, worker):
+        """
+        Lit les messages disponibles d'un processus.
+        """
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                if message[0] == "start":
+                    worker.current = message[1]
+                    worker.started_at = time.monotonic()
+                else:
+                    _, task_id, text, error = message
+                    self._finish(worker, task_id, text, error)
+        except (EOFError, OSError):
+            pass  # processus arrêté : remplacé par _check_workers
+
+    def _finish(self, worker, task_id, text, error):
+        if worker.assigned and worker.assigned[0][0] == task_id:
+            worker.assigned.popleft()
+        if worker.current == task_id:
+            worker.current = None
+            worker.started_at = None
+
+        with self._lock:
+            self._attempts.pop(task_id, None)
+            future = self._futures.pop(task_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(text)
+
+    def _check_workers(self):
+        """
+        Tue les processus bloqués au-delà du délai et remplace les processus morts ;
+        les fichiers restants de leur paquet sont remis en tête de file.
+        """
+        now = time.monotonic()
+        for worker_id, worker in enumerate(self._workers):
+            timed_out = worker.started_at is not None and now - worker.started_at > self.timeout
+            crashed = not worker.process.is_alive()
+            if not (timed_out or crashed):
+                continue
+
+            if timed_out:
+                self.timeouts += 1
+                worker.process.terminate()
+                error = TimeoutError(f"extraction interrompue après {self.timeout}s")
+            else:
+                self.crashes += 1
+                error = RuntimeError(f"processus d'extraction arrêté (code {worker.process.exitcode})")
+            worker.process.join(timeout=5)
+            # Résultats envoyés avant l'arrêt du processus ; un message tronqué finit la lecture
+            self._receive(worker)
+            worker.conn.close()
+
+            # Les fichiers d'un paquet sont traités dans l'ordre : le premier non terminé
+            # est celui en cours, même si son message "start" n'a pas été reçu.
+            culprit = worker.current
+            if culprit is None and worker.assigned:
+                culprit = worker.assigned[0][0]
+
+            failed = []
+            remaining = []
+            with self._lock:
+                for task_id, path in worker.assigned:
+                    if task_id not in self._futures:
+                        continue
+                    self._attempts[task_id] = self._attempts.get(task_id, 0) + 1
+                    if task_id == culprit or self._attempts[task_id] >= MAX_ATTEMPTS:
+                        failed.append(self._futures.pop(task_id))
+                        self._attempts.pop(task_id)
+                    else:
+                        remaining.append((task_id, path))
+                self._pending.extendleft(reversed(remaining))
+            for future in failed:
+                if not future.done():
+                    future.set_exception(error)
+
+            self._workers[worker_id] = _Worker(self._context, self._limits)
+
+    def _dispatch(self):
+        """
+        Envoie un paquet de chemins à chaque processus inactif.
+        """
+        for worker in self._workers:
+            if worker.assigned:
+                continue
+            with self._lock:
+                chunk = [self._pending.popleft() for _ in range(min(self.chunk_size, len(self._pending)))]
+            if not chunk:
+                return
+            try:
+                worker.conn.send(chunk)
+            except OSError:
+                # Processus mort entre-temps : paquet remis en tête de file, processus remplacé au tour suivant
+                with self._lock:
+                    self._pending.extendleft(reversed(chunk))
+                continue
+            worker.assigned.extend(chunk)
+
+    def _fail_all(self, error):
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._pending.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
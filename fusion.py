@@ -0,0 +1,178 @@
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from preprocessing import preprocess_text
+from vector_store import open_store_for
+from matcher import CVMatcher, DEFAULT_K, load_results, result_spaces, sentence_transformer_encoder, top_k
+
+
+# Recherche multi-modèles avec fusion des scores.
+# Le vecteur concaténé de test9 (768 + 384 + 384 dimensions, non normalisé) donne un produit
+# scalaire dominé par all-MPNet-base-v2. Ici chaque modèle est interrogé dans son propre espace
+# (vecteurs normalisés, une recherche par modèle en parallèle : les produits matriciels NumPy
+# libèrent le GIL), puis les résultats sont fusionnés :
+#   - "weighted" : scores cosinus centrés-réduits par requête (z-score sur les CV candidats),
+#     puis somme pondérée ;
+#   - "rrf" : Reciprocal Rank Fusion, somme des poids / (RRF_K + rang) sur les rrf_depth premiers
+#     de chaque modèle (insensible à l'échelle des scores).
+# La latence de chaque modèle (encodage de la requête + recherche) est mesurée à chaque requête.
+
+FUSION_METHODS = ("weighted", "rrf")
+RRF_K = 60
+DEFAULT_RRF_DEPTH = 100
+
+
+def _zscore(scores):
+    # Centrage-réduction par ligne, sur les seuls scores finis (CV hors filtre = -inf)
+    finite = np.isfinite(scores)
+    count = np.maximum(finite.sum(axis=1, keepdims=True), 1)
+    values = np.where(finite, scores, 0.0)
+    mean = values.sum(axis=1, keepdims=True) / count
+    std = np.sqrt((np.where(finite, values - mean, 0.0) ** 2).sum(axis=1, keepdims=True) / count)
+    std[std == 0] = 1.0
+    return np.where(finite, (scores - mean) / std, -np.inf)
+
+
+class FusionMatcher:
+    def __init__(self, matchers, weights=None, method="weighted", rrf_depth=DEFAULT_RRF_DEPTH):
+        """
+        matchers : {modèle: CVMatcher} sur les mêmes CV (même ordre), chacun avec son encodeur.
+        weights : {modèle: poids} (1 par défaut) ; un poids nul exclut le modèle.
+        """
+        if method not in FUSION_METHODS:
+            raise ValueError(f"méthode de fusion inconnue : {method} (choix : {', '.join(FUSION_METHODS)})")
+        self.matchers = dict(matchers)
+        self.weights = {model: (weights or {}).get(model, 1.0) for model in self.matchers}
+        self.method = method
+        self.rrf_depth = rrf_depth
+        self.latencies = {model: [] for model in self.matchers}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.matchers), thread_name_prefix="fusion")
+
+    @classmethod
+    def from_results(cls, results_file, models=None, weights=None, method="weighted",
+                     rrf_depth=DEFAULT_RRF_DEPTH, encoders=None):
+        """
+        Un CVMatcher par modèle (espace du dossier de vecteurs, ou clés des anciens "cv_vector" dict).
+        encoders : {modèle: fonction texte -> vecteur} ; par défaut le SentenceTransformer du même nom.
+        """
+        vector_store = open_store_for(results_file)
+        models = models or result_spaces(results_file, vector_store)
+        records, matrices = load_results(results_file, models, vector_store)
+        encoders = encoders or {}
+        return cls(
+            {
+                model: CVMatcher(matrices[model], records,
+                                 encode=encoders.get(model) or sentence_transformer_encoder([model]))
+                for model in models
+            },
+            weights=weights, method=method, rrf_depth=rrf_depth,
+        )
+
+    def _search_model(self, model, texts, mask, depth):
+        matcher = self.matchers[model]
+        start = time.perf_counter()
+        queries = np.vstack([matcher.encode(text) for text in texts])
+        encoded = time.perf_counter()
+        if self.method == "rrf":
+            result = matcher.search_vectors(queries, k=depth, mask=mask)[1]
+        else:
+            result = _zscore(_masked_scores(matcher, queries, mask))
+        end = time.perf_counter()
+        self.latencies[model].append((encoded - start, end - encoded, len(texts)))
+        return result
+
+    def match_batch(self, job_descriptions, k=DEFAULT_K, **filters):
+        """
+        Pour chaque offre, les k CV les mieux classés après fusion : [(file_name, score), ...].
+        Filtres : voir CVMatcher.mask().
+        """
+        models = [model for model, weight in self.weights.items() if weight]
+        reference = self.matchers[models[0]]
+        mask = reference.mask(**filters)
+        texts = [preprocess_text(text, remove_stopwords=False) for text in job_descriptions]
+        depth = max(k, self.rrf_depth)
+
+        futures = {model: self._executor.submit(self._search_model, model, texts, mask, depth) for model in models}
+        results = {model: future.result() for model, future in futures.items()}
+
+        fused = np.zeros((len(texts), len(reference)), dtype=np.float32)
+        if self.method == "rrf":
+            ranks = np.arange(depth)
+            for model, indices in results.items():
+                for row, row_indices in enumerate(indices):
+                    valid = row_indices >= 0
+                    np.add.at(fused[row], row_indices[valid], self.weights[model] / (RRF_K + 1 + ranks[valid]))
+            if mask is not None:
+                fused[:, ~mask] = -np.inf
+            fused[fused == 0] = -np.inf
+        else:
+            for model, scores in results.items():
+                fused += self.weights[model] * scores
+        return reference.results(*top_k(fused, k))
+
+    def match(self, job_description, k=DEFAULT_K, **filters):
+        return self.match_batch([job_description], k=k, **filters)[0]
+
+    def latency_stats(self):
+        """
+        Latence par requête et par modèle, en ms : {modèle: {"encode_p50", "search_p50", "total_p95", ...}}.
+        """
+        stats = {}
+        for model, measures in self.latencies.items():
+            if not measures:
+                continue
+            encode = np.array([e / n for e, _, n in measures]) * 1000
+            search = np.array([s / n for _, s, n in measures]) * 1000
+            stats[model] = {
+                "queries": int(sum(n for _, _, n in measures)),
+                "encode_p50": float(np.percentile(encode, 50)),
+                "search_p50": float(np.percentile(search, 50)),
+                "total_p50": float(np.percentile(encode + search, 50)),
+                "total_p95": float(np.percentile(encode + search, 95)),
+            }
+        return stats
+
+    def close(self):
+        self._executor.shutdown()
+
+
+def _masked_scores(matcher, queries, mask):
+    # Scores sur tous les CV (-inf hors filtre), pour additionner les modèles colonne à colonne
+    scores, candidates = matcher.scores(queries, mask)
+    if candidates is None:
+        return scores
+    full = np.full((len(scores), len(matcher)), -np.inf, dtype=np.float32)
+    full[:, candidates] = scores
+    return full
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV les plus proches d'une offre, fusion des modèles d'embedding.")
+    parser.add_argument("results_file", help="Fichier de résultats de test8.py / test9.py")
+    parser.add_argument("job_description", nargs="+", help="Texte(s) des offres")
+    parser.add_argument("--method", choices=FUSION_METHODS, default="weighted")
+    parser.add_argument("--weight", action="append", default=[], metavar="MODELE=POIDS")
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--domaine")
+    parser.add_argument("--langue", action="append", dest="langues")
+    parser.add_argument("--max-salaire", type=float)
+    parser.add_argument("--min-salaire", type=float)
+    args = parser.parse_args()
+
+    weights = {name: float(value) for name, value in (item.rsplit("=", 1) for item in args.weight)}
+    fusion = FusionMatcher.from_results(args.results_file, weights=weights, method=args.method)
+    filters = dict(domaine=args.domaine, langues=args.langues,
+                   max_salaire=args.max_salaire, min_salaire=args.min_salaire)
+    for job_description in args.job_description:
+        print(f"\n{job_description}")
+        for file_name, score in fusion.match(job_description, k=args.k, **filters):
+            print(f"{score:8.3f}  {file_name}")
+
+    print("\nLatence par modèle (ms par requête) :")
+    for model, stats in fusion.latency_stats().items():
+        print(f"  {model:<28} encodage {stats['encode_p50']:7.1f}  recherche {stats['search_p50']:6.1f}  "
+              f"total p50 {stats['total_p50']:7.1f}  p95 {stats['total_p95']:7.1f}")
+    fusion.close()
@@ -1,5 +1,5 @@
 import os
-import json
+from json_stream import iter_records
 import shutil
 
 # Configurations
@@ -7,12 +7,8 @@ dossier_source = "Cvs_telecharges"  # Dossier contenant les fichiers CVs
 dossier_destination = "cvs_nontraites"  # Dossier où copier les CVs correspondants
 json_file = "cv_incomplets.json"  # Fichier JSON contenant les noms des fichiers CVs
 
-# Charger les noms des fichiers depuis le JSON
-with open(json_file, "r", encoding="utf-8") as file:
-    cvs_data = json.load(file)
-
-# Extraire les noms des fichiers depuis le JSON
-file_names_in_json = {cv["file_name"] for cv in cvs_data}
+# Extraire les noms des fichiers depuis le JSON, lu en flux (vecteurs ignorés)
+file_names_in_json = {cv["file_name"] for cv in iter_records(json_file, skip_vectors=True)}
 
 # Vérifier que le dossier de destination existe, sinon le créer
 if not os.path.exists(dossier_destination):
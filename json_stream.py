@@ -0,0 +1,221 @@
+import os
+import re
+import json
+
+
+# Lecture en flux des fichiers de résultats (un CV à la fois, mémoire constante).
+# - Tableau JSON historique (cvs.json, cv.json...) : lecture par blocs ; les limites de chaque
+#   enregistrement sont trouvées par une regex (chaînes et accolades), puis l'enregistrement
+#   seul est décodé.
+# - Journal JSONL : une ligne = un enregistrement.
+# skip_vectors=True remplace cv_vector par null avant le décodage : les milliers de flottants
+# par CV ne sont ni convertis ni gardés en mémoire quand seul le reste est utile.
+
+CHUNK_SIZE = 1 << 16
+
+# Chaîne JSON complète, ou accolade
+_TOKEN_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+# Valeur de cv_vector : liste de nombres, liste de listes, ou objet {modèle: liste}
+_ARRAY = r'\[[^\[\]{}"]*(?:\[[^\[\]{}"]*\][^\[\]{}"]*)*\]'
+_VECTOR_PATTERN = re.compile(
+    r'("cv_vector"\s*:\s*)(?:' + _ARRAY + r'|\{[^{}\[\]]*(?:' + _ARRAY + r'[^{}\[\]]*)*\})'
+)
+
+
+def _strip_vectors(text):
+    return _VECTOR_PATTERN.sub(r'\1null', text)
+
+
+def _is_jsonl(file_path):
+    """
+    Un tableau JSON commence par "[" ; sinon le fichier est lu comme du JSONL.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(1024)
+            if not chunk:
+                return True
+            stripped = chunk.lstrip()
+            if stripped:
+                return not stripped.startswith("[")
+
+
+def iter_jsonl(file_path, skip_vectors=False):
+    """
+    Enregistrements d'un fichier JSONL ; les lignes invalides (ex. dernière ligne tronquée)
+    sont ignorées avec un avertissement.
+    """
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if skip_vectors:
+                line = _strip_vectors(line)
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Warning: ligne {line_number} invalide dans {file_path}, ignorée.")
+
+
+def _record_end(buffer, start):
+    """
+    Position de fin de l'objet qui commence à start, ou None s'il n'est pas complet dans buffer.
+    """
+    depth = 0
+    for match in _TOKEN_PATTERN.finditer(buffer, start):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+def iter_json_array(file_path, skip_vectors=False):
+    """
+    Éléments d'un tableau JSON d'objets, lus un par un sans charger le fichier.
+    Lève json.JSONDecodeError si le fichier est invalide.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        position = 0
+        eof = False
+        started = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        while True:
+            # Séparateurs entre éléments : espaces, "[" initial, virgules
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,[":
+                    if buffer[position] == "[":
+                        if started:
+                            raise json.JSONDecodeError("tableau imbriqué inattendu", buffer, position)
+                        started = True
+                    position += 1
+                if position < len(buffer) or eof:
+                    break
+                fill()
+
+            if position >= len(buffer):
+                if started:
+                    raise json.JSONDecodeError("fin de fichier avant ']'", buffer, position)
+                return
+            if not started:
+                raise json.JSONDecodeError("tableau JSON attendu", buffer, position)
+            if buffer[position] == "]":
+                return
+
+            # Décodage d'un enregistrement complet (plus de données lues si nécessaire)
+            while True:
+                end = _record_end(buffer, position) if buffer[position] == "{" else None
+                if end is not None:
+                    text = buffer[position:end]
+                    try:
+                        record = json.loads(_strip_vectors(text) if skip_vectors else text)
+                        break
+                    except json.JSONDecodeError:
+                        # Limite mal détectée (chaîne coupée en fin de bloc) : on relit plus loin
+                        if eof:
+                            raise
+                elif eof:
+                    # Élément qui n'est pas un objet, ou objet incomplet : erreur de json
+                    record, end = decoder.raw_decode(buffer, position)
+                    break
+                fill()
+            yield record
+            position = end
+
+
+def iter_records(file_path, skip_vectors=False):
+    """
+    Enregistrements d'un fichier de résultats, un par un : tableau JSON ou JSONL.
+    """
+    if not os.path.exists(file_path):
+        return iter(())
+    if _is_jsonl(file_path):
+        return iter_jsonl(file_path, skip_vectors=skip_vectors)
+    return iter_json_array(file_path, skip_vectors=skip_vectors)
+
+
+def iter_batches(records, batch_size):
+    """
+    Regroupe un flux d'enregistrements en listes de batch_size éléments.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_file_names(results_file):
+    """
+    Ensemble des file_name d'un fichier de résultats (vecteurs non décodés).
+    Un fichier invalide est signalé et compte pour vide.
+    """
+    file_names = set()
+    try:
+        for record in iter_records(results_file, skip_vectors=True):
+            if "file_name" in record:
+                file_names.add(record["file_name"])
+    except json.JSONDecodeError:
+        print(f"Warning: fichier JSON invalide ({results_file}), on va le remplacer.")
+        return set()
+    return file_names
+
+
+def write_json_array(output_file, records):
+    """
+    Écrit les enregistrements en tableau JSON indenté, au fil de l'eau.
+    L'écriture passe par un fichier temporaire : output_file n'est jamais à moitié écrit.
+    Renvoie le nombre d'enregistrements.
+    """
+    tmp_file = output_file + ".tmp"
+    count = 0
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for record in records:
+            block = json.dumps(record, indent=4, ensure_ascii=False)
+            f.write(",\n" if count else "\n")
+            f.write("\n".join("    " + line for line in block.splitlines()))
+            count += 1
+        f.write("\n]" if count else "]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, output_file)
+    return count
+
+
+def _valid_records(results_file):
+    try:
+        yield from iter_records(results_file)
+    except json.JSONDecodeError:
+        print(f"Warning: fichier JSON invalide ({results_file}), seuls les enregistrements lisibles sont repris.")
+
+
+def append_to_json_array(results_file, new_records):
+    """
+    Réécrit results_file avec ses enregistrements existants suivis de new_records,
+    sans charger le fichier existant en mémoire. Renvoie le nombre total d'enregistrements.
+    """
+    def records():
+        yield from _valid_records(results_file)
+        yield from new_records
+    return write_json_array(results_file, records())
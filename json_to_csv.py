@@ -1,19 +1,19 @@
-import json
 import csv
+from json_stream import iter_records
 
 # Fonction pour convertir JSON en CSV
 def json_to_csv(json_file, csv_file):
-    with open(json_file, 'r', encoding='utf-8') as infile:
-        data = json.load(infile)
-
-    # Assurez-vous que les données sont une liste de dictionnaires
-    if not isinstance(data, list):
-        data = [data]
+    # Lecture en flux : un enregistrement à la fois (tableau JSON ou JSONL)
+    data = iter_records(json_file)
+    first_row = next(data, None)
+    if first_row is None:
+        return
 
     # Ouvrir le fichier CSV pour écrire les données
     with open(csv_file, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=data[0].keys())
+        writer = csv.DictWriter(outfile, fieldnames=first_row.keys())
         writer.writeheader()
+        writer.writerow(first_row)
         for row in data:
             writer.writerow(row)
 
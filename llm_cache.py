@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from threading import Lock
+
+
+# Cache local des réponses du modèle génératif (analyze_cv).
+# Clé = empreinte de (nom du modèle, generation_config, version du prompt, hash du texte du CV) :
+# un CV retraité avec le même prompt et la même configuration ne coûte aucun appel API.
+# Chaque entrée conserve la réponse brute et le JSON parsé, avec une date d'expiration optionnelle.
+
+
+def prompt_fingerprint(model_name, generation_config, prompt_version, cv_text):
+    """
+    Empreinte SHA-256 stable de tout ce qui détermine la réponse du modèle.
+    """
+    payload = json.dumps(
+        {
+            "model_name": model_name,
+            "generation_config": generation_config,
+            "prompt_version": prompt_version,
+            "cv_text_hash": hashlib.sha256(cv_text.encode("utf-8")).hexdigest(),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, db_file, default_ttl=None):
+        """
+        default_ttl : durée de validité en secondes des nouvelles entrées (None = illimitée).
+        """
+        self.db_file = db_file
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                raw_response TEXT NOT NULL,
+                parsed_json TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, cache_key):
+        """
+        Renvoie {"raw": ..., "parsed": ...} si une entrée valide existe, sinon None.
+        "parsed" vaut None si la réponse n'était pas un JSON valide.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT raw_response, parsed_json, expires_at FROM responses WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None or (row[2] is not None and row[2] < time.time()):
+                self.misses += 1
+                return None
+            self.hits += 1
+        raw_response, parsed_json, _ = row
+        return {
+            "raw": raw_response,
+            "parsed": json.loads(parsed_json) if parsed_json is not None else None,
+        }
+
+    def put(self, cache_key, model_name, prompt_version, raw_response, parsed, ttl=None):
+        """
+        Enregistre (ou remplace) la réponse. ttl en secondes, sinon default_ttl.
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        parsed_json = json.dumps(parsed, ensure_ascii=False) if parsed is not None else None
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (cache_key, model_name, prompt_version, raw_response, parsed_json, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (cache_key, model_name, prompt_version, raw_response, parsed_json, now, expires_at),
+            )
+            self._db.commit()
+
+    def invalidate(self, cache_key):
+        """
+        Supprime une entrée : le prochain appel refera la requête à l'API.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+            self._db.commit()
+
+    def invalidate_before(self, timestamp):
+        """
+        Supprime les entrées créées avant timestamp. Renvoie le nombre d'entrées supprimées.
+        """
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM responses WHERE created_at < ?", (timestamp,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def purge_expired(self):
+        """
+        Supprime les entrées expirées. Renvoie le nombre d'entrées supprimées.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance du cache des réponses LLM.")
+    parser.add_argument("db_file", help="Fichier SQLite du cache (ex. llm_cache.sqlite)")
+    parser.add_argument("--purge-expired", action="store_true", help="Supprime les entrées expirées")
+    parser.add_argument("--older-than-days", type=float,
+                        help="Supprime les entrées créées il y a plus de N jours")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_file):
+        print(f"Erreur: le cache {args.db_file} n'existe pas.")
+        exit()
+
+    cache = LLMCache(args.db_file)
+    if args.purge_expired:
+        print(f"{cache.purge_expired()} entrées expirées supprimées.")
+    if args.older_than_days is not None:
+        count = cache.invalidate_before(time.time() - args.older_than_days * 86400)
+        print(f"{count} entrées de plus de {args.older_than_days} jours supprimées.")
+    cache.close()
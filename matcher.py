@@ -0,0 +1,287 @@
+import time
+import argparse
+
+import numpy as np
+
+from preprocessing import preprocess_text, strip_accents
+from json_stream import iter_records
+from vector_store import load_vector, open_store_for
+from model_registry import default_registry, configured_models
+
+
+# Appariement offre -> CV par recherche exacte (référence avant l'index IVF de ann_index.py).
+# Tous les vecteurs sont chargés une fois dans une matrice float32 contiguë et normalisée :
+# le score cosinus d'une offre (ou d'un lot d'offres) est un seul produit matriciel,
+# suivi d'une sélection des k meilleurs par argpartition (linéaire, sans tri complet).
+# Les champs structurés de l'analyse (domaine_etude, langues, exp_salaire) sont gardés en tableaux
+# NumPy pour filtrer par masque booléen avant le calcul des scores.
+
+DEFAULT_K = 10
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _language_key(language):
+    # "Français", "francais ", "FRANÇAIS" -> "francais"
+    return strip_accents(str(language).casefold()).strip()
+
+
+def _salary(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_results(results_file, spaces=None, vector_store=None):
+    """
+    Lit un fichier de résultats (test8/test9) : (métadonnées des CV, {espace: matrice des vecteurs}).
+    Les vecteurs viennent du dossier binaire du fichier ("cv_vector_row") ou du champ "cv_vector"
+    des anciens résultats ; un même fichier peut mélanger les deux (journal de test9 repris d'un
+    ancien cv2.json). spaces=None : un seul espace, tous les modèles concaténés (clé None).
+    """
+    vector_store = vector_store or open_store_for(results_file)
+    records, sources, skipped = [], [], 0
+    # Pas de skip_vectors : les enregistrements "cv_vector_row" n'ont pas de "cv_vector" à décoder,
+    # les anciens en ont besoin
+    for record in iter_records(results_file):
+        if record.get("cv_vector_row") is not None:
+            if vector_store is None:
+                raise ValueError(f"{results_file} : cv_vector_row présent mais aucun dossier de vecteurs")
+            source = record["cv_vector_row"]
+        else:
+            if spaces and isinstance(record.get("cv_vector"), list):
+                raise ValueError(f"{results_file} : vecteurs concaténés, les espaces par modèle ne sont pas disponibles")
+            source = {space: load_vector(record, space=space) for space in spaces or [None]}
+            if any(vector is None for vector in source.values()):
+                skipped += 1
+                continue
+        sources.append(source)
+        cv_info = record.get("cv", {}) or {}
+        records.append({
+            "file_name": record.get("file_name", ""),
+            "domaine_etude": cv_info.get("domaine_etude", ""),
+            "langues": cv_info.get("langues", []),
+            "exp_salaire": cv_info.get("exp_salaire"),
+        })
+    if skipped:
+        print(f"Warning: {skipped} CVs sans vecteur ignorés dans {results_file}.")
+
+    row_positions = [position for position, source in enumerate(sources) if not isinstance(source, dict)]
+    legacy_positions = [position for position, source in enumerate(sources) if isinstance(source, dict)]
+    matrices = {}
+    for space in spaces or [None]:
+        from_store = from_legacy = None
+        if row_positions:
+            # Copie des lignes utiles (dans l'ordre du fichier) en matrice contiguë
+            indices = [sources[position] for position in row_positions]
+            from_store = np.concatenate(
+                [vector_store.matrix(name)[indices] for name in ([space] if space else vector_store.spaces)], axis=1
+            )
+        if legacy_positions:
+            from_legacy = np.array([sources[position][space] for position in legacy_positions], dtype=np.float32)
+        if from_store is not None and from_legacy is not None and from_store.shape[1] != from_legacy.shape[1]:
+            raise ValueError(f"{results_file} : dimensions différentes entre cv_vector_row ({from_store.shape[1]}) "
+                             f"et cv_vector ({from_legacy.shape[1]}) : lancer vector_store.py pour migrer")
+        dim = (from_store if from_store is not None else from_legacy).shape[1] if sources else 0
+        matrix = np.empty((len(sources), dim), dtype=np.float32)
+        if from_store is not None:
+            matrix[row_positions] = from_store
+        if from_legacy is not None:
+            matrix[legacy_positions] = from_legacy
+        matrices[space] = matrix
+    return records, matrices
+
+
+def result_spaces(results_file, vector_store=None):
+    """
+    Modèles dont viennent les vecteurs d'un fichier de résultats, dans l'ordre de concaténation :
+    espaces du dossier de vecteurs, sinon clés du premier "cv_vector" {modèle: liste} ; pour des
+    vecteurs concaténés sans nom de modèle, les modèles de la configuration (EMBEDDING_MODELS).
+    """
+    vector_store = vector_store or open_store_for(results_file)
+    # "cv_vector" : espace unique créé par la migration d'anciens vecteurs concaténés
+    if vector_store is not None and vector_store.spaces and vector_store.spaces != ["cv_vector"]:
+        return list(vector_store.spaces)
+    for record in iter_records(results_file):
+        vector = record.get("cv_vector")
+        if isinstance(vector, dict) and vector:
+            return list(vector)
+        if vector:
+            break
+    return configured_models()
+
+
+def top_k(scores, k):
+    """
+    k meilleurs scores de chaque ligne (m x n) : (scores, colonnes), m x k, triés par score
+    décroissant ; argpartition évite le tri complet. -inf / -1 au-delà des colonnes disponibles.
+    """
+    count = min(k, scores.shape[1])
+    top_scores = np.full((len(scores), k), -np.inf, dtype=np.float32)
+    top_indices = np.full((len(scores), k), -1, dtype=np.int64)
+    if count:
+        top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        top_values = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_values, axis=1)
+        top_scores[:, :count] = np.take_along_axis(top_values, order, axis=1)
+        top_indices[:, :count] = np.take_along_axis(top, order, axis=1)
+        top_indices[np.isneginf(top_scores)] = -1
+    return top_scores, top_indices
+
+
+class CVMatcher:
+    def __init__(self, vectors, records, encode=None):
+        """
+        vectors : matrice (n x dim) des vecteurs de CV, dans l'ordre de records.
+        records : pour chaque CV, {"file_name", "domaine_etude", "langues", "exp_salaire"}.
+        encode : fonction texte prétraité -> vecteur (même modèle que les CV), pour match().
+        """
+        self.encode = encode
+        self.vectors = _normalize_rows(np.array(vectors, dtype=np.float32, order="C"))
+        self.file_names = np.array([record.get("file_name", "") for record in records], dtype=object)
+        self.domaines = np.array(
+            [strip_accents((record.get("domaine_etude") or "").casefold()) for record in records], dtype=str
+        )
+        self.salaires = np.array([_salary(record.get("exp_salaire")) for record in records], dtype=np.float64)
+
+        # Langues : une colonne booléenne par langue rencontrée
+        self.languages = {}
+        rows, columns = [], []
+        for row, record in enumerate(records):
+            for language in record.get("langues") or []:
+                rows.append(row)
+                columns.append(self.languages.setdefault(_language_key(language), len(self.languages)))
+        self.language_matrix = np.zeros((len(records), len(self.languages)), dtype=bool)
+        self.language_matrix[rows, columns] = True
+
+    def __len__(self):
+        return len(self.file_names)
+
+    @classmethod
+    def from_results(cls, results_file, model=None, vector_store=None, encode=None):
+        """
+        Charge les CV d'un fichier de résultats (test8/test9) pour un espace (model) ou pour
+        tous les modèles concaténés (model=None). Sans encode, la requête est encodée par le(s)
+        modèle(s) SentenceTransformer de même nom que les espaces.
+        """
+        vector_store = vector_store or open_store_for(results_file)
+        records, matrices = load_results(results_file, [model] if model else None, vector_store)
+        if encode is None:
+            # Quel que soit le format des vecteurs (dossier binaire ou anciens "cv_vector")
+            encode = sentence_transformer_encoder([model] if model else result_spaces(results_file, vector_store))
+        return cls(matrices[model], records, encode=encode)
+
+    def mask(self, domaine=None, langues=None, max_salaire=None, min_salaire=None):
+        """
+        Masque booléen des CV qui passent les filtres (None = tous) :
+        domaine : sous-chaîne de domaine_etude (casse et accents ignorés) ;
+        langues : toutes ces langues doivent figurer dans le CV ;
+        max_salaire / min_salaire : bornes sur exp_salaire (un salaire absent passe le filtre).
+        """
+        mask = None
+
+        def combine(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if domaine:
+            combine(np.char.find(self.domaines, strip_accents(domaine.casefold())) >= 0)
+        for language in langues or []:
+            column = self.languages.get(_language_key(language))
+            if column is None:
+                return np.zeros(len(self), dtype=bool)
+            combine(self.language_matrix[:, column])
+        if max_salaire is not None:
+            combine(~(self.salaires > max_salaire))
+        if min_salaire is not None:
+            combine(~(self.salaires < min_salaire))
+        return mask
+
+    def scores(self, queries, mask=None):
+        """
+        Scores cosinus des vecteurs de requête (m x dim) : (scores, candidates).
+        candidates=None : scores sur tous les CV (m x n), -inf hors du masque ;
+        sinon scores sur les seules lignes candidates (filtre sélectif, produit réduit).
+        """
+        queries = _normalize_rows(np.array(queries, dtype=np.float32, ndmin=2))
+        if mask is None:
+            return queries @ self.vectors.T, None
+        candidates = np.flatnonzero(mask)
+        if len(candidates) < len(self) // 2:
+            return queries @ self.vectors[candidates].T, candidates
+        scores = queries @ self.vectors.T
+        scores[:, ~mask] = -np.inf
+        return scores, None
+
+    def search_vectors(self, queries, k=DEFAULT_K, mask=None):
+        """
+        k meilleurs CV pour chaque vecteur de requête (m x dim) : (scores, indices), m x k,
+        triés par score décroissant ; -inf / -1 au-delà des CV disponibles.
+        """
+        scores, candidates = self.scores(queries, mask)
+        top_scores, top_indices = top_k(scores, k)
+        if candidates is not None:
+            top_indices = np.where(top_indices >= 0, candidates[np.maximum(top_indices, 0)], -1)
+        return top_scores, top_indices
+
+    def match_batch(self, job_descriptions, k=DEFAULT_K, **filters):
+        """
+        Pour chaque offre (texte), liste des k CV les plus proches : [(file_name, score), ...].
+        Filtres : voir mask().
+        """
+        if self.encode is None:
+            raise ValueError("aucun encodeur : passer encode=... au CVMatcher")
+        queries = [self.encode(preprocess_text(text, remove_stopwords=False)) for text in job_descriptions]
+        scores, indices = self.search_vectors(np.vstack(queries), k=k, mask=self.mask(**filters))
+        return self.results(scores, indices)
+
+    def results(self, scores, indices):
+        """
+        [(file_name, score), ...] par requête, à partir de search_vectors / top_k.
+        """
+        return [
+            [(self.file_names[index], float(score)) for score, index in zip(row_scores, row_indices) if index >= 0]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+
+    def match(self, job_description, k=DEFAULT_K, **filters):
+        return self.match_batch([job_description], k=k, **filters)[0]
+
+
+def sentence_transformer_encoder(model_names, registry=default_registry):
+    """
+    Encodeur (modèles chargés à la première requête, via le registre) :
+    concaténation des embeddings des modèles, dans l'ordre.
+    """
+    def encode(text):
+        return np.concatenate([registry.get(name).encode(text) for name in model_names])
+
+    return encode
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV les plus proches d'une offre (recherche exacte).")
+    parser.add_argument("results_file", help="Fichier de résultats de test8.py / test9.py")
+    parser.add_argument("job_description", help="Texte de l'offre")
+    parser.add_argument("--model", help="Espace / modèle utilisé (par défaut : tous les modèles concaténés)")
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--domaine")
+    parser.add_argument("--langue", action="append", dest="langues")
+    parser.add_argument("--max-salaire", type=float)
+    parser.add_argument("--min-salaire", type=float)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    matcher = CVMatcher.from_results(args.results_file, model=args.model)
+    print(f"{len(matcher)} CVs chargés en {time.perf_counter() - start:.1f}s.")
+    for file_name, score in matcher.match(
+        args.job_description, k=args.k, domaine=args.domaine, langues=args.langues,
+        max_salaire=args.max_salaire, min_salaire=args.min_salaire,
+    ):
+        print(f"{score:.3f}  {file_name}")
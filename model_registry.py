@@ -0,0 +1,144 @@
+import os
+import time
+import threading
+
+
+# Registre des modèles d'embedding, chargés à la première utilisation.
+# Charger les trois SentenceTransformer (et importer torch) prend des dizaines de secondes
+# et plus d'1 Go de mémoire : un passage sans nouveau CV, ou dont tous les textes sont déjà
+# dans le cache d'embeddings, ne doit pas payer ce coût.
+# - get(nom) charge le modèle une seule fois, même appelé par plusieurs threads ;
+#   un verrou par modèle : le chargement d'un modèle ne bloque pas l'accès aux autres.
+# - lazy_models(noms) renvoie des mandataires à passer à EmbeddingService : le modèle n'est
+#   chargé qu'au premier encode() réel (après échec du cache).
+# - idle_timeout : un modèle inutilisé depuis ce délai est déchargé (rechargé au besoin).
+
+DEFAULT_MODELS = ["all-MPNet-base-v2", "paraphrase-MiniLM-L12-v2", "all-MiniLM-L12-v2"]
+
+
+def configured_models(env_var="EMBEDDING_MODELS"):
+    """
+    Modèles d'embedding de la configuration (variable d'environnement, noms séparés par des virgules),
+    dans l'ordre de concaténation ; DEFAULT_MODELS si la variable est absente.
+    """
+    value = os.getenv(env_var)
+    if not value:
+        return list(DEFAULT_MODELS)
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def load_sentence_transformer(name):
+    # Import différé : sentence_transformers importe torch (plusieurs secondes)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+class ModelRegistry:
+    def __init__(self, loader=load_sentence_transformer, idle_timeout=None):
+        """
+        loader : fonction nom -> modèle.
+        idle_timeout : secondes d'inactivité avant déchargement d'un modèle (None = jamais).
+        """
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self.loads = 0
+        self._models = {}
+        self._last_used = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = None
+        if idle_timeout:
+            self._reaper = threading.Thread(target=self._reap, name="model-registry", daemon=True)
+            self._reaper.start()
+
+    def _model_lock(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """
+        Modèle chargé (au premier appel seulement).
+        """
+        model = self._models.get(name)
+        if model is None:
+            with self._model_lock(name):
+                model = self._models.get(name)
+                if model is None:
+                    start = time.perf_counter()
+                    model = self.loader(name)
+                    self.loads += 1
+                    print(f"Modèle {name} chargé en {time.perf_counter() - start:.1f}s.")
+                    with self._lock:
+                        self._models[name] = model
+        self._last_used[name] = time.monotonic()
+        return model
+
+    def loaded(self):
+        """
+        Noms des modèles actuellement en mémoire.
+        """
+        with self._lock:
+            return list(self._models)
+
+    def unload(self, name):
+        with self._model_lock(name):
+            with self._lock:
+                removed = self._models.pop(name, None) is not None
+                self._last_used.pop(name, None)
+        if removed:
+            print(f"Modèle {name} déchargé.")
+        return removed
+
+    def unload_idle(self, idle_timeout=None):
+        """
+        Décharge les modèles inutilisés depuis idle_timeout secondes ; renvoie leurs noms.
+        """
+        idle_timeout = idle_timeout if idle_timeout is not None else self.idle_timeout
+        if idle_timeout is None:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            idle = [name for name, last_used in self._last_used.items() if now - last_used >= idle_timeout]
+        return [name for name in idle if self.unload(name)]
+
+    def _reap(self):
+        while not self._stop.wait(max(self.idle_timeout / 2, 1.0)):
+            self.unload_idle()
+
+    def lazy_models(self, names):
+        """
+        {nom: mandataire} pour EmbeddingService, dans l'ordre de names.
+        """
+        return {name: LazyModel(self, name) for name in names}
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._models.clear()
+            self._last_used.clear()
+
+
+class LazyModel:
+    """
+    Mandataire d'un modèle du registre : encode() charge le modèle au premier appel.
+    """
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def encode(self, *args, **kwargs):
+        return self.registry.get(self.name).encode(*args, **kwargs)
+
+    def __getattr__(self, attribute):
+        # tokenizer, max_seq_length... : attributs du modèle chargé
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        return getattr(self.registry.get(self.name), attribute)
+
+    def __repr__(self):
+        return f"LazyModel({self.name!r})"
+
+
+# Registre partagé par les modules de recherche (matcher, fusion, ann_index)
+default_registry = ModelRegistry()
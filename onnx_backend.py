@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+
+# Backend ONNX Runtime pour les modèles d'embedding (CPU).
+# Chaque SentenceTransformer est exporté une fois en ONNX (partie Transformer seulement) et mis en
+# cache sur disque avec son tokenizer ; le pooling (moyenne / CLS / max) et la normalisation L2
+# du modèle d'origine sont refaits en NumPy, pour rendre les mêmes vecteurs que model.encode().
+# Options :
+#   - quantification dynamique int8 des poids (quantize_dynamic), 2 à 4 fois plus rapide sur CPU ;
+#   - nombre de threads intra-op de la session (ONNX_THREADS).
+# À l'export, un contrôle de parité compare les vecteurs ONNX aux vecteurs torch sur des textes
+# de référence : sous le seuil de similarité cosinus, l'export est refusé (et supprimé).
+# Une fois l'export en cache, l'exécution n'importe ni torch ni sentence_transformers.
+
+DEFAULT_CACHE_DIR = "onnx_models"
+OPSET_VERSION = 14
+DEFAULT_BATCH_SIZE = 32
+# Similarité cosinus minimale (texte par texte) entre vecteurs ONNX et vecteurs torch
+PARITY_THRESHOLD = 0.999
+PARITY_THRESHOLD_INT8 = 0.98
+
+PARITY_TEXTS = [
+    "développeur python confirmé cinq ans d expérience django postgresql docker",
+    "chargée de recrutement bilingue français anglais gestion de la paie et des contrats",
+    "ingénieur génie civil suivi de chantier autocad béton armé",
+    "data scientist machine learning pandas scikit learn tableau de bord power bi",
+    "comptable expérimentée clôture mensuelle sage fiscalité tva",
+    "stage assistant marketing digital réseaux sociaux référencement naturel",
+    "technicien maintenance industrielle électricité automatismes",
+    "chef de projet informatique méthodes agiles scrum jira encadrement d équipe",
+]
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def export_dir(name, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, _safe_name(name))
+
+
+def _model_file(name, quantize, cache_dir):
+    return os.path.join(export_dir(name, cache_dir), "model.int8.onnx" if quantize else "model.onnx")
+
+
+def export_model(name, quantize=False, cache_dir=DEFAULT_CACHE_DIR, parity_texts=PARITY_TEXTS):
+    """
+    Exporte le SentenceTransformer name en ONNX (et en int8 si quantize), puis contrôle la parité
+    avec torch. Ne refait rien si l'export est déjà en cache. Renvoie le chemin du fichier .onnx.
+    """
+    model_file = _model_file(name, quantize, cache_dir)
+    if os.path.exists(model_file):
+        return model_file
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    directory = export_dir(name, cache_dir)
+    os.makedirs(directory, exist_ok=True)
+    st_model = SentenceTransformer(name, device="cpu")
+    transformer = st_model[0]
+    fp32_file = _model_file(name, False, cache_dir)
+
+    if not os.path.exists(fp32_file):
+        pooling = next(module for module in st_model if type(module).__name__ == "Pooling")
+        config = {
+            "name": name,
+            "max_seq_length": st_model.max_seq_length,
+            "do_lower_case": bool(getattr(transformer, "do_lower_case", False)),
+            "pooling": pooling.get_pooling_mode_str(),
+            "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+            "input_names": list(transformer.tokenizer.model_input_names),
+        }
+        transformer.tokenizer.save_pretrained(directory)
+
+        sample = transformer.tokenizer(["exemple"], return_tensors="pt")
+        inputs = tuple(sample[input_name] for input_name in config["input_names"])
+        dynamic_axes = {input_name: {0: "batch", 1: "sequence"} for input_name in config["input_names"]}
+        dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+        tmp_file = fp32_file + ".tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer.auto_model, inputs, tmp_file,
+                input_names=config["input_names"], output_names=["token_embeddings"],
+                dynamic_axes=dynamic_axes, opset_version=OPSET_VERSION, do_constant_folding=True,
+            )
+        os.replace(tmp_file, fp32_file)
+        with open(os.path.join(directory, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=4)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        tmp_file = model_file + ".tmp"
+        quantize_dynamic(fp32_file, tmp_file, weight_type=QuantType.QInt8)
+        os.replace(tmp_file, model_file)
+
+    report = parity_check(OnnxEmbeddingModel(name, quantize=quantize, cache_dir=cache_dir), st_model, parity_texts)
+    threshold = PARITY_THRESHOLD_INT8 if quantize else PARITY_THRESHOLD
+    print(f"Export ONNX de {name}{' (int8)' if quantize else ''} : cosinus min {report['min']:.4f}, "
+          f"moyen {report['mean']:.4f}")
+    if report["min"] < threshold:
+        os.remove(model_file)
+        if not quantize:
+            shutil.rmtree(directory, ignore_errors=True)
+        raise ValueError(f"parité insuffisante pour {name} : cosinus min {report['min']:.4f} < {threshold}")
+    return model_file
+
+
+def parity_check(onnx_model, torch_model, texts=PARITY_TEXTS):
+    """
+    Similarité cosinus texte par texte entre les vecteurs des deux modèles : {"min", "mean"}.
+    """
+    reference = np.asarray(torch_model.encode(texts), dtype=np.float32)
+    candidate = np.asarray(onnx_model.encode(texts), dtype=np.float32)
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    )
+    return {"min": float(cosine.min()), "mean": float(cosine.mean())}
+
+
+class OnnxEmbeddingModel:
+    """
+    Modèle d'embedding exporté, exécuté par onnxruntime ; encode() a la même interface
+    (et rend les mêmes vecteurs, au contrôle de parité près) que SentenceTransformer.encode().
+    """
+    def __init__(self, name, quantize=False, threads=None, cache_dir=DEFAULT_CACHE_DIR):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        directory = export_dir(name, cache_dir)
+        with open(os.path.join(directory, "config.json"), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.name = name
+        self.quantize = quantize
+        self.max_seq_length = self.config["max_seq_length"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.no_padding()
+        # Tokenizer sans troncature, pour le découpage des textes longs (chunking.py)
+        self._offsets_tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self._offsets_tokenizer.no_truncation()
+        self._offsets_tokenizer.no_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            _model_file(name, quantize, cache_dir), options, providers=["CPUExecutionProvider"]
+        )
+
+    def token_offsets(self, text):
+        """
+        Positions (début, fin) des jetons de text, sans troncature ni jetons spéciaux.
+        """
+        if self.config["do_lower_case"]:
+            text = text.lower()
+        return self._offsets_tokenizer.encode(text, add_special_tokens=False).offsets
+
+    def _pool(self, token_embeddings, attention_mask):
+        mode = self.config["pooling"]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        if mode == "cls":
+            pooled = token_embeddings[:, 0]
+        elif mode == "max":
+            pooled = np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        else:
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        arrays = {
+            name: np.zeros((len(encodings), length), dtype=np.int64)
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+        }
+        for row, encoding in enumerate(encodings):
+            size = len(encoding.ids)
+            arrays["input_ids"][row, :size] = encoding.ids
+            arrays["attention_mask"][row, :size] = encoding.attention_mask
+            arrays["token_type_ids"][row, :size] = encoding.type_ids
+        inputs = {name: arrays[name] for name in self.config["input_names"]}
+        token_embeddings = self.session.run(["token_embeddings"], inputs)[0]
+        return self._pool(token_embeddings, arrays["attention_mask"])
+
+    def encode(self, sentences, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+        """
+        Comme SentenceTransformer.encode : un texte -> vecteur, une liste -> matrice (float32).
+        Les textes sont regroupés par longueur pour limiter le remplissage (padding).
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.config["do_lower_case"]:
+            texts = [text.lower() for text in texts]
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            pooled = self._encode_batch(batch).astype(np.float32)
+            if not vectors.shape[1]:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            vectors[order[start:start + batch_size]] = pooled
+        return vectors[0] if single else vectors
+
+
+def backend_variant(quantize=False):
+    """
+    Variante d'EmbeddingService pour ces modèles : leurs vecteurs ne partagent pas le cache de torch.
+    """
+    return "onnx-int8" if quantize else "onnx"
+
+
+def onnx_loader(quantize=False, threads=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Fonction nom -> modèle pour ModelRegistry : export au premier usage (mis en cache), puis ONNX.
+    """
+    def load(name):
+        export_model(name, quantize=quantize, cache_dir=cache_dir)
+        return OnnxEmbeddingModel(name, quantize=quantize, threads=threads, cache_dir=cache_dir)
+    return load
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export ONNX (et int8) des modèles d'embedding, avec contrôle de parité.")
+    parser.add_argument("models", nargs="+", help="Noms des SentenceTransformer")
+    parser.add_argument("--quantize", action="store_true", help="Export int8 (quantification dynamique)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    for model_name in args.models:
+        start = time.perf_counter()
+        print(export_model(model_name, quantize=args.quantize, cache_dir=args.cache_dir),
+              f"({time.perf_counter() - start:.1f}s)")
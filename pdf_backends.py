@@ -0,0 +1,137 @@
+import os
+
+import PyPDF2
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+
+# Backends d'extraction du texte des PDF, page par page.
+# pdfium (pypdfium2, moteur C++ de Chrome) est nettement plus rapide que PyPDF2 (pur Python) ;
+# pdfplumber (pdfminer) est le plus lent mais reste disponible pour comparaison.
+# Les pages sont produites une à une : on peut s'arrêter après quelques pages ou
+# quelques milliers de caractères sans décoder le reste du document.
+
+# Ordre de préférence : le premier backend installé est utilisé par défaut
+PREFERRED_BACKENDS = ["pdfium", "pdfplumber", "pypdf2"]
+
+# Backend imposé (ex. PDF_BACKEND=pypdf2), sinon le plus rapide disponible
+PDF_BACKEND = os.getenv("PDF_BACKEND")
+
+
+def _iter_pages_pdfium(file_path):
+    document = pypdfium2.PdfDocument(file_path)
+    try:
+        for index in range(len(document)):
+            page = document[index]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        document.close()
+
+
+def _iter_pages_pdfplumber(file_path):
+    with pdfplumber.open(file_path) as document:
+        for page in document.pages:
+            yield page.extract_text() or ""
+            # Libère les objets pdfminer de la page déjà lue
+            page.close()
+
+
+def _iter_pages_pypdf2(file_path):
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+
+_BACKENDS = {
+    "pdfium": (_iter_pages_pdfium, pypdfium2 is not None),
+    "pdfplumber": (_iter_pages_pdfplumber, pdfplumber is not None),
+    "pypdf2": (_iter_pages_pypdf2, True),
+}
+
+
+def available_backends():
+    """
+    Noms des backends installés, du plus rapide au plus lent.
+    """
+    return [name for name in PREFERRED_BACKENDS if _BACKENDS[name][1]]
+
+
+def _backend_chain(backend):
+    if backend is None:
+        backend = PDF_BACKEND
+    if backend is None:
+        return available_backends()
+    if backend not in _BACKENDS:
+        raise ValueError(f"Backend PDF inconnu : {backend} (choix : {', '.join(PREFERRED_BACKENDS)})")
+    if not _BACKENDS[backend][1]:
+        raise ValueError(f"Backend PDF non installé : {backend}")
+    return [backend]
+
+
+def iter_pdf_pages(file_path, backend=None, max_pages=None, max_chars=None):
+    """
+    Texte d'un PDF, page par page.
+    backend : "pdfium", "pdfplumber" ou "pypdf2" ; par défaut le plus rapide disponible,
+    avec repli sur le suivant si le document ne peut pas être ouvert.
+    max_pages : nombre maximal de pages lues.
+    max_chars : nombre maximal de caractères produits (la dernière page est tronquée).
+    """
+    chain = _backend_chain(backend)
+    for position, name in enumerate(chain):
+        pages = _BACKENDS[name][0](file_path)
+        try:
+            first_page = next(pages, None)
+        except Exception as e:
+            # Repli uniquement si rien n'a encore été produit
+            if position == len(chain) - 1:
+                raise
+            print(f"Backend PDF {name} en échec pour {file_path} ({str(e)}), repli sur {chain[position + 1]}.")
+            continue
+
+        if first_page is None:
+            return
+        yield from _limit_pages(first_page, pages, max_pages, max_chars)
+        return
+
+
+def _limit_pages(first_page, pages, max_pages, max_chars):
+    page_count = 0
+    char_count = 0
+    try:
+        page_text = first_page
+        while True:
+            if max_chars is not None and char_count + len(page_text) >= max_chars:
+                yield page_text[:max_chars - char_count]
+                return
+            yield page_text
+            page_count += 1
+            char_count += len(page_text)
+            if max_pages is not None and page_count >= max_pages:
+                return
+            page_text = next(pages, None)
+            if page_text is None:
+                return
+    finally:
+        # Ferme le document même si la lecture s'arrête avant la fin
+        pages.close()
+
+
+def extract_pdf_text(file_path, backend=None, max_pages=None, max_chars=None):
+    """
+    Texte complet (ou limité) d'un PDF, pages séparées par un saut de ligne.
+    """
+    return "\n".join(iter_pdf_pages(file_path, backend=backend, max_pages=max_pages, max_chars=max_chars))
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Pipeline asyncio de traitement des CV, en étapes séparées reliées par des files bornées :
+#   extraction (threads, ou ExtractionPool multi-processus) -> embeddings (service par micro-batchs) -> analyse LLM.
+# Chaque étape a sa propre concurrence ; les files bornées créent la contre-pression
+# (une étape lente ralentit les précédentes au lieu d'accumuler du travail en mémoire).
+# Le débit est ainsi fixé par l'étape la plus lente, et non par la somme des latences.
+# Avec un tracker (ex. WorkQueue), chaque étape franchie ou échouée est enregistrée au fil de l'eau,
+# et les CV déjà extraits lors d'un passage précédent (texts) repartent directement aux embeddings.
+# is_duplicate(path, texte), appelé après l'extraction, écarte les doublons avant tout encodage.
+
+DEFAULT_QUEUE_SIZE = 32
+
+_DONE = object()
+
+
+async def _run_workers(count, worker, input_queue, output_queue):
+    """
+    Lance count workers sur input_queue ; quand tous ont terminé,
+    propage la fin de flux à l'étape suivante.
+    """
+    await asyncio.gather(*(worker(input_queue, output_queue) for _ in range(count)))
+    if output_queue is not None:
+        await output_queue.put(_DONE)
+
+
+async def _consume(queue, handle):
+    """
+    Boucle commune des workers : traite les éléments jusqu'au marqueur de fin,
+    qui est remis dans la file pour les autres workers de la même étape.
+    """
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            await queue.put(_DONE)
+            return
+        await handle(item)
+
+
+async def run_pipeline(cv_files, extract, embed, analyze, on_result,
+                       extraction_workers=os.cpu_count() or 4, embedding_concurrency=64,
+                       llm_concurrency=8, queue_size=DEFAULT_QUEUE_SIZE, extract_executor=None,
+                       extract_pool=None, preprocess=None, texts=None, tracker=None,
+                       is_duplicate=None):
+    """
+    extract(path) -> texte ou None (synchrone, exécuté dans extract_executor)
+    extract_pool : si fourni (ex. ExtractionPool), remplace extract : extract_pool.submit(path)
+    renvoie un concurrent.futures.Future du texte brut
+    preprocess(texte) -> texte prétraité, appliqué après l'extraction (optionnel)
+    embed(texte) -> concurrent.futures.Future des vecteurs (ex. EmbeddingService.submit)
+    analyze(texte) -> analyse (synchrone, exécutée dans une thread)
+    on_result(path, vecteurs, analyse) : appelé pour chaque CV analysé, depuis une
+    thread de l'étape LLM (doit être thread-safe, ex. append_result avec son verrou)
+    texts : {path: texte prétraité} des CV déjà extraits (reprise), qui sautent l'extraction
+    tracker : objet avec mark_extracted(path, texte), mark_embedded(path) et
+    mark_failed(path, étape, erreur), ex. WorkQueue (optionnel)
+    is_duplicate(path, texte) -> True si le CV est un doublon : ni encodé ni analysé (optionnel)
+    Renvoie un dict de compteurs par étape.
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = extract_executor is None and extract_pool is None
+    if own_executor:
+        extract_executor = ThreadPoolExecutor(max_workers=extraction_workers)
+    llm_executor = ThreadPoolExecutor(max_workers=llm_concurrency)
+    # Prétraitement, détection des doublons et écritures du tracker (SQLite) : hors de la boucle
+    # d'événements, qui ne doit jamais être bloquée par un travail CPU ou une écriture disque.
+    bookkeeping_executor = ThreadPoolExecutor(max_workers=extraction_workers)
+
+    stats = {"extracted": 0, "embedded": 0, "analyzed": 0, "duplicates": 0, "errors": 0}
+    paths_queue = asyncio.Queue()
+    texts_queue = asyncio.Queue(maxsize=queue_size)
+    vectors_queue = asyncio.Queue(maxsize=queue_size)
+    for path in cv_files:
+        paths_queue.put_nowait(path)
+    paths_queue.put_nowait(_DONE)
+
+    texts = texts or {}
+
+    def in_background(function, *args):
+        return loop.run_in_executor(bookkeeping_executor, function, *args)
+
+    async def report_error(stage, path, e):
+        stats["errors"] += 1
+        print(f"Erreur ({stage}) pour {path}: {str(e)}")
+        traceback.print_exc()
+        if tracker is not None:
+            await in_background(tracker.mark_failed, path, stage, e)
+
+    def after_extraction(path, text):
+        """
+        (texte prétraité, doublon ?) ; le texte d'un CV retenu est enregistré par le tracker.
+        """
+        if preprocess is not None:
+            text = preprocess(text)
+        if is_duplicate is not None and is_duplicate(path, text):
+            return text, True
+        if tracker is not None:
+            tracker.mark_extracted(path, text)
+        return text, False
+
+    async def extraction_worker(input_queue, output_queue):
+        async def handle(path):
+            if path in texts:
+                await output_queue.put((path, texts[path]))
+                return
+            try:
+                if extract_pool is not None:
+                    text = await asyncio.wrap_future(extract_pool.submit(path))
+                else:
+                    text = await loop.run_in_executor(extract_executor, extract, path)
+            except Exception as e:
+                await report_error("extraction", path, e)
+                return
+            if text is None:
+                if tracker is not None:
+                    await in_background(tracker.mark_failed, path, "extraction", "format non pris en charge")
+                return
+            try:
+                text, duplicate = await in_background(after_extraction, path, text)
+            except Exception as e:
+                await report_error("extraction", path, e)
+                return
+            stats["extracted"] += 1
+            if duplicate:
+                stats["duplicates"] += 1
+                return
+            await output_queue.put((path, text))
+        await _consume(input_queue, handle)
+
+    async def embedding_worker(input_queue, output_queue):
+        async def handle(item):
+            path, text = item
+            try:
+                vectors = await asyncio.wrap_future(embed(text))
+            except Exception as e:
+                await report_error("embeddings", path, e)
+                return
+            stats["embedded"] += 1
+            if tracker is not None:
+                await in_background(tracker.mark_embedded, path)
+            await output_queue.put((path, text, vectors))
+        await _consume(input_queue, handle)
+
+    async def llm_worker(input_queue, output_queue):
+        async def handle(item):
+            path, text, vectors = item
+            try:
+                analysis = await loop.run_in_executor(llm_executor, analyze, text)
+            except Exception as e:
+                await report_error("analyse", path, e)
+                return
+            stats["analyzed"] += 1
+            try:
+                await loop.run_in_executor(llm_executor, on_result, path, vectors, analysis)
+            except Exception as e:
+                await report_error("écriture", path, e)
+        await _consume(input_queue, handle)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(
+            _run_workers(extraction_workers, extraction_worker, paths_queue, texts_queue),
+            _run_workers(embedding_concurrency, embedding_worker, texts_queue, vectors_queue),
+            _run_workers(llm_concurrency, llm_worker, vectors_queue, None),
+        )
+    finally:
+        llm_executor.shutdown()
+        bookkeeping_executor.shutdown()
+        if own_executor:
+            extract_executor.shutdown()
+
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
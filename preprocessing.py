@@ -0,0 +1,80 @@
+import re
+import unicodedata
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Prétraitement commun du texte des CV (scripts test* et stock*).
+# - casefold : minuscules Unicode (les caractères accentués sont conservés) ;
+# - découpage en mots par une regex compilée Unicode : la ponctuation et les symboles disparaissent ;
+# - repli des accents (NFKD) en option : "expérience" -> "experience" ;
+# - mots vides français filtrés par un frozenset construit une fois à l'import.
+# Le coût par texte se limite à deux appels C (casefold, findall) et à une passe sur les mots,
+# dont la normalisation est mise en cache.
+
+# Liste des mots vides français de NLTK (stopwords.words('french')), embarquée pour
+# ne plus dépendre du corpus NLTK ni le relire à chaque appel.
+FRENCH_STOPWORDS = frozenset("""
+au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me même mes
+moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un
+une vos votre vous c d j l à m n s t y été étée étées étés étant étante étants étantes suis es est
+sommes êtes sont serai seras sera serons serez seront serais serait serions seriez seraient étais
+était étions étiez étaient fus fut fûmes fûtes furent sois soit soyons soyez soient fusse fusses
+fût fussions fussiez fussent ayant ayante ayantes ayants eu eue eues eus ai as avons avez ont aurai
+auras aura aurons aurez auront aurais aurait aurions auriez auraient avais avait avions aviez
+avaient eut eûmes eûtes eurent aie aies ait ayons ayez aient eusse eusses eût eussions eussiez
+eussent
+""".split())
+
+# Mots : lettres et chiffres Unicode, y compris les diacritiques combinants (PDF en NFD).
+# Ponctuation, symboles et espaces sont des séparateurs : un seul appel C par texte.
+TOKEN_PATTERN = re.compile(r"[\w\u0300-\u036f]+")
+
+DEFAULT_CHUNKSIZE = 256
+
+
+def strip_accents(text):
+    """
+    Supprime les accents : décomposition NFKD puis retrait des diacritiques.
+    """
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+_FOLDED_STOPWORDS = frozenset(strip_accents(word) for word in FRENCH_STOPWORDS)
+
+
+# Normalisation d'un mot, mise en cache : le vocabulaire des CV est très répétitif,
+# chaque mot distinct n'est traité qu'une fois. "" = mot à retirer.
+@lru_cache(maxsize=200_000)
+def _normalize_token(token, fold_accents, remove_stopwords):
+    token = unicodedata.normalize("NFC", token).strip("_")
+    if fold_accents:
+        token = strip_accents(token)
+    if remove_stopwords and token in (_FOLDED_STOPWORDS if fold_accents else FRENCH_STOPWORDS):
+        return ""
+    return token
+
+
+def preprocess_text(text, fold_accents=False, remove_stopwords=True):
+    """
+    Normalise un texte : minuscules, ponctuation retirée, mots séparés par un espace.
+    fold_accents : retire aussi les accents.
+    remove_stopwords : filtre les mots vides français.
+    """
+    if not text:
+        return ""
+    tokens = TOKEN_PATTERN.findall(text.casefold())
+    return " ".join(filter(None, [_normalize_token(token, fold_accents, remove_stopwords) for token in tokens]))
+
+
+def preprocess_batch(texts, fold_accents=False, remove_stopwords=True, processes=None,
+                     chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Prétraite une liste de textes en un appel.
+    processes : nombre de processus (import massif) ; None ou 1 = dans le processus courant.
+    """
+    function = partial(preprocess_text, fold_accents=fold_accents, remove_stopwords=remove_stopwords)
+    if not processes or processes == 1 or len(texts) <= chunksize:
+        return [function(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(function, texts, chunksize=chunksize))
@@ -0,0 +1,143 @@
+import time
+from contextlib import contextmanager
+from threading import Condition, Lock
+
+
+# Limitation partagée des appels à l'API Gemini.
+# - Deux seaux à jetons : requêtes par minute (RPM) et tokens par minute (TPM).
+# - Concurrence adaptative AIMD : la limite d'appels simultanés augmente de 1
+#   par "fenêtre" d'appels réussis (additive increase) et est multipliée par
+#   decrease_factor à chaque 429 (multiplicative decrease). Un 429 suspend
+#   aussi les nouveaux appels de toutes les threads pendant un délai de refroidissement.
+
+
+def estimate_tokens(text):
+    """
+    Estimation grossière du nombre de tokens d'un texte (~4 caractères par token).
+    """
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        """
+        rate_per_minute : jetons ajoutés par minute.
+        capacity : taille maximale du seau (par défaut, une minute de jetons).
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """
+        Bloque jusqu'à ce que amount jetons soient disponibles, puis les consomme.
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute=None,
+                 min_concurrency=1, max_concurrency=16, initial_concurrency=2,
+                 decrease_factor=0.5, cooldown=5.0, max_cooldown=120.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self._in_flight = 0
+        self._cooldown = cooldown
+        self._paused_until = 0.0
+        self._successes = 0
+        self._rate_limited = 0
+        self._cond = Condition()
+
+    @property
+    def current_limit(self):
+        """
+        Nombre maximal d'appels simultanés autorisés actuellement.
+        """
+        return int(self._limit)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "current_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "successes": self._successes,
+                "rate_limited": self._rate_limited,
+            }
+
+    @contextmanager
+    def slot(self, tokens=1):
+        """
+        Contexte d'un appel API : attend une place libre et les jetons RPM/TPM.
+        Une exception contenant "429" réduit la concurrence ; une sortie normale l'augmente.
+        """
+        self._acquire_slot()
+        try:
+            self.requests.acquire(1)
+            if self.tokens is not None:
+                self.tokens.acquire(tokens)
+            yield
+        except Exception as e:
+            if "429" in str(e):
+                self._on_rate_limited()
+            raise
+        else:
+            self._on_success()
+        finally:
+            self._release_slot()
+
+    def _acquire_slot(self):
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(timeout=pause)
+                elif self._in_flight >= int(self._limit):
+                    self._cond.wait()
+                else:
+                    self._in_flight += 1
+                    return
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self):
+        with self._cond:
+            self._successes += 1
+            # +1 après environ "limite" succès consécutifs
+            self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            self._cooldown = self.base_cooldown
+            self._cond.notify_all()
+
+    def _on_rate_limited(self):
+        with self._cond:
+            self._rate_limited += 1
+            if time.monotonic() < self._paused_until:
+                # Déjà réduite pour cette salve de 429 (appels partis avant la réduction)
+                return
+            self._limit = max(self.min_concurrency, self._limit * self.decrease_factor)
+            self._paused_until = max(self._paused_until, time.monotonic() + self._cooldown)
+            self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+            self._cond.notify_all()
@@ -0,0 +1,144 @@
+import os
+import json
+import argparse
+
+from json_stream import iter_jsonl, iter_records, write_json_array
+
+
+# Journal de résultats en ajout seul (une ligne JSON par CV).
+# Le coût d'écriture d'un CV reste constant quelle que soit la taille du fichier,
+# contrairement à la relecture / réécriture complète du JSON à chaque CV.
+# Le format historique (tableau JSON indenté, ex. cv2.json) est reconstruit
+# à la demande par compact_journal().
+
+
+def default_journal_path(output_file):
+    """
+    Chemin du journal associé à un fichier de sortie : cv2.json -> cv2.jsonl
+    """
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+def append_result(journal_file, new_entry, lock):
+    """
+    Ajoute new_entry en fin de journal (une ligne) puis force l'écriture
+    sur disque (fsync). Le lock assure qu'une seule thread écrit à la fois.
+    """
+    line = json.dumps(new_entry, ensure_ascii=False)
+    with lock:
+        with open(journal_file, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def iter_journal(journal_file, skip_vectors=False):
+    """
+    Parcourt le journal ligne par ligne et renvoie chaque entrée.
+    Une dernière ligne tronquée (arrêt brutal pendant l'écriture) est ignorée.
+    skip_vectors : cv_vector n'est pas décodé (remplacé par None).
+    """
+    return iter_jsonl(journal_file, skip_vectors=skip_vectors)
+
+
+def init_journal(journal_file, legacy_file=None):
+    """
+    Crée le journal s'il n'existe pas encore. Si un fichier historique
+    (tableau JSON) existe, ses entrées sont reprises une seule fois dans le journal.
+    """
+    if os.path.exists(journal_file):
+        _truncate_partial_line(journal_file)
+        return
+
+    # Reprise du tableau historique en flux : il n'est jamais chargé en entier
+    tmp_file = journal_file + ".tmp"
+    count = 0
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        if legacy_file and os.path.exists(legacy_file):
+            try:
+                for entry in iter_records(legacy_file):
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    count += 1
+            except json.JSONDecodeError:
+                print(f"Warning: fichier JSON invalide ({legacy_file}), non repris dans le journal.")
+                f.seek(0)
+                f.truncate()
+                count = 0
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, journal_file)
+
+    if count:
+        print(f"{count} résultats repris depuis {legacy_file} dans {journal_file}.")
+
+
+def _truncate_partial_line(journal_file):
+    """
+    Supprime une éventuelle dernière ligne incomplète (sans retour à la ligne final),
+    pour que les ajouts suivants ne soient pas collés à une ligne tronquée.
+    """
+    with open(journal_file, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Recherche du dernier retour à la ligne par blocs depuis la fin
+        position = size
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            block = f.read(position - start)
+            index = block.rfind(b"\n")
+            if index != -1:
+                f.truncate(start + index + 1)
+                break
+            position = start
+        else:
+            f.truncate(0)
+    print(f"Warning: dernière ligne incomplète supprimée de {journal_file}.")
+
+
+def load_processed_files(journal_file):
+    """
+    Renvoie l'ensemble des file_name déjà présents dans le journal.
+    """
+    return {entry["file_name"] for entry in iter_journal(journal_file, skip_vectors=True) if "file_name" in entry}
+
+
+def iter_latest(journal_file):
+    """
+    Entrées du journal, en ne gardant que la dernière de chaque file_name
+    (un CV modifié puis retraité est ajouté une seconde fois au journal).
+    """
+    last_line = {}
+    for line_number, entry in enumerate(iter_journal(journal_file, skip_vectors=True)):
+        last_line[entry.get("file_name", line_number)] = line_number
+    kept = set(last_line.values())
+    for line_number, entry in enumerate(iter_journal(journal_file)):
+        if line_number in kept:
+            yield entry
+
+
+def compact_journal(journal_file, output_file):
+    """
+    Reconstruit le fichier historique (tableau JSON indenté) à partir du journal,
+    une entrée par CV (la plus récente).
+    L'écriture passe par un fichier temporaire : output_file n'est jamais à moitié écrit.
+    """
+    return write_json_array(output_file, iter_latest(journal_file))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compacte un journal JSONL de résultats en tableau JSON (format historique)."
+    )
+    parser.add_argument("journal_file", help="Journal JSONL (ex. cv2.jsonl)")
+    parser.add_argument("output_file", nargs="?", help="Fichier JSON de sortie (ex. cv2.json)")
+    args = parser.parse_args()
+
+    output_file = args.output_file or os.path.splitext(args.journal_file)[0] + ".json"
+    count = compact_journal(args.journal_file, output_file)
+    print(f"{count} résultats écrits dans {output_file}")
@@ -1,8 +1,6 @@
-import json
 import psycopg2
-import string
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from preprocessing import preprocess_batch
+from json_stream import iter_batches, iter_records
 from dotenv import load_dotenv
 import os
 
@@ -17,24 +15,21 @@ conn = psycopg2.connect(
 )
 cursor = conn.cursor()
 
-# Fonction pour prétraiter le texte des CVs
-def preprocess_cv_text(text):
-    
-    text = text.lower()
-   
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    
-    words = word_tokenize(text)
-    
-    words = [word for word in words if word not in stopwords.words('french')]
-    return ' '.join(words)
-
-# Charger le fichier JSON
-with open('cv1_fin.json', 'r', encoding='utf-8') as file:
-    cvs_data = json.load(file)
+# Lecture du fichier JSON en flux (vecteurs ignorés) et prétraitement par lots
+# (mots vides chargés une fois, regex compilée)
+def iter_preprocessed_cvs(json_file, batch_size=1000):
+    for batch in iter_batches(iter_records(json_file, skip_vectors=True), batch_size):
+        cvs = []
+        for cv in batch:
+            if cv.get("cv_text") is None:
+                # CV sans texte : rien n'est inséré
+                print(f"Pas de texte pour le fichier {cv.get('file_name', 'inconnu')}, ignoré.")
+                continue
+            cvs.append(cv)
+        yield from zip(cvs, preprocess_batch([cv["cv_text"] for cv in cvs]))
 
 # Insérer les données dans les tables PostgreSQL
-for cv in cvs_data:
+for cv, cv_text in iter_preprocessed_cvs('cv1_fin.json'):
     try:
         
         analysis = cv["analysis"]
@@ -52,9 +47,7 @@ for cv in cvs_data:
             if line.startswith("* ")
         ]
 
-        
-        cv_text = preprocess_cv_text(cv["cv_text"])
-        
+
         # Insérer les données dans la table `candidat`
         cursor.execute("""
             INSERT INTO candidat (mail, numero_tlfn, nom_prenom)
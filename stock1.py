@@ -2,6 +2,7 @@ import json
 import psycopg2
 import os
 from dotenv import load_dotenv
+from json_stream import iter_records
 
 load_dotenv()
 # Connexion à la base de données PostgreSQL
@@ -13,9 +14,8 @@ conn = psycopg2.connect(
 )
 cursor = conn.cursor()
 
-# Charger le fichier JSON (vous pouvez changer 'cvs_data.json' par le nom de votre fichier)
-with open('cvs_fin.json', 'r', encoding='utf-8') as file:
-    cvs_data = json.load(file)
+# Lire le fichier JSON en flux, un CV à la fois (vous pouvez changer 'cvs_fin.json' par le nom de votre fichier)
+cvs_data = iter_records('cvs_fin.json', skip_vectors=True)
 
 # Insérer les données dans les tables PostgreSQL
 for cv_data in cvs_data:
@@ -1,28 +1,18 @@
-import json
 import uuid
-import string
 from supabase import create_client, Client
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from preprocessing import preprocess_text, preprocess_batch
+from json_stream import iter_batches, iter_records
+from vector_store import load_vector, open_store_for
 from dotenv import load_dotenv
 import os
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-stop_words = set(stopwords.words('french'))
-
-def preprocess_text(text):
-    if not text:
-        return ""
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))
-    tokens = word_tokenize(text)
-    tokens = [t for t in tokens if t not in stop_words]
-    return " ".join(tokens)
+# Mode lot : CVs insérés par paquets de SUPABASE_BATCH_SIZE (0 = un CV à la fois, mode historique)
+SUPABASE_BATCH_SIZE = int(os.getenv("SUPABASE_BATCH_SIZE", "500"))
+# Nombre de mails par requête in_ (la liste est passée dans l'URL)
+SUPABASE_LOOKUP_SIZE = int(os.getenv("SUPABASE_LOOKUP_SIZE", "200"))
 
 def get_or_create_candidat(supabase: Client, nom_prenom: str, mail: str, numero_tlfn: str, profil: str, code=""):
     """
@@ -59,7 +49,10 @@ def get_or_create_candidat(supabase: Client, nom_prenom: str, mail: str, numero_
     supabase.table("candidat").insert(insert_data).execute()
     return id_candidat
 
-def insert_cv_analysis(supabase: Client, id_candidat: str, cv_info: dict, cv_vector: list):
+def build_cv_analysis_row(id_candidat: str, cv_info: dict, cv_vector: list, cv_pretraite=None):
+    """
+    Ligne de la table cv_analysis pour un CV (cv_pretraite calculé si non fourni).
+    """
     # Générer un uuid pour le CV
     id_cv = str(uuid.uuid4())
 
@@ -71,7 +64,8 @@ def insert_cv_analysis(supabase: Client, id_candidat: str, cv_info: dict, cv_vec
     # date par défaut si pas présente
     date_insertion = cv_info.get("date_insertion", "2025-01-01")
     raw_text = cv_info.get("cv_text", "")
-    cv_pretraite = preprocess_text(raw_text)
+    if cv_pretraite is None:
+        cv_pretraite = preprocess_text(raw_text)
 
     resume_cv = cv_info.get("resume_cv", "") or ""
     resume_cv = resume_cv[:255]
@@ -81,7 +75,7 @@ def insert_cv_analysis(supabase: Client, id_candidat: str, cv_info: dict, cv_vec
     exp_salaire = cv_info.get("exp_salaire", 0)
     domaine_etude = cv_info.get("domaine_etude", "")[:255]
 
-    insert_data = {
+    return {
         "id_cv": id_cv,
         "date_insertion": date_insertion,
         "cv_text": raw_text,
@@ -99,36 +93,155 @@ def insert_cv_analysis(supabase: Client, id_candidat: str, cv_info: dict, cv_vec
         "id_candidat": id_candidat,
     }
 
+def insert_cv_analysis(supabase: Client, id_candidat: str, cv_info: dict, cv_vector: list):
+    insert_data = build_cv_analysis_row(id_candidat, cv_info, cv_vector)
+
     # Insertion dans la table "cv_analysis"
     supabase.table("cv_analysis").insert(insert_data).execute()
 
-# === Lecture du fichier JSON et insertion ===
-with open("cv1.json", "r", encoding="utf-8") as f:
-    cvs_data = json.load(f)
+def parse_cv_item(cv_item: dict, vector_store=None):
+    """
+    Champs candidat / CV d'un élément du JSON ; lève ValueError si le nom ou le mail manque.
+    Le vecteur vient de vector_store ("cv_vector_row") ou de l'ancien champ "cv_vector".
+    """
+    candidat_info = cv_item.get("candidat", {})
+    nom_prenom = candidat_info.get("nom_prenom", "")
+    mail = candidat_info.get("mail", "")
+    if not nom_prenom or not mail:
+        raise ValueError("Nom/Prénom ou e-mail manquant")
+
+    candidat = {
+        "nom_prenom": nom_prenom[:255],
+        "mail": mail[:254],
+        "numero_tlfn": candidat_info.get("num_tel", "")[:20],
+        "profil": candidat_info.get("profil", "")[:255],
+        "code": "",
+    }
 
-for cv_item in cvs_data:
-    try:
-        candidat_info = cv_item.get("candidat", {})
-        nom_prenom = candidat_info.get("nom_prenom", "")
-        mail = candidat_info.get("mail", "")
-        if not nom_prenom or not mail:
-            raise ValueError("Nom/Prénom ou e-mail manquant")
+    cv_info = cv_item.get("cv", {})
+    cv_vector = load_vector(cv_item, vector_store)
+    cv_vector = cv_vector.tolist() if cv_vector is not None else []
+    return candidat, cv_info, cv_vector
 
-        numero_tlfn = candidat_info.get("num_tel", "")
-        profil = candidat_info.get("profil", "")
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-        # 1) Récupérer (ou créer) l'id du candidat
-        id_candidat = get_or_create_candidat(supabase, nom_prenom, mail, numero_tlfn, profil)
+def resolve_candidats(supabase: Client, candidats: dict, lookup_size=SUPABASE_LOOKUP_SIZE):
+    """
+    mail -> id_candidat pour tous les candidats du lot :
+    une requête in_ par paquet de mails, puis un seul upsert (on_conflict=mail) des absents.
+    """
+    ids = {}
+    mails = list(candidats)
+    for mail_chunk in chunks(mails, lookup_size):
+        response = supabase.table("candidat").select("id_candidat, mail").in_("mail", mail_chunk).execute()
+        for row in response.data:
+            ids[row["mail"]] = row["id_candidat"]
+
+    missing = [dict(candidats[mail], id_candidat=str(uuid.uuid4())) for mail in mails if mail not in ids]
+    if missing:
+        # ignore_duplicates : un candidat créé entre-temps n'est pas écrasé
+        supabase.table("candidat").upsert(missing, on_conflict="mail", ignore_duplicates=True).execute()
+        # Relecture : l'id de référence est celui stocké (le nôtre, ou celui d'un insert concurrent)
+        for mail_chunk in chunks([row["mail"] for row in missing], lookup_size):
+            response = supabase.table("candidat").select("id_candidat, mail").in_("mail", mail_chunk).execute()
+            for row in response.data:
+                ids[row["mail"]] = row["id_candidat"]
+    return ids
+
+def insert_cv_analysis_rows(supabase: Client, rows: list, chunk_size: int):
+    """
+    Insère les lignes cv_analysis par paquets ; un paquet refusé est repris ligne par ligne.
+    Renvoie le nombre de lignes insérées.
+    """
+    inserted = 0
+    for chunk in chunks(rows, chunk_size):
+        try:
+            supabase.table("cv_analysis").insert(chunk).execute()
+            inserted += len(chunk)
+        except Exception as e:
+            print(f"Paquet de {len(chunk)} CVs refusé ({e}), reprise ligne par ligne.")
+            for row in chunk:
+                try:
+                    supabase.table("cv_analysis").insert(row).execute()
+                    inserted += 1
+                except Exception as e:
+                    print(f"Erreur pour le CV {row['id_cv']} (candidat {row['id_candidat']}): {e}")
+    return inserted
+
+def ingest_batched(supabase: Client, cvs_data, batch_size=SUPABASE_BATCH_SIZE,
+                   lookup_size=SUPABASE_LOOKUP_SIZE, vector_store=None):
+    """
+    Mode lot : par paquet de batch_size CVs, résolution groupée des candidats
+    puis insertion groupée des analyses (quelques requêtes au lieu de trois par CV).
+    """
+    inserted = 0
+    for batch in iter_batches(cvs_data, batch_size):
+        parsed = []
+        for cv_item in batch:
+            try:
+                parsed.append((cv_item, *parse_cv_item(cv_item, vector_store)))
+            except Exception as e:
+                print(f"Erreur pour {cv_item.get('file_name')}: {e}")
+
+        candidats = {}
+        for _, candidat, _, _ in parsed:
+            candidats.setdefault(candidat["mail"], candidat)
+        try:
+            ids = resolve_candidats(supabase, candidats, lookup_size)
+        except Exception as e:
+            print(f"Erreur lors de la résolution des candidats du lot ({len(parsed)} CVs): {e}")
+            continue
+
+        texts = preprocess_batch([cv_info.get("cv_text", "") for _, _, cv_info, _ in parsed])
+        rows = []
+        for (cv_item, candidat, cv_info, cv_vector), cv_pretraite in zip(parsed, texts):
+            id_candidat = ids.get(candidat["mail"])
+            if id_candidat is None:
+                print(f"Erreur pour {cv_item.get('file_name')}: candidat {candidat['mail']} non créé")
+                continue
+            rows.append(build_cv_analysis_row(id_candidat, cv_info, cv_vector, cv_pretraite))
+
+        inserted += insert_cv_analysis_rows(supabase, rows, batch_size)
+        print(f"{inserted} CVs insérés.")
+    return inserted
+
+def ingest_sequential(supabase: Client, cvs_data, vector_store=None):
+    """
+    Mode historique : trois requêtes par CV, l'une après l'autre.
+    """
+    for cv_item in cvs_data:
+        try:
+            candidat, cv_info, cv_vector = parse_cv_item(cv_item, vector_store)
+
+            # 1) Récupérer (ou créer) l'id du candidat
+            id_candidat = get_or_create_candidat(
+                supabase, candidat["nom_prenom"], candidat["mail"], candidat["numero_tlfn"], candidat["profil"]
+            )
+
+            # 2) Insérer l'analyse du CV
+            insert_cv_analysis(supabase, id_candidat, cv_info, cv_vector)
 
-        # 2) Insérer l'analyse du CV
-        cv_info = cv_item.get("cv", {})
-        cv_vector = cv_item.get("cv_vector", [])
-        if not isinstance(cv_vector, list):
-            cv_vector = []
+            print(f"Insertion réussie pour {candidat['nom_prenom']} (CV : {cv_item.get('file_name')})")
 
-        insert_cv_analysis(supabase, id_candidat, cv_info, cv_vector)
+        except Exception as e:
+            print(f"Erreur pour {cv_item.get('file_name')}: {e}")
 
-        print(f"Insertion réussie pour {nom_prenom} (CV : {cv_item.get('file_name')})")
+# === Lecture du fichier JSON et insertion ===
+if __name__ == "__main__":
+    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    # Lecture en flux : un CV à la fois, le fichier n'est jamais chargé en entier
+    cvs_data = iter_records("cv1.json")
+    # Vecteurs binaires (cv1.vectors/) s'ils existent, sinon champ "cv_vector" du JSON
+    vector_store = open_store_for("cv1.json")
 
-    except Exception as e:
-        print(f"Erreur pour {cv_item.get('file_name')}: {e}")
+    try:
+        if SUPABASE_BATCH_SIZE > 0:
+            ingest_batched(supabase, cvs_data, vector_store=vector_store)
+        else:
+            ingest_sequential(supabase, cvs_data, vector_store=vector_store)
+    finally:
+        if vector_store is not None:
+            vector_store.close()
@@ -8,6 +8,7 @@ import traceback
 from docx import Document
 from concurrent.futures import ThreadPoolExecutor
 import re
+from preprocessing import preprocess_text as normalize_text
 
 
 # Charger la clé API depuis le fichier .env
@@ -42,11 +43,8 @@ def extract_text_from_pdf(file_path):
         return "\n".join(page.extract_text() for page in reader.pages)
 
 def preprocess_text(text):
-    # Conversion en minuscule
-    text = text.lower()
-    # Suppression des caractères spéciaux
-    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-    return text
+    # Minuscules et ponctuation retirée, accents conservés (voir preprocessing.py)
+    return normalize_text(text, remove_stopwords=False)
 
 # Fonction pour analyser un CV avec Generative AI
 def analyze_cv(cv_text):
@@ -1,5 +1,6 @@
 import os
 import json
+from json_stream import append_to_json_array, load_file_names
 import PyPDF2
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -8,6 +9,7 @@ import traceback
 from docx import Document
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
+from preprocessing import preprocess_text as normalize_text
 from datetime import date
 
 # 1. Chargement de la clé API
@@ -41,11 +43,8 @@ def extract_text_from_pdf(file_path):
 
 # 4. Prétraitement du texte
 def preprocess_text(text):
-    # Conversion en minuscule
-    text = text.lower()
-    # Suppression des caractères spéciaux
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return text
+    # Minuscules et ponctuation retirée, accents conservés (voir preprocessing.py)
+    return normalize_text(text, remove_stopwords=False)
 
 # 5. Fonction d'analyse via l'API
 def analyze_cv(cv_text):
@@ -148,19 +147,6 @@ Notes :
 
     return None
 
-def load_or_init_results(output_file):
-    """
-    Charge les résultats existants si le JSON est valide.
-    Sinon, renvoie une liste vide.
-    """
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: fichier JSON invalide, on va le remplacer.")
-    return []
-
 # 6. Fonction pour traiter un CV
 def process_cv_file(cv_file_path):
     """
@@ -207,11 +193,8 @@ def process_all_cvs(cv_folder, output_file):
         print(f"Erreur: Le dossier {cv_folder} n'existe pas.")
         return
 
-    # On charge l'ancien JSON
-    results = load_or_init_results(output_file)
-
-    # Liste des fichiers déjà traités
-    processed_files = {res["file_name"] for res in results}
+    # Fichiers déjà traités : l'ancien JSON est lu en flux, sans décoder les vecteurs
+    processed_files = load_file_names(output_file)
 
     # Liste des CV à traiter
     cv_files = [
@@ -243,12 +226,9 @@ def process_all_cvs(cv_folder, output_file):
                 print(f"Erreur dans le thread pour {cv_file_path}: {str(e)}")
                 traceback.print_exc()
 
-    # Fusion des anciens et nouveaux résultats
-    results.extend(new_results)
-
-    # Sauvegarde en un seul bloc
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=4, ensure_ascii=False)
+    # Fusion des anciens et nouveaux résultats : l'ancien JSON est recopié en flux
+    # dans un fichier temporaire, puis remplacé en une fois
+    append_to_json_array(output_file, new_results)
 
     print(f"Tous les CVs ont été traités. Résultats sauvegardés dans {output_file}")
 
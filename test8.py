@@ -1,28 +1,55 @@
 import os
-import json
-import PyPDF2
-import google.generativeai as genai
+from threading import Lock
+from result_journal import (
+    append_result,
+    compact_journal,
+    default_journal_path,
+    init_journal,
+    load_processed_files,
+)
 from dotenv import load_dotenv
-import time
 import traceback
-from docx import Document
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import re
+from preprocessing import preprocess_text as normalize_text
 from datetime import date
-from sentence_transformers import SentenceTransformer
+
+from embedding_service import EmbeddingService
+from model_registry import ModelRegistry, configured_models
+from onnx_backend import onnx_loader, backend_variant
+from extraction import extract_text_from_docx, extract_text_from_pdf
+from embedding_cache import EmbeddingCache
+from chunking import Chunker, ChunkStore, DEFAULT_OVERLAP
+from llm_cache import LLMCache
+from rate_limiter import AdaptiveLimiter
+from analysis_client import AnalysisClient
+from vector_store import VectorStore, default_store_dir
+from work_queue import WorkQueue, default_queue_path
+from dedup import DedupIndex, default_dedup_path
 
 
 # 1. Chargement de la clé API
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not API_KEY:
-    print("Erreur: Clé API Gemini non trouvée.")
-    exit()
+# Mode replay : les réponses sont relues depuis le cache LLM, sans aucun appel API
+LLM_CACHE_REPLAY = os.getenv("LLM_CACHE_REPLAY") == "1"
+# Ignore les réponses en cache et force un nouvel appel (les nouvelles réponses remplacent les anciennes)
+LLM_CACHE_REFRESH = os.getenv("LLM_CACHE_REFRESH") == "1"
+
+# File de travail persistante à côté de output_file (cvs.json -> cvs.queue.sqlite) : état de chaque CV
+# par étape, reprise à l'étape exacte ; un CV en échec MAX_ATTEMPTS fois n'est plus retenté.
+MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "3"))
+
+# Doublons (dedup.py, index cvs.dedup.sqlite) : fichier de même contenu qu'un CV déjà connu, ou texte
+# quasi identique (NEAR_DUPLICATE_DISTANCE, 15 au plus, -1 = désactivé) : relié à l'original, non retraité.
+DEDUP = os.getenv("DEDUP", "1") == "1"
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "10"))
 
-# 2. Configuration de l'API Generative AI
-genai.configure(api_key=API_KEY)
+# Vecteurs stockés en binaire à côté de output_file (cv2.json -> cv2.vectors/), un espace par modèle ;
+# le résultat JSON ne garde que "cv_vector_row". float16 divise encore la taille par deux.
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")
 
+# 2. Configuration de l'API Generative AI (appliquée par init_services)
 # Configuration du modèle : ajustez selon vos besoins
 generation_config = {
     "temperature": 1,
@@ -31,246 +58,262 @@ generation_config = {
     "max_output_tokens": 38192,  # Peut être ajusté si le texte est long
 }
 
-# --- Nouveau : chargement des modèles SentenceTransformer
-# Vous pouvez choisir d'en charger 1 ou plusieurs, selon vos besoins.
-# Notez que charger plusieurs modèles peut augmenter la consommation de mémoire.
-model1 = SentenceTransformer('all-MPNet-base-v2')
-model2 = SentenceTransformer('paraphrase-MiniLM-L12-v2')
-model3 = SentenceTransformer('all-MiniLM-L12-v2')
-#model4 = SentenceTransformer('bert-base-nli-mean-tokens')
+MODEL_NAME = "gemini-1.5-flash"
+
+# Cache local des réponses (clé : modèle, generation_config, version du prompt, hash du CV).
+# La version du prompt (PROMPT_VERSION) est définie dans analysis_client.py.
+LLM_CACHE_FILE = "llm_cache.sqlite"
+LLM_CACHE_TTL = None  # secondes ; None = pas d'expiration
+
+# Limitation partagée des appels Gemini : budgets RPM / TPM du projet et
+# nombre d'appels simultanés ajusté automatiquement (AIMD) selon les 429 reçus.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+# --- Nouveau : modèles SentenceTransformer, chargés à la première demande d'encodage
+# Vous pouvez choisir d'en utiliser 1 ou plusieurs (EMBEDDING_MODELS, noms séparés par des virgules,
+# ex. "all-MiniLM-L12-v2,bert-base-nli-mean-tokens") ; les autres ne sont jamais chargés.
+# EMBEDDING_MODEL_IDLE_TIMEOUT : secondes d'inactivité avant déchargement d'un modèle (0 = jamais).
+EMBEDDING_MODELS = configured_models()
+EMBEDDING_MODEL_IDLE_TIMEOUT = float(os.getenv("EMBEDDING_MODEL_IDLE_TIMEOUT", "0")) or None
+
+# EMBEDDING_BACKEND=onnx : modèles exportés une fois en ONNX (onnx_models/) et exécutés par onnxruntime ;
+# ONNX_QUANTIZE=1 : poids int8 (plus rapide, parité contrôlée à l'export) ; ONNX_THREADS : threads intra-op.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE") == "1"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0")) or None
+
+# Les textes des différentes threads sont regroupés en micro-batchs :
+# chaque modèle n'encode qu'une fois par lot au lieu d'une fois par CV.
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_MAX_WAIT = 0.05  # secondes d'attente max pour compléter un lot
+
+# Cache disque des embeddings : un texte déjà encodé (même modèle, même texte
+# prétraité) n'est pas ré-encodé lors d'un nouveau passage.
+EMBEDDING_CACHE_DIR = "embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+
+# Découpage des CV longs (chunking.py) : EMBEDDING_CHUNKING=1 encode tout le texte en extraits
+# de max_seq_length jetons (CHUNK_OVERLAP jetons communs), regroupés par CHUNK_POOLING (mean|max),
+# au lieu de le tronquer ; CHUNK_MAX limite le nombre d'extraits par CV (0 = aucun plafond).
+# KEEP_CHUNKS=1 conserve les vecteurs d'extraits dans EMBEDDING_CHUNKS_DIR (clé : hash du texte prétraité).
+EMBEDDING_CHUNKING = os.getenv("EMBEDDING_CHUNKING") == "1"
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", str(DEFAULT_OVERLAP)))
+CHUNK_POOLING = os.getenv("CHUNK_POOLING", "mean")
+CHUNK_MAX = int(os.getenv("CHUNK_MAX", "0")) or None
+KEEP_CHUNKS = os.getenv("KEEP_CHUNKS") == "1"
+EMBEDDING_CHUNKS_DIR = "embedding_chunks"
+
+chunker = Chunker(overlap=CHUNK_OVERLAP, pooling=CHUNK_POOLING, max_chunks=CHUNK_MAX) if EMBEDDING_CHUNKING else None
+
+# Clients, caches et service d'embeddings : créés par init_services() au lancement du script, jamais à
+# l'import. Un processus qui importe ce module sans le lancer (processus d'extraction, qui réimportent
+# le script principal) ne configure pas l'API et n'ouvre ni cache ni thread.
+llm_cache = None
+gemini_limiter = None
+analysis_client = None
+model_registry = None
+embedding_cache = None
+chunk_store = None
+embedding_service = None
+
+
+def init_services():
+    """
+    Configure l'API Gemini et crée les clients, caches et service d'embeddings partagés.
+    """
+    global llm_cache, gemini_limiter, analysis_client, model_registry, embedding_cache, chunk_store
+    global embedding_service
+
+    if not API_KEY and not LLM_CACHE_REPLAY:
+        print("Erreur: Clé API Gemini non trouvée.")
+        exit()
+
+    # Import différé : inutile aux processus qui importent seulement ce module
+    import google.generativeai as genai
+    genai.configure(api_key=API_KEY)
+
+    llm_cache = LLMCache(LLM_CACHE_FILE, default_ttl=LLM_CACHE_TTL)
+    gemini_limiter = AdaptiveLimiter(GEMINI_RPM, GEMINI_TPM, max_concurrency=GEMINI_MAX_CONCURRENCY)
+
+    # Client d'analyse unique pour tout le processus
+    analysis_client = AnalysisClient(
+        MODEL_NAME,
+        generation_config,
+        limiter=gemini_limiter,
+        cache=llm_cache,
+        replay=LLM_CACHE_REPLAY,
+        refresh=LLM_CACHE_REFRESH,
+    )
+
+    if EMBEDDING_BACKEND == "onnx":
+        model_registry = ModelRegistry(
+            loader=onnx_loader(quantize=ONNX_QUANTIZE, threads=ONNX_THREADS),
+            idle_timeout=EMBEDDING_MODEL_IDLE_TIMEOUT,
+        )
+        # Vecteurs ONNX (fp32 ou int8) rangés à part des vecteurs torch dans le cache d'embeddings
+        embedding_variant = backend_variant(ONNX_QUANTIZE)
+    else:
+        model_registry = ModelRegistry(idle_timeout=EMBEDDING_MODEL_IDLE_TIMEOUT)
+        embedding_variant = None
 
+    embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    chunk_store = ChunkStore(EMBEDDING_CHUNKS_DIR) if chunker is not None and KEEP_CHUNKS else None
 
-# 3. Fonctions d'extraction de texte
-def extract_text_from_docx(file_path):
-    document = Document(file_path)
-    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+    embedding_service = EmbeddingService(
+        model_registry.lazy_models(EMBEDDING_MODELS),
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_wait=EMBEDDING_MAX_WAIT,
+        cache=embedding_cache,
+        chunker=chunker,
+        chunk_store=chunk_store,
+        variant=embedding_variant,
+    )
 
-def extract_text_from_pdf(file_path):
-    with open(file_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+# 3. Fonctions d'extraction de texte : voir extraction.py
 
 
 # 4. Prétraitement du texte
 def preprocess_text(text):
-    # Conversion en minuscule
-    text = text.lower()
-    # Suppression des caractères spéciaux
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return text
+    # Minuscules et ponctuation retirée, accents conservés (voir preprocessing.py)
+    return normalize_text(text, remove_stopwords=False)
 
 
 # --- Nouveau : fonction pour générer un dictionnaire d'embeddings
 def get_embeddings(preprocessed_text):
     """
-    Retourne un dict avec un vecteur d'embedding pour chaque modèle SentenceTransformer.
-    Les vecteurs sont convertis en listes (pour être JSON-serializable).
+    Retourne un dict avec un vecteur d'embedding (tableau numpy) pour chaque modèle SentenceTransformer.
     """
-    # Encode en batch avec [preprocessed_text] pour retourner un tableau de shape [1, dim]
-    embedding1 = model1.encode([preprocessed_text])[0].tolist()
-    embedding2 = model2.encode([preprocessed_text])[0].tolist()
-    embedding3 = model3.encode([preprocessed_text])[0].tolist()
-    #embedding4 = model4.encode([preprocessed_text])[0].tolist()
-
-    return {
-        "all-MPNet-base-v2": embedding1,
-        "paraphrase-MiniLM-L12-v2": embedding2,
-        "all-MiniLM-L12-v2": embedding3,
-        #"bert-base-nli-mean-tokens": embedding4
-    }
+    # Le texte est regroupé avec ceux des autres threads puis encodé par lot
+    return embedding_service.encode(preprocessed_text)
 
 
 # 5. Fonction d'analyse via l'API
 def analyze_cv(cv_text):
     """
-    Envoie le texte à l'API Generative AI avec un prompt adapté,
-    et gère le retry en cas de 429 (rate limit).
-    """
-    retries = 3
-    delay = 10
-
-    for attempt in range(retries):
-        try:
-            model = genai.GenerativeModel(
-                model_name="gemini-1.5-flash",
-                generation_config=generation_config,
-            )
-
-            # Préparation de l'historique pour le Chat
-            chat_session = model.start_chat(
-                history=[
-                    {
-                        "role": "user",
-                        "parts": [
-                            "Voici un CV. Veuillez extraire et structurer les informations demandées :",
-                            cv_text,
-                            """Le JSON que je souhaite en sortie doit avoir la forme :
-{
-  "candidat": {
-    "nom_prenom": "...",
-    "mail": "...",
-    "num_tel": "...",
-    "profil": "..."
-  },
-  "cv": {
-    "date_insertion": "YYYY-MM-DD",
-    "cv_text": "...",
-    "cv_text_nonpretraite": "...",
-    "competences": [...],
-    "experience": [
-      {
-        "poste": "...",
-        "entreprise": "...",
-        "date_debut": "...",
-        "date_fin": "...",
-        "missions": [...]
-      }
-    ],
-    "resume_cv": "...",
-    "commitment": "null",
-    "disponibilite": "null",
-    "exp_salaire": 0,
-    "domaine_etude": "...",
-    "langues": [...],
-    "education": [...]
-  }
-}
-
-Notes :
-- "date_insertion" correspond à la date du jour au format YYYY-MM-DD.
-- "commitment" et "disponibilite" sont "null" par défaut si non spécifié.
-- "exp_salaire" vaut un nombre, par exemple 150000.
-- Tu dois essayer de deviner, extraire ou adapter au mieux. 
-- S'il n'y a pas d'information, mets des chaînes vides ou "null".
-- Pas de commentaire dans le JSON, juste les champs demandés.
-"""
-                        ],
-                    }
-                ]
-            )
-
-            # Envoi du message final dans la conversation
-            response = chat_session.send_message(
-                "Génère uniquement ce JSON, sans balises de code. "
-                "Pas besoin de phrases supplémentaires ni d'explications."
-            )
-
-            # Nettoyage de la chaîne brute
-            response_text = response.text.strip()
-            # Enlever les éventuelles balises ```...```
-            response_text = re.sub(r"```(?:json)?(.*?)```", r"\1", response_text, flags=re.DOTALL)
-
-            # Tentative de chargement en JSON
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                # On retourne quand même le texte (ou vous pouvez le logger) pour déboguer
-                return response_text
-
-        except Exception as e:
-            # Gestion du quota (429)
-            if "429" in str(e):
-                print(f"Erreur 429 (rate limit) - tentative {attempt+1}/{retries}, "
-                      f"nouvel essai dans {delay}s.")
-                time.sleep(delay)
-                delay *= 2
-            else:
-                print(f"Erreur lors de l'analyse du CV : {str(e)}")
-                print(traceback.format_exc())
-                break
-
-    return None
-
-
-def load_or_init_results(output_file):
-    """
-    Charge les résultats existants si le JSON est valide.
-    Sinon, renvoie une liste vide.
+    Envoie le texte à l'API Generative AI via le client partagé :
+    un seul modèle par processus, un appel generate_content par CV,
+    sortie JSON imposée par schéma, cache LLM et limiteur Gemini.
     """
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: fichier JSON invalide, on va le remplacer.")
-    return []
+    return analysis_client.analyze(cv_text)
 
 
 # 6. Fonction pour traiter un CV
-def process_cv_file(cv_file_path):
+def process_cv_file(cv_file_path, vector_store, work_queue, preprocessed_text=None, dedup_index=None):
     """
     Lit le fichier CV, prétraite le texte, puis appelle l'API pour obtenir
-    un JSON structuré. Retourne un dict fusionné (file_name + contenu IA + embeddings).
+    un JSON structuré. Retourne un dict fusionné (file_name + contenu IA + ligne des embeddings) ;
+    les embeddings sont écrits dans vector_store. Chaque étape franchie est notée dans work_queue ;
+    preprocessed_text : texte déjà extrait lors d'un passage précédent (l'extraction est sautée).
+    dedup_index : un texte quasi identique à celui d'un CV déjà connu n'est ni encodé ni analysé.
     """
-    if cv_file_path.endswith(".docx"):
-        cv_text = extract_text_from_docx(cv_file_path)
-    elif cv_file_path.endswith(".pdf"):
-        cv_text = extract_text_from_pdf(cv_file_path)
-    else:
-        # Format non pris en charge
-        return None
-
-    # Prétraitement
-    preprocessed_text = preprocess_text(cv_text)
+    if preprocessed_text is None:
+        if cv_file_path.endswith(".docx"):
+            cv_text = extract_text_from_docx(cv_file_path)
+        elif cv_file_path.endswith(".pdf"):
+            cv_text = extract_text_from_pdf(cv_file_path)
+        else:
+            # Format non pris en charge
+            return None
+
+        # Prétraitement
+        preprocessed_text = preprocess_text(cv_text)
+
+        match = dedup_index.check_text(cv_file_path, preprocessed_text) if dedup_index is not None else None
+        if match is not None:
+            work_queue.mark_duplicate(cv_file_path)
+            print(f"Doublon : {os.path.basename(cv_file_path)} quasi identique à {match[0]} "
+                  f"(distance {match[1]}), non retraité.")
+            return None
+        work_queue.mark_extracted(cv_file_path, preprocessed_text)
 
     # --- Nouveau : création des embeddings
     cv_vectors = get_embeddings(preprocessed_text)
+    work_queue.mark_embedded(cv_file_path)
 
     # Appel à l'API (avec le texte prétraité)
     analysis = analyze_cv(cv_text=preprocessed_text)
 
     # On s'assure que 'analysis' est bien un dict
     if analysis and isinstance(analysis, dict):
-        # On fusionne file_name + champs du JSON IA + "cv_vector"
+        # On fusionne file_name + champs du JSON IA + "cv_vector_row" (vecteurs dans vector_store)
+        file_name = os.path.basename(cv_file_path)
         final_json = {
-            "file_name": os.path.basename(cv_file_path),
+            "file_name": file_name,
             # Ajout optionnel du texte brut ou prétraité si vous le souhaitez
             # "raw_text": cv_text,
             # "preprocessed_text": preprocessed_text,
-            "cv_vector": cv_vectors  
+            "cv_vector_row": vector_store.add(file_name, cv_vectors)
         }
         final_json.update(analysis)
         return final_json
     else:
         # Si pas de JSON valide, on peut retourner None pour l'ignorer
+        work_queue.mark_failed(cv_file_path, "analyse", "analyse échouée")
         return None
 
 
 # 7. Fonction principale
 def process_all_cvs(cv_folder, output_file):
     """
-    - Charge les résultats existants.
-    - Cherche les PDF/DOCX non encore traités.
-    - Lance le traitement en parallèle.
-    - Sauvegarde en une seule fois à la fin.
+    - Reprend l'état de chaque CV dans la file persistante (cvs.queue.sqlite).
+    - Ajoute les nouveaux PDF/DOCX, puis traite les CV restants en parallèle,
+      à partir de l'étape atteinte lors du passage précédent.
+    - Ecrit chaque résultat dès sa fin dans le journal (cvs.jsonl) ;
+      output_file est reconstruit à partir du journal à la fin.
     """
     if not os.path.isdir(cv_folder):
         print(f"Erreur: Le dossier {cv_folder} n'existe pas.")
         return
 
-    # On charge l'ancien JSON
-    results = load_or_init_results(output_file)
+    # Un arrêt en cours de passage ne perd que les CV en cours : les autres sont déjà dans le journal
+    journal_file = default_journal_path(output_file)
+    init_journal(journal_file, legacy_file=output_file)
+    write_lock = Lock()
 
-    # Liste des fichiers déjà traités
-    processed_files = {res["file_name"] for res in results}
+    # À la création de la file, les CV déjà présents dans le journal y sont notés comme terminés
+    work_queue = WorkQueue(default_queue_path(output_file), max_attempts=MAX_ATTEMPTS)
+    if work_queue.is_empty():
+        work_queue.mark_analyzed_names(load_processed_files(journal_file))
 
-    # Liste des CV à traiter
-    cv_files = [
+    # Liste des CV à traiter : nouveaux, interrompus, ou en échec à retenter
+    work_queue.add(
         os.path.join(cv_folder, f)
         for f in os.listdir(cv_folder)
-        if f.endswith(('.pdf', '.docx')) and f not in processed_files
-    ]
+        if f.endswith(('.pdf', '.docx'))
+    )
+    pending = work_queue.pending()
+
+    # Empreinte du contenu avant tout travail : une copie d'un CV déjà connu est reliée à l'original
+    dedup_index = DedupIndex(default_dedup_path(output_file), max_distance=NEAR_DUPLICATE_DISTANCE) if DEDUP else None
+    if dedup_index is not None:
+        remaining = []
+        for cv_file_path, state, text in pending:
+            original = dedup_index.check_file(cv_file_path) if text is None else None
+            if original is not None:
+                work_queue.mark_duplicate(cv_file_path)
+                print(f"Doublon : {os.path.basename(cv_file_path)} identique à {original}, non retraité.")
+            else:
+                remaining.append((cv_file_path, state, text))
+        # Copies d'un original modifié, devenues originales de l'ancien contenu : traitées à leur tour
+        promoted = [os.path.join(cv_folder, name) for name in dedup_index.take_promoted()]
+        work_queue.requeue(promoted)
+        pending = remaining + [(cv_file_path, "pending", None) for cv_file_path in promoted]
 
-    print(f"Nombre de CVs à traiter : {len(cv_files)}")
+    print(f"Nombre de CVs à traiter : {len(pending)}")
 
-    new_results = []
-    # Ajustez max_workers selon vos ressources / quotas
-    max_workers = 5
+    # Autant de threads que la concurrence Gemini maximale : le limiteur
+    # adaptatif décide ensuite combien d'appels partent réellement en parallèle.
+    max_workers = GEMINI_MAX_CONCURRENCY
+    # Vecteurs binaires à côté de output_file (cv1.json -> cv1.vectors/), un espace par modèle
+    vector_store = VectorStore(default_store_dir(output_file), dtype=VECTOR_DTYPE)
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = {
-            executor.submit(process_cv_file, cv_file_path): cv_file_path
-            for cv_file_path in cv_files
+            executor.submit(process_cv_file, cv_file_path, vector_store, work_queue, text, dedup_index): cv_file_path
+            for cv_file_path, _, text in pending
         }
 
         for future in as_completed(futures):
@@ -278,23 +321,45 @@ def process_all_cvs(cv_folder, output_file):
             try:
                 result = future.result()
                 if result:
-                    new_results.append(result)
-                    print(f"Traitement terminé pour : {os.path.basename(cv_file_path)}")
+                    append_result(journal_file, result, write_lock)
+                    work_queue.mark_analyzed(cv_file_path)
+                    print(f"Traitement terminé pour : {os.path.basename(cv_file_path)} "
+                          f"(concurrence Gemini : {gemini_limiter.current_limit})")
             except Exception as e:
+                work_queue.mark_failed(cv_file_path, "traitement", e)
                 print(f"Erreur dans le thread pour {cv_file_path}: {str(e)}")
                 traceback.print_exc()
 
-    # Fusion des anciens et nouveaux résultats
-    results.extend(new_results)
-
-    # Sauvegarde en un seul bloc
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=4, ensure_ascii=False)
+    # Lots d'encodage en attente écrits dans les caches avant leur fermeture
+    embedding_service.close()
+    vector_store.close()
+    if chunk_store is not None:
+        chunk_store.close()
+    if dedup_index is not None:
+        dedup_index.close()
+    queue_stats = work_queue.stats()
+    work_queue.close()
+    embedding_cache.close()
+    llm_cache.close()
+    print(f"File : {queue_stats['analyzed']} CV terminés, {queue_stats['duplicate']} doublons, "
+          f"{queue_stats['failed']} en échec.")
+
+    # Reconstruction du fichier JSON historique à partir du journal
+    compact_journal(journal_file, output_file)
 
     print(f"Tous les CVs ont été traités. Résultats sauvegardés dans {output_file}")
+    cache_stats = embedding_cache.stats()
+    print(f"Cache d'embeddings : {cache_stats['hits']} succès, {cache_stats['misses']} échecs "
+          f"(taux de succès {cache_stats['hit_rate']:.0%}).")
+    limiter_stats = gemini_limiter.stats()
+    print(f"Appels Gemini : {limiter_stats['successes']} réussis, {limiter_stats['rate_limited']} refusés (429), "
+          f"concurrence finale {limiter_stats['current_limit']}.")
+    llm_stats = llm_cache.stats()
+    print(f"Cache LLM : {llm_stats['hits']} réponses réutilisées, {llm_stats['misses']} absentes du cache.")
 
 
 if __name__ == "__main__":
     cv_folder = 'cv'
     output_file = 'cvs.json'
+    init_services()
     process_all_cvs(cv_folder, output_file)
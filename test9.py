@@ -1,30 +1,46 @@
 import os
-import json
-import PyPDF2
-import google.generativeai as genai
-from dotenv import load_dotenv
 import time
+import asyncio
+from dotenv import load_dotenv
 import traceback
-from docx import Document
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import re
-from datetime import date
+from preprocessing import preprocess_text as normalize_text
 from threading import Lock
 
+from result_journal import (
+    append_result,
+    compact_journal,
+    default_journal_path,
+    init_journal,
+    load_processed_files,
+)
+
 # --- import des embeddings
-from sentence_transformers import SentenceTransformer
+from model_registry import ModelRegistry, configured_models
+from onnx_backend import onnx_loader, backend_variant
+from embedding_service import EmbeddingService
+from embedding_cache import EmbeddingCache
+from chunking import Chunker, ChunkStore, DEFAULT_OVERLAP
+from llm_cache import LLMCache
+from rate_limiter import AdaptiveLimiter
+from analysis_client import AnalysisClient, pack_batches
+from pipeline import run_pipeline
+from extraction import ExtractionPool, extract_text
+from vector_store import VectorStore, default_store_dir
+from work_queue import WorkQueue, default_queue_path
+from watcher import CVWatcher
+from dedup import DedupIndex, default_dedup_path
 
 # 1. Chargement de la clé API
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
 
-if not API_KEY:
-    print("Erreur: Clé API Gemini non trouvée.")
-    exit()
-
-# 2. Configuration de l'API Generative AI
-genai.configure(api_key=API_KEY)
+# Mode replay : les réponses sont relues depuis le cache LLM, sans aucun appel API
+LLM_CACHE_REPLAY = os.getenv("LLM_CACHE_REPLAY") == "1"
+# Ignore les réponses en cache et force un nouvel appel (les nouvelles réponses remplacent les anciennes)
+LLM_CACHE_REFRESH = os.getenv("LLM_CACHE_REFRESH") == "1"
 
+# 2. Configuration de l'API Generative AI (appliquée par init_services)
 # Configuration du modèle : ajustez selon vos besoins
 generation_config = {
     "temperature": 1,
@@ -33,254 +49,472 @@ generation_config = {
     "max_output_tokens": 381920,  
 }
 
-# --- Chargement de 3 modèles SentenceTransformer
-model1 = SentenceTransformer('all-MPNet-base-v2')
-model2 = SentenceTransformer('paraphrase-MiniLM-L12-v2')
-model3 = SentenceTransformer('all-MiniLM-L12-v2')
+MODEL_NAME = "gemini-1.5-flash"
+
+# Cache local des réponses (clé : modèle, generation_config, version du prompt, hash du CV).
+# La version du prompt (PROMPT_VERSION) est définie dans analysis_client.py.
+LLM_CACHE_FILE = "llm_cache.sqlite"
+LLM_CACHE_TTL = None  # secondes ; None = pas d'expiration
+
+# Limitation partagée des appels Gemini : budgets RPM / TPM du projet et
+# nombre d'appels simultanés ajusté automatiquement (AIMD) selon les 429 reçus.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+
+# Mode lot (optionnel) : plusieurs CV par requête Gemini. 1 = un CV par requête.
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "1"))
+ANALYSIS_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "30000"))
+
+# Concurrence de chaque étape du pipeline (extraction -> embeddings -> analyse).
+# L'extraction tourne dans des processus (un par cœur par défaut), par paquets de fichiers,
+# avec un délai maximal par fichier au-delà duquel le processus est tué et remplacé.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 4)))
+EXTRACTION_CHUNK_SIZE = int(os.getenv("EXTRACTION_CHUNK_SIZE", "4"))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "60"))
+# Lecture partielle des PDF : le prompt n'a besoin que des premières pages (0 = document entier)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0")) or None
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "0")) or None
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "64"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+
+# File de travail persistante à côté de output_file (cv2.json -> cv2.queue.sqlite) : état de chaque CV
+# par étape, reprise à l'étape exacte ; un CV en échec MAX_ATTEMPTS fois n'est plus retenté
+# (python work_queue.py cv2.queue.sqlite --retry-failed pour le remettre en file).
+MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "3"))
+
+# Mode démon (WATCH=1) : après le premier passage, le dossier est surveillé (watchdog) et chaque
+# CV déposé ou modifié est traité quelques secondes après la fin de son écriture (WATCH_DEBOUNCE).
+# WATCH_POLLING=1 pour un dossier réseau ; output_file est reconstruit au plus toutes les
+# WATCH_COMPACT_INTERVAL secondes (le journal est à jour en continu). Avec EMBEDDING_MODEL_IDLE_TIMEOUT,
+# les modèles sont déchargés entre deux arrivées.
+WATCH = os.getenv("WATCH") == "1"
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "2"))
+WATCH_POLLING = os.getenv("WATCH_POLLING") == "1"
+WATCH_COMPACT_INTERVAL = float(os.getenv("WATCH_COMPACT_INTERVAL", "300"))
+
+# Doublons (dedup.py, index cv2.dedup.sqlite) : un fichier de même contenu qu'un CV déjà connu, ou dont
+# le texte extrait en est très proche (SimHash à distance <= NEAR_DUPLICATE_DISTANCE, 15 au plus ; -1 = désactivé)
+# est relié à l'original au lieu d'être encodé et analysé. DEDUP=0 désactive la détection.
+DEDUP = os.getenv("DEDUP", "1") == "1"
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "10"))
+
+# Vecteurs stockés en binaire à côté de output_file (cv2.json -> cv2.vectors/), un espace par modèle ;
+# le résultat JSON ne garde que "cv_vector_row". float16 divise encore la taille par deux.
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")
+
+# --- Modèles SentenceTransformer, chargés à la première demande d'encodage
+# (un passage sans nouveau CV, ou entièrement servi par le cache, n'en charge aucun).
+# EMBEDDING_MODELS : modèles utilisés, séparés par des virgules (par défaut les trois ;
+# les espaces du dossier de vecteurs doivent rester les mêmes d'un passage à l'autre).
+# EMBEDDING_MODEL_IDLE_TIMEOUT : secondes d'inactivité avant déchargement d'un modèle (0 = jamais).
+EMBEDDING_MODELS = configured_models()
+EMBEDDING_MODEL_IDLE_TIMEOUT = float(os.getenv("EMBEDDING_MODEL_IDLE_TIMEOUT", "0")) or None
+
+# EMBEDDING_BACKEND=onnx : modèles exportés une fois en ONNX (onnx_models/) et exécutés par onnxruntime ;
+# ONNX_QUANTIZE=1 : poids int8 (plus rapide, parité contrôlée à l'export) ; ONNX_THREADS : threads intra-op.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE") == "1"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0")) or None
+
+# Regroupement des textes des threads en micro-batchs (un encodage par modèle et par lot)
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_MAX_WAIT = 0.05  # secondes
+
+# Cache disque des embeddings (clé : modèle + hash du texte prétraité)
+EMBEDDING_CACHE_DIR = "embedding_cache"
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+
+# Découpage des CV longs (chunking.py) : EMBEDDING_CHUNKING=1 encode tout le texte en extraits
+# de max_seq_length jetons (CHUNK_OVERLAP jetons communs), regroupés par CHUNK_POOLING (mean|max),
+# au lieu de le tronquer ; CHUNK_MAX limite le nombre d'extraits par CV (0 = aucun plafond).
+# KEEP_CHUNKS=1 conserve les vecteurs d'extraits dans EMBEDDING_CHUNKS_DIR (clé : hash du texte prétraité).
+EMBEDDING_CHUNKING = os.getenv("EMBEDDING_CHUNKING") == "1"
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", str(DEFAULT_OVERLAP)))
+CHUNK_POOLING = os.getenv("CHUNK_POOLING", "mean")
+CHUNK_MAX = int(os.getenv("CHUNK_MAX", "0")) or None
+KEEP_CHUNKS = os.getenv("KEEP_CHUNKS") == "1"
+EMBEDDING_CHUNKS_DIR = "embedding_chunks"
+
+chunker = Chunker(overlap=CHUNK_OVERLAP, pooling=CHUNK_POOLING, max_chunks=CHUNK_MAX) if EMBEDDING_CHUNKING else None
+
+# Clients, caches et service d'embeddings : créés par init_services() au lancement du script, jamais à
+# l'import. Un processus qui importe ce module sans le lancer (processus d'extraction, qui réimportent
+# le script principal) ne configure pas l'API et n'ouvre ni cache ni thread.
+llm_cache = None
+gemini_limiter = None
+analysis_client = None
+model_registry = None
+embedding_cache = None
+chunk_store = None
+embedding_service = None
+
+
+def init_services():
+    """
+    Configure l'API Gemini et crée les clients, caches et service d'embeddings partagés.
+    """
+    global llm_cache, gemini_limiter, analysis_client, model_registry, embedding_cache, chunk_store
+    global embedding_service
+
+    if not API_KEY and not LLM_CACHE_REPLAY:
+        print("Erreur: Clé API Gemini non trouvée.")
+        exit()
+
+    # Import différé : inutile aux processus qui importent seulement ce module
+    import google.generativeai as genai
+    genai.configure(api_key=API_KEY)
+
+    llm_cache = LLMCache(LLM_CACHE_FILE, default_ttl=LLM_CACHE_TTL)
+    gemini_limiter = AdaptiveLimiter(GEMINI_RPM, GEMINI_TPM, max_concurrency=GEMINI_MAX_CONCURRENCY)
+
+    # Client d'analyse unique pour tout le processus
+    analysis_client = AnalysisClient(
+        MODEL_NAME,
+        generation_config,
+        limiter=gemini_limiter,
+        cache=llm_cache,
+        replay=LLM_CACHE_REPLAY,
+        refresh=LLM_CACHE_REFRESH,
+    )
+
+    if EMBEDDING_BACKEND == "onnx":
+        model_registry = ModelRegistry(
+            loader=onnx_loader(quantize=ONNX_QUANTIZE, threads=ONNX_THREADS),
+            idle_timeout=EMBEDDING_MODEL_IDLE_TIMEOUT,
+        )
+        # Vecteurs ONNX (fp32 ou int8) rangés à part des vecteurs torch dans le cache d'embeddings
+        embedding_variant = backend_variant(ONNX_QUANTIZE)
+    else:
+        model_registry = ModelRegistry(idle_timeout=EMBEDDING_MODEL_IDLE_TIMEOUT)
+        embedding_variant = None
+
+    embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    chunk_store = ChunkStore(EMBEDDING_CHUNKS_DIR) if chunker is not None and KEEP_CHUNKS else None
 
+    embedding_service = EmbeddingService(
+        model_registry.lazy_models(EMBEDDING_MODELS),
+        batch_size=EMBEDDING_BATCH_SIZE,
+        max_wait=EMBEDDING_MAX_WAIT,
+        cache=embedding_cache,
+        chunker=chunker,
+        chunk_store=chunk_store,
+        variant=embedding_variant,
+    )
 
-# 3. Fonctions d'extraction de texte
-def extract_text_from_docx(file_path):
-    document = Document(file_path)
-    return "\n".join(paragraph.text for paragraph in document.paragraphs)
 
-def extract_text_from_pdf(file_path):
-    with open(file_path, 'rb') as f:
-        reader = PyPDF2.PdfReader(f)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
+# 3. Fonctions d'extraction de texte : voir extraction.py
 
 # 4. Prétraitement du texte
 def preprocess_text(text):
-    # Conversion en minuscule
-    text = text.lower()
-    # Suppression des caractères spéciaux
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return text
+    # Minuscules et ponctuation retirée, accents conservés (voir preprocessing.py)
+    return normalize_text(text, remove_stopwords=False)
 
 # 5. Concaténation des embeddings
 def get_concatenated_embeddings(preprocessed_text):
     """
     Retourne un unique vecteur (liste de floats) qui est la concaténation
-    des embeddings issus de model1, model2 et model3.
+    des embeddings des modèles de EMBEDDING_MODELS.
+    L'encodage est mutualisé par lot avec les autres threads.
     """
-    emb1 = model1.encode([preprocessed_text])[0].tolist()
-    emb2 = model2.encode([preprocessed_text])[0].tolist()
-    emb3 = model3.encode([preprocessed_text])[0].tolist()
+    return concatenate_vectors(embedding_service.encode(preprocessed_text))
 
-    concatenated_vector = emb1 + emb2 + emb3
-    return concatenated_vector
 
-# 6. Analyse du CV via l'API Generative AI
-def analyze_cv(cv_text):
+def concatenate_vectors(vectors):
     """
-    Envoie le texte à l'API Generative AI avec un prompt adapté,
-    et gère le retry en cas de 429 (rate limit).
+    Concatène les vecteurs {modèle: vecteur} dans l'ordre des modèles.
     """
-    retries = 3
-    delay = 30
-
-    for attempt in range(retries):
-        try:
-            model = genai.GenerativeModel(
-                model_name="gemini-1.5-flash",
-                generation_config=generation_config,
-            )
-
-            chat_session = model.start_chat(
-                history=[
-                    {
-                        "role": "user",
-                        "parts": [
-                            "Voici un CV. Veuillez extraire et structurer les informations demandées :",
-                            cv_text,
-                            """Le JSON que je souhaite en sortie doit avoir la forme :
-{
-  "candidat": {
-    "nom_prenom": "...",
-    "mail": "...",
-    "num_tel": "...",
-    "profil": "..."
-  },
-  "cv": {
-    "date_insertion": "YYYY-MM-DD",
-    "cv_text": "...",
-    "cv_text_nonpretraite": "...",
-    "competences": [...],
-    "experience": [
-      {
-        "poste": "...",
-        "entreprise": "...",
-        "date_debut": "...",
-        "date_fin": "...",
-        "missions": [...]
-      }
-    ],
-    "resume_cv": "...",
-    "commitment": "null",
-    "disponibilite": "null",
-    "exp_salaire": 0,
-    "domaine_etude": "...",
-    "langues": [...],
-    "education": [...]
-  }
-}
+    concatenated_vector = []
+    for vector in vectors.values():
+        concatenated_vector.extend(vector.tolist())
+    return concatenated_vector
 
-Notes :
-- "date_insertion" correspond à la date du jour au format YYYY-MM-DD.
-- "commitment" et "disponibilite" sont "null" par défaut si non spécifié.
-- "exp_salaire" vaut un nombre, par exemple 150000.
-- Tu dois essayer de deviner, extraire ou adapter au mieux. 
-- S'il n'y a pas d'information, mets des chaînes vides ou "null".
-- Pas de commentaire dans le JSON, juste les champs demandés.
-"""
-                        ],
-                    }
-                ]
-            )
-
-            response = chat_session.send_message(
-                "Génère uniquement ce JSON, sans balises de code. "
-                "Pas besoin de phrases supplémentaires ni d'explications."
-            )
-
-            response_text = response.text.strip()
-            # Enlever les éventuelles balises ```...```
-            response_text = re.sub(r"```(?:json)?(.*?)```", r"\1", response_text, flags=re.DOTALL)
-
-            # Tenter de parser en JSON
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                # En cas d'erreur, on peut renvoyer la chaîne brute pour debug
-                return response_text
-
-        except Exception as e:
-            if "429" in str(e):
-                print(f"Erreur 429 (rate limit) - tentative {attempt+1}/{retries}, "
-                      f"nouvel essai dans {delay}s.")
-                time.sleep(delay)
-                delay *= 2
-            else:
-                print(f"Erreur lors de l'analyse du CV : {str(e)}")
-                print(traceback.format_exc())
-                break
-
-    return None
-
-
-def load_or_init_results(output_file):
+# 6. Analyse du CV via l'API Generative AI
+def analyze_cv(cv_text):
     """
-    Charge les résultats existants si le JSON est valide.
-    Sinon, renvoie une liste vide.
+    Envoie le texte à l'API Generative AI via le client partagé :
+    un seul modèle par processus, un appel generate_content par CV,
+    sortie JSON imposée par schéma, cache LLM et limiteur Gemini.
     """
-    if os.path.exists(output_file):
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print("Warning: fichier JSON invalide, on va le remplacer.")
-    return []
+    return analysis_client.analyze(cv_text)
 
 
-# --- Nouveau : fonction pour éviter les conflits d'écriture concurrente
-def safe_append_result(output_file, new_entry, lock):
+# 7. Fonctions pour traiter un CV
+def extract_cv_text(cv_file_path):
     """
-    Lit le JSON existant (ou initialise une liste),
-    ajoute l'entrée new_entry,
-    et réécrit le tout dans le fichier.
-    Le lock assure qu'une seule thread écrit à la fois.
+    Extraction et prétraitement du texte d'un CV.
+    Retourne None si le format n'est pas pris en charge.
     """
-    lock.acquire()
-    try:
-        results = load_or_init_results(output_file)
-        results.append(new_entry)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=4, ensure_ascii=False)
-    finally:
-        lock.release()
-
-
-# 7. Fonction pour traiter un CV
-def process_cv_file(cv_file_path):
-    if cv_file_path.endswith(".docx"):
-        cv_text = extract_text_from_docx(cv_file_path)
-    elif cv_file_path.endswith(".pdf"):
-        cv_text = extract_text_from_pdf(cv_file_path)
-    else:
+    cv_text = extract_text(cv_file_path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS)
+    if cv_text is None:
         return None  # Format non pris en charge
 
-    # Prétraitement
-    preprocessed_text = preprocess_text(cv_text)
-
-    # Embeddings concaténés
-    concatenated_vector = get_concatenated_embeddings(preprocessed_text)
+    return preprocess_text(cv_text)
 
-    # Analyse via l'API
-    analysis = analyze_cv(cv_text=preprocessed_text)
 
-    # On vérifie que l'analyse est un dict
+def build_result(cv_file_path, vectors, analysis, vector_store):
+    """
+    Fusionne file_name + ligne des vecteurs + JSON de l'analyse, si l'analyse est un dict.
+    Les vecteurs {modèle: vecteur} sont écrits dans vector_store.
+    """
     if analysis and isinstance(analysis, dict):
+        file_name = os.path.basename(cv_file_path)
         final_json = {
-            "file_name": os.path.basename(cv_file_path),
-            "cv_vector": concatenated_vector
+            "file_name": file_name,
+            "cv_vector_row": vector_store.add(file_name, vectors)
         }
         final_json.update(analysis)
         return final_json
     else:
-        
         return None
 
 
+def process_cv_files_batched(cv_files, journal_file, write_lock, max_workers, extraction_pool, vector_store,
+                             work_queue, texts, is_duplicate=None):
+    """
+    Mode lot : extraction (processus) + embeddings par micro-batchs, puis analyse de plusieurs CV
+    par requête Gemini (lots limités par ANALYSIS_BATCH_TOKEN_BUDGET et ANALYSIS_BATCH_SIZE).
+    texts : textes prétraités des CV déjà extraits lors d'un passage précédent.
+    is_duplicate(path, texte) : écarte les quasi-doublons après l'extraction (optionnel).
+    """
+    texts = dict(texts)
+    to_extract = [cv_file_path for cv_file_path in cv_files if cv_file_path not in texts]
+    for cv_file_path, cv_text, error in extraction_pool.imap(to_extract):
+        if error is not None:
+            print(f"Erreur d'extraction pour {cv_file_path}: {str(error)}")
+            work_queue.mark_failed(cv_file_path, "extraction", error)
+        elif cv_text is None:
+            work_queue.mark_failed(cv_file_path, "extraction", "format non pris en charge")
+        else:
+            preprocessed_text = preprocess_text(cv_text)
+            if is_duplicate is not None and is_duplicate(cv_file_path, preprocessed_text):
+                continue
+            texts[cv_file_path] = preprocessed_text
+            work_queue.mark_extracted(cv_file_path, preprocessed_text)
+
+    vectors = embedding_service.encode_many(list(texts.values()))
+    prepared = {
+        cv_file_path: (preprocessed_text, cv_vectors)
+        for (cv_file_path, preprocessed_text), cv_vectors in zip(texts.items(), vectors)
+    }
+    for cv_file_path in prepared:
+        work_queue.mark_embedded(cv_file_path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        batches = pack_batches(
+            [(cv_file_path, preprocessed_text) for cv_file_path, (preprocessed_text, _) in prepared.items()],
+            token_budget=ANALYSIS_BATCH_TOKEN_BUDGET,
+            max_items=ANALYSIS_BATCH_SIZE,
+        )
+        print(f"{len(prepared)} CVs à analyser en {len(batches)} requêtes.")
+
+        futures = {executor.submit(analysis_client.analyze_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                analyses = future.result()
+            except Exception as e:
+                print(f"Erreur dans le thread pour un lot de {len(futures[future])} CVs: {str(e)}")
+                traceback.print_exc()
+                for cv_file_path, _ in futures[future]:
+                    work_queue.mark_failed(cv_file_path, "analyse", e)
+                continue
+
+            for cv_file_path, analysis in analyses.items():
+                result = build_result(cv_file_path, prepared[cv_file_path][1], analysis, vector_store)
+                if result:
+                    append_result(journal_file, result, write_lock)
+                    work_queue.mark_analyzed(cv_file_path)
+                    print(f"Traitement terminé pour : {os.path.basename(cv_file_path)}")
+                else:
+                    work_queue.mark_failed(cv_file_path, "analyse", "analyse échouée")
+                    print(f"Pas de résultat pour {os.path.basename(cv_file_path)} (analyse échouée).")
+
+
 # 8. Fonction principale
-def process_all_cvs(cv_folder, output_file):
+def process_all_cvs(cv_folder, output_file, journal_file=None, watch=False):
+    """
+    Traite les CV du dossier non encore terminés ; avec watch=True, reste ensuite actif
+    et traite chaque CV déposé ou modifié dans le dossier dès que son écriture est finie.
+    """
     if not os.path.isdir(cv_folder):
         print(f"Erreur: Le dossier {cv_folder} n'existe pas.")
         return
 
-    # Chargement du JSON pour voir quels CV sont déjà traités
-    existing_results = load_or_init_results(output_file)
-    processed_files = {res["file_name"] for res in existing_results if "file_name" in res}
+    # Les résultats sont ajoutés dans un journal JSONL (une ligne par CV),
+    # output_file n'est reconstruit qu'une fois à la fin.
+    journal_file = journal_file or default_journal_path(output_file)
+    init_journal(journal_file, legacy_file=output_file)
+
+    # État de chaque CV dans la file persistante ; à sa création, les CV déjà présents
+    # dans le journal y sont enregistrés comme terminés (seule lecture complète du journal).
+    work_queue = WorkQueue(default_queue_path(output_file), max_attempts=MAX_ATTEMPTS)
+    if work_queue.is_empty():
+        work_queue.mark_analyzed_names(load_processed_files(journal_file))
+
+    # Le watcher démarre avant la lecture du dossier : un CV déposé pendant le premier passage n'est pas manqué
+    watcher = CVWatcher(cv_folder, debounce=WATCH_DEBOUNCE, polling=WATCH_POLLING).start() if watch else None
 
-    # Repérage des CVs non encore traités
-    cv_files = [
+    # Nouveaux CV du dossier ajoutés à la file, puis CV restants (nouveaux, interrompus ou à retenter)
+    work_queue.add(
         os.path.join(cv_folder, f)
         for f in os.listdir(cv_folder)
-        if f.endswith(('.pdf', '.docx')) and f not in processed_files
-    ]
+        if f.endswith(('.pdf', '.docx'))
+    )
 
-    print(f"Nombre de CVs à traiter : {len(cv_files)}")
-
-    # Création d'un verrou pour l'écriture concurrente dans le fichier JSON
+    # Création d'un verrou pour l'écriture concurrente dans le journal
     write_lock = Lock()
 
-    # ThreadPoolExecutor
-    max_workers = 1
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(process_cv_file, cv_file_path): cv_file_path
-            for cv_file_path in cv_files
-        }
-
-        for future in as_completed(futures):
-            cv_file_path = futures[future]
-            try:
-                result = future.result()
-                if result:
-                    # Ecriture immédiate dans le fichier JSON
-                    safe_append_result(output_file, result, write_lock)
-                    print(f"Traitement terminé pour : {os.path.basename(cv_file_path)}")
-                else:
-                    print(f"Pas de résultat pour {os.path.basename(cv_file_path)} (analyse échouée).")
-            except Exception as e:
-                print(f"Erreur dans le thread pour {cv_file_path}: {str(e)}")
-                traceback.print_exc()
+    # Threads d'analyse : le nombre d'appels Gemini simultanés est piloté par gemini_limiter
+    max_workers = GEMINI_MAX_CONCURRENCY
+    extraction_pool = ExtractionPool(
+        workers=EXTRACTION_WORKERS, chunk_size=EXTRACTION_CHUNK_SIZE, timeout=EXTRACTION_TIMEOUT,
+        max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS,
+    )
+    vector_store = VectorStore(default_store_dir(output_file), dtype=VECTOR_DTYPE)
+    dedup_index = DedupIndex(default_dedup_path(output_file), max_distance=NEAR_DUPLICATE_DISTANCE) if DEDUP else None
+
+    def is_duplicate_file(cv_file_path):
+        """
+        Contenu identique à un CV déjà connu : relié à l'original, sans extraction.
+        """
+        try:
+            original = dedup_index.check_file(cv_file_path)
+        except OSError as e:
+            print(f"Empreinte impossible pour {cv_file_path}: {str(e)}")
+            return False
+        if original is None:
+            return False
+        work_queue.mark_duplicate(cv_file_path)
+        print(f"Doublon : {os.path.basename(cv_file_path)} identique à {original}, non retraité.")
+        return True
+
+    def is_near_duplicate(cv_file_path, preprocessed_text):
+        match = dedup_index.check_text(cv_file_path, preprocessed_text)
+        if match is None:
+            return False
+        original, distance = match
+        work_queue.mark_duplicate(cv_file_path)
+        print(f"Doublon : {os.path.basename(cv_file_path)} quasi identique à {original} "
+              f"(distance {distance}), non retraité.")
+        return True
+
+    def on_result(cv_file_path, vectors, analysis):
+        result = build_result(cv_file_path, vectors, analysis, vector_store)
+        if result:
+            # Ecriture immédiate dans le journal
+            append_result(journal_file, result, write_lock)
+            work_queue.mark_analyzed(cv_file_path)
+            print(f"Traitement terminé pour : {os.path.basename(cv_file_path)} "
+                  f"(concurrence Gemini : {gemini_limiter.current_limit})")
+        else:
+            work_queue.mark_failed(cv_file_path, "analyse", "analyse échouée")
+            print(f"Pas de résultat pour {os.path.basename(cv_file_path)} (analyse échouée).")
+
+    def process_pending():
+        """
+        Traite les CV restants de la file (nouveaux, interrompus ou à retenter).
+        """
+        pending = work_queue.pending()
+        if dedup_index is not None:
+            # Empreinte du fichier avant tout travail (les CV déjà extraits ont déjà été vérifiés)
+            pending = [row for row in pending if row[2] is not None or not is_duplicate_file(row[0])]
+            # Copies d'un original modifié, devenues originales de l'ancien contenu : traitées à leur tour
+            promoted = [os.path.join(cv_folder, name) for name in dedup_index.take_promoted()]
+            work_queue.requeue(promoted)
+            pending += [(cv_file_path, "pending", None) for cv_file_path in promoted]
+        cv_files = [cv_file_path for cv_file_path, _, _ in pending]
+        texts = {cv_file_path: text for cv_file_path, _, text in pending if text is not None}
+
+        print(f"Nombre de CVs à traiter : {len(cv_files)} (dont {len(texts)} déjà extraits)")
+        if not cv_files:
+            return
+
+        if ANALYSIS_BATCH_SIZE > 1:
+            process_cv_files_batched(cv_files, journal_file, write_lock, max_workers, extraction_pool,
+                                     vector_store, work_queue, texts,
+                                     is_duplicate=is_near_duplicate if dedup_index is not None else None)
+            return
+
+        # Pipeline asyncio : extraction, embeddings et analyse avancent en parallèle
+        stats = asyncio.run(run_pipeline(
+            cv_files,
+            extract=None,
+            extract_pool=extraction_pool,
+            preprocess=preprocess_text,
+            embed=embedding_service.submit,
+            analyze=analyze_cv,
+            on_result=on_result,
+            extraction_workers=EXTRACTION_WORKERS * EXTRACTION_CHUNK_SIZE,
+            embedding_concurrency=EMBEDDING_CONCURRENCY,
+            llm_concurrency=max_workers,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            texts=texts,
+            tracker=work_queue,
+            is_duplicate=is_near_duplicate if dedup_index is not None else None,
+        ))
+        print(f"Pipeline : {stats['extracted']} extraits, {stats['duplicates']} doublons, {stats['embedded']} encodés, "
+              f"{stats['analyzed']} analysés, {stats['errors']} erreurs en {stats['elapsed']:.1f}s.")
+
+    process_pending()
+
+    if watcher is not None:
+        print(f"Surveillance de {cv_folder} : les nouveaux CV sont traités dès leur arrivée (Ctrl+C pour arrêter).")
+        last_compact = time.monotonic()
+        changed = False
+        try:
+            while True:
+                ready = watcher.wait_ready(timeout=WATCH_COMPACT_INTERVAL)
+                if ready:
+                    # Nouveaux ou modifiés : (re)traités depuis l'extraction
+                    work_queue.requeue(ready)
+                    process_pending()
+                    changed = True
+                if changed and time.monotonic() - last_compact >= WATCH_COMPACT_INTERVAL:
+                    compact_journal(journal_file, output_file)
+                    last_compact = time.monotonic()
+                    changed = False
+        except KeyboardInterrupt:
+            print("Arrêt de la surveillance.")
+        finally:
+            watcher.stop()
+
+    # Lots d'encodage en attente écrits dans les caches avant leur fermeture
+    embedding_service.close()
+    extraction_pool.close()
+    vector_store.close()
+    if chunk_store is not None:
+        chunk_store.close()
+    if dedup_index is not None:
+        dedup_index.close()
+    queue_stats = work_queue.stats()
+    work_queue.close()
+    embedding_cache.close()
+    llm_cache.close()
+    print(f"File : {queue_stats['analyzed']} CV terminés, {queue_stats['duplicate']} doublons, "
+          f"{queue_stats['failed']} en échec.")
+    if extraction_pool.timeouts:
+        print(f"{extraction_pool.timeouts} fichiers abandonnés (extraction > {EXTRACTION_TIMEOUT}s).")
+
+    # Reconstruction du fichier JSON historique à partir du journal
+    count = compact_journal(journal_file, output_file)
+
+    cache_stats = embedding_cache.stats()
+    print(f"Cache d'embeddings : {cache_stats['hits']} succès, {cache_stats['misses']} échecs "
+          f"(taux de succès {cache_stats['hit_rate']:.0%}).")
+    limiter_stats = gemini_limiter.stats()
+    print(f"Appels Gemini : {limiter_stats['successes']} réussis, {limiter_stats['rate_limited']} refusés (429), "
+          f"concurrence finale {limiter_stats['current_limit']}.")
+    llm_stats = llm_cache.stats()
+    print(f"Cache LLM : {llm_stats['hits']} réponses réutilisées, {llm_stats['misses']} absentes du cache.")
 
     print(f"Toutes les tâches de traitement de CV sont terminées.\n"
-          f"Vous pouvez consulter à tout moment le fichier {output_file} pour voir les enregistrements.")
+          f"{count} enregistrements dans {output_file} "
+          f"(journal consultable à tout moment : {journal_file}).")
 
 
 # Point d'entrée
 if __name__ == "__main__":
     cv_folder = 'CVs_telecharges'
     output_file = 'cv2.json'
-    process_all_cvs(cv_folder, output_file)
+    init_services()
+    process_all_cvs(cv_folder, output_file, watch=WATCH)
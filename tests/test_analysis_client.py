@@ -0,0 +1,34 @@
+import json
+
+from analysis_client import CV_BATCH_RESPONSE_SCHEMA, AnalysisClient
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _BatchModel:
+    """
+    Réponse d'un lot conforme au schéma : id et champs d'analyse, sans le texte des CV.
+    """
+    def generate_content(self, prompt):
+        ids = [line.split("id=")[1].rstrip(" =") for line in prompt.splitlines() if line.startswith("=== CV id=")]
+        return _Response(json.dumps([
+            {"id": prompt_id, "candidat": {"nom_prenom": f"Candidat {prompt_id}"}, "cv": {"resume_cv": "..."}}
+            for prompt_id in ids
+        ]))
+
+
+def test_batch_schema_does_not_echo_cv_text():
+    cv_schema = CV_BATCH_RESPONSE_SCHEMA["items"]["properties"]["cv"]
+    assert "cv_text" not in cv_schema["properties"] and "cv_text" not in cv_schema["required"]
+    assert "resume_cv" in cv_schema["required"]
+
+
+def test_analyze_batch_reattaches_cv_text():
+    client = AnalysisClient("modele", {}, model=object(), batch_model=_BatchModel())
+    results = client.analyze_batch([("a.pdf", "texte du cv a"), ("b.pdf", "texte du cv b")])
+    assert results["a.pdf"]["cv"] == {"resume_cv": "...", "cv_text": "texte du cv a"}
+    assert results["b.pdf"]["cv"]["cv_text"] == "texte du cv b"
+    assert "id" not in results["b.pdf"]
@@ -0,0 +1,33 @@
+import numpy as np
+
+from ann_index import CVSearch
+from vector_store import VectorStore
+
+
+def _unit(dim, position):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[position] = 1.0
+    return vector
+
+
+def test_search_serves_replaced_vectors(tmp_path):
+    store = VectorStore(str(tmp_path / "cv.vectors"))
+    for position in range(4):
+        store.add(f"cv{position}.pdf", {"model": _unit(8, position)})
+    search = CVSearch(store)
+    index = search.index("model")
+
+    # CV modifié puis retraité : même ligne, nouveau vecteur
+    store.add("cv1.pdf", {"model": _unit(8, 6)})
+    store.add("cv4.pdf", {"model": _unit(8, 7)})
+    index = search.index("model")
+    assert len(index) == 5
+    scores, rows = index.search_vectors(np.stack([_unit(8, 6), _unit(8, 1), _unit(8, 7)]), k=1)
+    assert store.record_id(rows[0, 0]) == "cv1.pdf" and scores[0, 0] > 0.99
+    assert scores[1, 0] < 0.5  # l'ancien vecteur de cv1 n'est plus servi
+    assert store.record_id(rows[2, 0]) == "cv4.pdf"
+
+    # Index rechargé depuis le disque : déjà à jour
+    reloaded = CVSearch(store).index("model")
+    assert reloaded.generation == store.generation and len(reloaded) == 5
+    store.close()
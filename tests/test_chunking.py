@@ -0,0 +1,106 @@
+import re
+
+import numpy as np
+import pytest
+
+from chunking import Chunker, ChunkStore
+from embedding_cache import EmbeddingCache, text_hash
+from embedding_service import EmbeddingService
+
+
+class _Model:
+    """
+    Un jeton par mot ; vecteur d'un extrait : (numéro de son premier mot, nombre de mots).
+    """
+    max_seq_length = 12  # 10 jetons utiles par extrait
+
+    def __init__(self):
+        self.encoded = []
+
+    def token_offsets(self, text):
+        return [match.span() for match in re.finditer(r"\S+", text)]
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        self.encoded.append(list(texts))
+        return np.array([[int(text.split()[0][1:]), len(text.split())] for text in texts], dtype=np.float32)
+
+
+def _text(count):
+    return " ".join(f"w{index}" for index in range(count))
+
+
+def _window(start, end):
+    return " ".join(f"w{index}" for index in range(start, end + 1))
+
+
+def test_split_windows_overlap():
+    model = _Model()
+    chunker = Chunker(overlap=3)
+    assert chunker.split(model, _text(10)) == [_text(10)]
+    assert chunker.split(model, _text(30)) == [
+        _window(0, 9), _window(7, 16), _window(14, 23), _window(21, 29),
+    ]
+    # Dernière fenêtre pile en fin de texte : pas d'extrait réduit au seul chevauchement
+    assert chunker.split(model, _text(24)) == [_window(0, 9), _window(7, 16), _window(14, 23)]
+
+
+def test_split_max_tokens_and_max_chunks():
+    model = _Model()
+    assert Chunker(overlap=1, max_tokens=6).split(model, _text(10)) == [
+        _window(0, 3), _window(3, 6), _window(6, 9),
+    ]
+    assert Chunker(overlap=3, max_chunks=2).split(model, _text(30)) == [_window(0, 9), _window(7, 16)]
+
+
+def test_encode_pools_chunks_in_one_call():
+    model = _Model()
+    pooled, chunk_vectors = Chunker(overlap=3).encode(model, [_text(30), _text(5)])
+    assert len(model.encoded) == 1 and len(model.encoded[0]) == 5
+    assert chunk_vectors[0].tolist() == [[0, 10], [7, 10], [14, 10], [21, 9]]
+    assert chunk_vectors[1].tolist() == [[0, 5]]
+    assert pooled.tolist() == [[10.5, 9.75], [0, 5]]
+
+    pooled, _ = Chunker(overlap=3, pooling="max").encode(_Model(), [_text(30), _text(5)])
+    assert pooled.tolist() == [[21, 10], [0, 5]]
+
+
+def test_cache_key_follows_chunker_settings():
+    keys = {
+        Chunker().cache_key("model"),
+        Chunker(pooling="max").cache_key("model"),
+        Chunker(overlap=8).cache_key("model"),
+        Chunker(max_tokens=128).cache_key("model"),
+        Chunker(max_chunks=4).cache_key("model"),
+    }
+    assert len(keys) == 5
+    assert "model" not in keys
+    with pytest.raises(ValueError):
+        Chunker(pooling="sum")
+
+
+def test_service_keeps_chunk_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    chunk_store = ChunkStore(str(tmp_path / "chunks"))
+    model = _Model()
+    text = _text(30)
+
+    def encode(chunker, store):
+        service = EmbeddingService({"model": model}, cache=cache, chunker=chunker, chunk_store=store)
+        try:
+            return service.encode(text)["model"].tolist()
+        finally:
+            service.close()
+
+    assert encode(Chunker(overlap=3), None) == [10.5, 9.75]
+    # Vecteur regroupé en cache, mais extraits jamais conservés : encodé à nouveau
+    assert encode(Chunker(overlap=3), chunk_store) == [10.5, 9.75]
+    assert len(model.encoded) == 2
+    assert chunk_store.chunks("model", text_hash(text)).tolist() == [[0, 10], [7, 10], [14, 10], [21, 9]]
+    assert chunk_store.search("model", [21, 9], k=1) == [(text_hash(text), 3, pytest.approx(1.0))]
+
+    # Même texte, même réglage : relu du cache ; autre regroupement : autre clé, encodé à nouveau
+    assert encode(Chunker(overlap=3), chunk_store) == [10.5, 9.75]
+    assert len(model.encoded) == 2
+    assert encode(Chunker(overlap=3, pooling="max"), chunk_store) == [21, 10]
+    assert len(model.encoded) == 3
+    chunk_store.close()
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from dedup import BAND_BITS, BANDS, DEFAULT_MAX_DISTANCE, MIN_WORDS, DedupIndex, _bands, hamming, simhash
+
+
+def test_modified_original_promotes_its_exact_copy(tmp_path):
+    index = DedupIndex(str(tmp_path / "cv.dedup.sqlite"))
+    paths = {}
+    for name, content in [("a.pdf", b"cv"), ("b.pdf", b"cv"), ("c.pdf", b"cv")]:
+        paths[name] = tmp_path / name
+        paths[name].write_bytes(content)
+    assert index.check_file(str(paths["a.pdf"])) is None
+    assert index.check_file(str(paths["b.pdf"])) == "a.pdf"
+    assert index.check_file(str(paths["c.pdf"])) == "a.pdf"
+    assert index.take_promoted() == []
+
+    # L'original est modifié : b.pdf devient l'original de l'ancien contenu, c.pdf lui est relié
+    paths["a.pdf"].write_bytes(b"cv mis a jour")
+    assert index.check_file(str(paths["a.pdf"])) is None
+    assert index.take_promoted() == ["b.pdf"]
+    assert index.take_promoted() == []
+    assert [(name, original) for name, original, _, _ in index.links()] == [("c.pdf", "b.pdf")]
+
+    # b.pdf remis en file n'est plus un doublon ; une nouvelle copie lui est reliée
+    assert index.check_file(str(paths["b.pdf"])) is None
+    copy = tmp_path / "d.pdf"
+    copy.write_bytes(b"cv")
+    assert index.check_file(str(copy)) == "b.pdf"
+    index.close()
+
+
+def _words(seed, count=300):
+    rng = random.Random(seed)
+    return [f"mot{rng.randrange(3000)}" for _ in range(count)]
+
+
+def _edit(words, count, seed):
+    rng = random.Random(seed)
+    edited = list(words)
+    for position in rng.sample(range(len(words)), count):
+        edited[position] = f"autre{rng.randrange(3000)}"
+    return edited
+
+
+def test_simhash_distance_grows_with_edits():
+    words = _words(0)
+    assert simhash(" ".join(words)) == simhash(" ".join(words))
+    assert hamming(simhash(" ".join(words)), simhash(" ".join(_edit(words, 4, 1)))) <= DEFAULT_MAX_DISTANCE
+    assert hamming(simhash(" ".join(words)), simhash(" ".join(_words(1)))) > 2 * DEFAULT_MAX_DISTANCE
+
+
+def test_check_text_links_near_duplicate_only(tmp_path):
+    index = DedupIndex(str(tmp_path / "cv.dedup.sqlite"))
+    words = _words(0)
+    assert index.check_text("a.pdf", " ".join(words)) is None
+    # Même CV, quelques mots changés (réexport, mise à jour mineure)
+    for seed, count in enumerate((2, 4, 8), start=1):
+        match = index.check_text(f"edit{count}.pdf", " ".join(_edit(words, count, seed)))
+        assert match is not None and match[0] == "a.pdf" and match[1] <= DEFAULT_MAX_DISTANCE
+    # CV différent
+    assert index.check_text("b.pdf", " ".join(_words(1))) is None
+    # Texte trop court : jamais comparé ni enregistré
+    short = " ".join(words[:MIN_WORDS - 1])
+    assert index.check_text("court.pdf", short) is None
+    assert index.check_text("court2.pdf", short) is None
+    assert index.stats()["near"] == 3
+    index.close()
+
+
+def test_max_distance_limited_by_bands(tmp_path):
+    with pytest.raises(ValueError):
+        DedupIndex(str(tmp_path / "cv.dedup.sqlite"), max_distance=BANDS)
+    index = DedupIndex(str(tmp_path / "cv.dedup.sqlite"), max_distance=BANDS - 1)
+    words = _words(0)
+    index.check_text("a.pdf", " ".join(words))
+    # Pire cas : un bit différent dans chacune de BANDS - 1 bandes, une seule bande commune
+    value = simhash(" ".join(words))
+    query = value ^ sum(1 << band * BAND_BITS for band in range(BANDS - 1))
+    assert hamming(value, query) == BANDS - 1
+    candidates = {
+        file_name
+        for band, band_value in enumerate(_bands(query))
+        for (file_name,) in index._db.execute(
+            "SELECT file_name FROM bands WHERE band = ? AND value = ?", (band, band_value)
+        )
+    }
+    assert candidates == {"a.pdf"}
+    index.close()
+
+
+def test_bands_rebuilt_for_older_layout(tmp_path):
+    db_file = str(tmp_path / "cv.dedup.sqlite")
+    index = DedupIndex(db_file)
+    index.check_text("a.pdf", " ".join(_words(0)))
+    # Index créé avec 8 bandes de 8 bits
+    index._db.execute("DELETE FROM bands")
+    index._db.execute("INSERT INTO bands (band, value, file_name) VALUES (7, 0, 'a.pdf')")
+    index._db.commit()
+    index.close()
+
+    index = DedupIndex(db_file)
+    assert index._db.execute("SELECT MAX(band), COUNT(*) FROM bands").fetchone() == (BANDS - 1, BANDS)
+    match = index.check_text("b.pdf", " ".join(_edit(_words(0), 2, 1)))
+    assert match is not None and match[0] == "a.pdf"
+    index.close()
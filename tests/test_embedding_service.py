@@ -0,0 +1,35 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+from embedding_service import EmbeddingService
+
+
+class _Model:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        self.calls += 1
+        return np.full((len(texts), 2), self.value, dtype=np.float32)
+
+
+def _encode(cache, model, variant):
+    service = EmbeddingService({"model": model}, cache=cache, variant=variant)
+    try:
+        return service.encode("texte du cv")["model"]
+    finally:
+        service.close()
+
+
+def test_backends_do_not_share_cached_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    torch_model, onnx_model, int8_model = _Model(1.0), _Model(2.0), _Model(3.0)
+
+    assert _encode(cache, torch_model, None)[0] == 1.0
+    assert _encode(cache, onnx_model, "onnx")[0] == 2.0
+    assert _encode(cache, int8_model, "onnx-int8")[0] == 3.0
+    # Chaque backend relit ses propres vecteurs
+    assert _encode(cache, int8_model, "onnx-int8")[0] == 3.0
+    assert _encode(cache, torch_model, None)[0] == 1.0
+    assert (torch_model.calls, onnx_model.calls, int8_model.calls) == (1, 1, 1)
@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+import subprocess
+
+import pytest
+
+from extraction import ExtractionPool
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="mkfifo")
+def test_pool_survives_stuck_file_in_threaded_parent(tmp_path):
+    # Thread actif dans le parent : les processus ne doivent pas en être forkés
+    stop = threading.Event()
+    threading.Thread(target=stop.wait, daemon=True).start()
+
+    # Lecture d'un tube nommé sans écrivain : bloquée jusqu'à ce que le processus soit tué
+    stuck = str(tmp_path / "stuck.pdf")
+    os.mkfifo(stuck)
+    others = []
+    for index in range(5):
+        path = tmp_path / f"cv{index}.txt"
+        path.write_text("cv")
+        others.append(str(path))
+
+    try:
+        with ExtractionPool(workers=2, chunk_size=2, timeout=1) as pool:
+            results = {path: (text, error) for path, text, error in pool.imap([stuck, *others])}
+            assert pool.timeouts == 1
+            # Le pool reste utilisable après le remplacement du processus tué
+            assert pool.submit(others[0]).result(timeout=30) is None
+    finally:
+        stop.set()
+
+    assert isinstance(results[stuck][1], TimeoutError)
+    # Format non pris en charge : texte None, sans erreur
+    assert all(results[path] == (None, None) for path in others)
+
+
+
+MAIN_SCRIPT = """
+import os
+import sys
+
+sys.path.insert(0, {repo!r})
+from extraction import ExtractionPool
+
+with open("imports.log", "a") as f:
+    f.write(f"{{os.getpid()}}\\n")
+
+if __name__ == "__main__":
+    # Mise en place du script (clients, caches, threads) : jamais exécutée par les processus du pool
+    with open("setup.log", "a") as f:
+        f.write(f"{{os.getpid()}}\\n")
+    paths = []
+    for index in range(6):
+        paths.append(f"cv{{index}}.txt")
+        open(paths[-1], "w").close()
+    with ExtractionPool(workers=3, chunk_size=1) as pool:
+        assert all(error is None for _, _, error in pool.imap(paths))
+        print(" ".join(str(worker.process.pid) for worker in pool._workers))
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="forkserver")
+def test_workers_import_main_script_once_without_its_setup(tmp_path):
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = tmp_path / "main_script.py"
+    script.write_text(MAIN_SCRIPT.format(repo=repo))
+    workers = subprocess.run(
+        [sys.executable, str(script)], cwd=tmp_path, capture_output=True, text=True, timeout=120, check=True
+    ).stdout.split()
+
+    setups = (tmp_path / "setup.log").read_text().split()
+    imports = (tmp_path / "imports.log").read_text().split()
+    assert len(setups) == 1 and len(workers) == 3
+    # Un import par le parent et un par processus du pool ; le serveur forkserver ne l'importe pas
+    assert sorted(imports) == sorted([setups[0], *workers])
+
+
+@pytest.mark.parametrize("script", ["test8", "test9"])
+def test_importing_processing_script_creates_nothing(tmp_path, script):
+    # Ce que fait chaque processus d'extraction lancé par le script : l'importer sans le lancer
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys, threading; sys.path.insert(0, {repo!r}); import {script}; "
+                               f"print(threading.active_count(), {script}.embedding_service, {script}.llm_cache)"],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120, check=True,
+    ).stdout.split()
+    assert output == ["1", "None", "None"]
+    assert list(tmp_path.iterdir()) == []  # ni cache LLM, ni cache d'embeddings
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from matcher import CVMatcher, load_results, result_spaces
+from vector_store import VectorStore, default_store_dir
+
+
+MODELS = ["model-a", "model-b"]
+
+
+def _vectors(seed):
+    rng = np.random.default_rng(seed)
+    return {model: rng.random(dim).astype(np.float32) for model, dim in zip(MODELS, (4, 3))}
+
+
+def _record(name, **fields):
+    return dict({"file_name": name, "cv": {"domaine_etude": "informatique", "langues": ["Français"]}}, **fields)
+
+
+@pytest.fixture
+def mixed_results(tmp_path):
+    """
+    Journal de test9 repris d'un ancien cv2.json : 3 CV historiques ("cv_vector" {modèle: liste})
+    puis 2 nouveaux CV dans le dossier de vecteurs ("cv_vector_row").
+    """
+    results_file = str(tmp_path / "cv2.jsonl")
+    expected = {}
+    store = VectorStore(default_store_dir(results_file))
+    with open(results_file, "w", encoding="utf-8") as f:
+        for index, name in enumerate(["old1.pdf", "old2.pdf", "new1.pdf", "old3.pdf", "new2.pdf"]):
+            vectors = _vectors(index)
+            expected[name] = vectors
+            if name.startswith("new"):
+                record = _record(name, cv_vector_row=store.add(name, vectors))
+            else:
+                record = _record(name, cv_vector={model: vector.tolist() for model, vector in vectors.items()})
+            f.write(json.dumps(record) + "\n")
+    store.close()
+    return results_file, expected
+
+
+def test_load_results_mixed_file_keeps_every_cv(mixed_results):
+    results_file, expected = mixed_results
+    records, matrices = load_results(results_file)
+    assert [record["file_name"] for record in records] == list(expected)
+    for row, name in enumerate(expected):
+        np.testing.assert_allclose(matrices[None][row], np.concatenate([expected[name][m] for m in MODELS]))
+
+
+def test_load_results_mixed_file_per_model(mixed_results):
+    results_file, expected = mixed_results
+    records, matrices = load_results(results_file, MODELS)
+    assert len(records) == 5
+    for model in MODELS:
+        np.testing.assert_allclose(matrices[model], np.vstack([expected[name][model] for name in expected]))
+
+
+def test_result_spaces_without_vector_store(tmp_path):
+    results_file = str(tmp_path / "cvs.json")
+    with open(results_file, "w", encoding="utf-8") as f:
+        json.dump([_record("a.pdf", cv_vector={model: [0.1, 0.2] for model in MODELS})], f)
+    assert result_spaces(results_file) == MODELS
+
+
+def test_from_results_builds_encoder_for_legacy_file(tmp_path):
+    results_file = str(tmp_path / "cvs.json")
+    with open(results_file, "w", encoding="utf-8") as f:
+        json.dump([_record("a.pdf", cv_vector={model: [0.1, 0.2] for model in MODELS})], f)
+    assert CVMatcher.from_results(results_file).encode is not None
+    assert CVMatcher.from_results(results_file, model="model-a").encode is not None
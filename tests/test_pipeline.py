@@ -0,0 +1,63 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from pipeline import run_pipeline
+
+
+class _Tracker:
+    def __init__(self):
+        self.threads = set()
+        self.states = {}
+
+    def _mark(self, path, state):
+        self.threads.add(threading.get_ident())
+        self.states[path] = state
+
+    def mark_extracted(self, path, text):
+        self._mark(path, "extracted")
+
+    def mark_embedded(self, path):
+        self._mark(path, "embedded")
+
+    def mark_failed(self, path, stage, error=None):
+        self._mark(path, "failed")
+
+
+def _embed(text):
+    future = Future()
+    future.set_result([len(text)])
+    return future
+
+
+def test_bookkeeping_runs_off_the_event_loop():
+    tracker = _Tracker()
+    threads = set()
+    results = {}
+
+    def preprocess(text):
+        threads.add(threading.get_ident())
+        return text.lower()
+
+    def is_duplicate(path, text):
+        threads.add(threading.get_ident())
+        return path == "copie.pdf"
+
+    async def main():
+        loop_thread = threading.get_ident()
+        stats = await run_pipeline(
+            ["a.pdf", "copie.pdf", "vide.pdf", "b.pdf"],
+            extract=lambda path: None if path == "vide.pdf" else f"CV {path}",
+            embed=_embed,
+            analyze=lambda text: {"texte": text},
+            on_result=lambda path, vectors, analysis: results.__setitem__(path, analysis),
+            extraction_workers=2, embedding_concurrency=2, llm_concurrency=2,
+            preprocess=preprocess, tracker=tracker, is_duplicate=is_duplicate,
+        )
+        return loop_thread, stats
+
+    loop_thread, stats = asyncio.run(main())
+    assert loop_thread not in threads | tracker.threads
+    assert stats["analyzed"] == 2 and stats["duplicates"] == 1
+    assert results["a.pdf"] == {"texte": "cv a.pdf"}
+    assert tracker.states == {"a.pdf": "embedded", "b.pdf": "embedded", "vide.pdf": "failed"}
@@ -0,0 +1,89 @@
+import json
+from threading import Lock
+
+from result_journal import (
+    append_result,
+    compact_journal,
+    default_journal_path,
+    init_journal,
+    load_processed_files,
+)
+
+
+def _entry(name, resume, vector=None):
+    return {"file_name": name, "cv_vector": vector or [0.5, 1.0], "cv": {"resume_cv": resume}}
+
+
+def test_default_journal_path():
+    assert default_journal_path("out/cv2.json") == "out/cv2.jsonl"
+
+
+def test_partial_last_line_is_dropped_on_restart(tmp_path):
+    journal_file = str(tmp_path / "cv2.jsonl")
+    init_journal(journal_file)
+    lock = Lock()
+    append_result(journal_file, _entry("a.pdf", "a"), lock)
+    append_result(journal_file, _entry("b.pdf", "b"), lock)
+    # Arrêt brutal au milieu de l'écriture du troisième CV
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_entry("c.pdf", "c"))[:25])
+
+    init_journal(journal_file)
+    append_result(journal_file, _entry("d.pdf", "d"), lock)
+    with open(journal_file, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["file_name"] for line in lines] == ["a.pdf", "b.pdf", "d.pdf"]
+
+
+def test_partial_only_line_is_dropped(tmp_path):
+    journal_file = tmp_path / "cv2.jsonl"
+    journal_file.write_text('{"file_name": "a.p')
+    init_journal(str(journal_file))
+    assert journal_file.read_text() == ""
+
+
+def test_legacy_array_imported_once(tmp_path):
+    legacy_file = str(tmp_path / "cv2.json")
+    journal_file = str(tmp_path / "cv2.jsonl")
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump([_entry("a.pdf", "a"), _entry("b.pdf", "b")], f, indent=4)
+
+    init_journal(journal_file, legacy_file=legacy_file)
+    assert load_processed_files(journal_file) == {"a.pdf", "b.pdf"}
+    # Journal déjà créé : le tableau historique n'est pas repris une seconde fois
+    append_result(journal_file, _entry("c.pdf", "c"), Lock())
+    init_journal(journal_file, legacy_file=legacy_file)
+    with open(journal_file, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 3
+
+
+def test_invalid_legacy_file_gives_empty_journal(tmp_path):
+    legacy_file = tmp_path / "cv2.json"
+    legacy_file.write_text('[{"file_name": "a.pdf"}, {"file_na')
+    journal_file = str(tmp_path / "cv2.jsonl")
+    init_journal(journal_file, legacy_file=str(legacy_file))
+    assert load_processed_files(journal_file) == set()
+
+
+def test_compact_keeps_latest_entry_per_file(tmp_path):
+    legacy_file = str(tmp_path / "cv2.json")
+    journal_file = str(tmp_path / "cv2.jsonl")
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump([_entry("a.pdf", "a v1"), _entry("b.pdf", "b")], f)
+    init_journal(journal_file, legacy_file=legacy_file)
+
+    lock = Lock()
+    append_result(journal_file, _entry("c.pdf", "c"), lock)
+    # a.pdf modifié puis retraité, et ligne tronquée d'un CV en cours lors de l'arrêt
+    append_result(journal_file, _entry("a.pdf", "a v2", [2.0, 3.0]), lock)
+    with open(journal_file, "a", encoding="utf-8") as f:
+        f.write('{"file_name": "d.pdf", "cv"')
+    init_journal(journal_file, legacy_file=legacy_file)
+
+    assert compact_journal(journal_file, legacy_file) == 3
+    with open(legacy_file, encoding="utf-8") as f:
+        compacted = json.load(f)
+    assert [(entry["file_name"], entry["cv"]["resume_cv"]) for entry in compacted] == [
+        ("b.pdf", "b"), ("c.pdf", "c"), ("a.pdf", "a v2"),
+    ]
+    assert compacted[2]["cv_vector"] == [2.0, 3.0]
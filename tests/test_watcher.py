@@ -0,0 +1,64 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from watcher import CVWatcher
+
+DEBOUNCE = 0.5
+
+
+def _event(event_type, path, is_directory=False, dest_path=None):
+    return SimpleNamespace(event_type=event_type, src_path=path, dest_path=dest_path, is_directory=is_directory)
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    # Sans observateur watchdog : les événements sont passés directement à dispatch()
+    watcher = CVWatcher(str(tmp_path), debounce=DEBOUNCE)
+    watcher._thread = threading.Thread(target=watcher._settle, daemon=True)
+    watcher._thread.start()
+    yield watcher
+    watcher.stop()
+
+
+def test_file_ready_once_stable(tmp_path, watcher):
+    path = str(tmp_path / "cv.pdf")
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    start = time.monotonic()
+    watcher.dispatch(_event("created", path))
+    watcher.dispatch(_event("modified", path))
+
+    # Copie encore en cours à mi-délai, sans nouvel événement : la taille a changé à l'échéance
+    time.sleep(DEBOUNCE / 2)
+    with open(path, "ab") as f:
+        f.write(b" suite du fichier")
+    assert watcher.wait_ready(timeout=DEBOUNCE / 4) == []
+
+    assert watcher.wait_ready(timeout=10) == [path]
+    # Rendu au second contrôle seulement, un délai complet après la première échéance
+    assert time.monotonic() - start >= 2 * DEBOUNCE
+    assert watcher.wait_ready(timeout=DEBOUNCE * 2) == []
+
+
+def test_moved_file_is_ready_under_its_new_name(tmp_path, watcher):
+    path = tmp_path / "cv.docx"
+    path.write_bytes(b"docx")
+    watcher.dispatch(_event("moved", str(tmp_path / "cv.docx.part"), dest_path=str(path)))
+    assert watcher.wait_ready(timeout=10) == [str(path)]
+
+
+def test_ignored_and_deleted_files(tmp_path, watcher):
+    for name in ("~$cv.docx", ".cv.pdf", "cv.txt", "removed.pdf"):
+        (tmp_path / name).write_bytes(b"cv")
+        watcher.dispatch(_event("created", str(tmp_path / name)))
+    watcher.dispatch(_event("created", str(tmp_path / "dossier.pdf"), is_directory=True))
+    watcher.dispatch(_event("deleted", str(tmp_path / "cv.pdf")))
+    assert list(watcher._pending) == [str(tmp_path / "removed.pdf")]
+
+    # Supprimé avant la fin du délai : jamais rendu
+    (tmp_path / "removed.pdf").unlink()
+    assert watcher.wait_ready(timeout=DEBOUNCE * 2) == []
+    assert watcher._pending == {}
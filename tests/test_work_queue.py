@@ -0,0 +1,96 @@
+from work_queue import WorkQueue, default_queue_path
+
+
+def _queue(tmp_path, max_attempts=3):
+    return WorkQueue(str(tmp_path / "cv2.queue.sqlite"), max_attempts=max_attempts)
+
+
+def test_default_queue_path():
+    assert default_queue_path("out/cv2.json") == "out/cv2.queue.sqlite"
+
+
+def test_add_keeps_known_files(tmp_path):
+    queue = _queue(tmp_path)
+    assert queue.is_empty()
+    assert queue.add(["cvs/a.pdf", "cvs/b.pdf"]) == 2
+    queue.mark_analyzed("cvs/a.pdf")
+    assert queue.add(["cvs/a.pdf", "cvs/b.pdf", "cvs/c.pdf"]) == 1
+    assert queue.stats()["analyzed"] == 1 and queue.stats()["pending"] == 2
+    queue.close()
+
+
+def test_resume_from_each_stage_after_restart(tmp_path):
+    queue = _queue(tmp_path)
+    queue.add(["cvs/a.pdf", "cvs/b.pdf", "cvs/c.pdf", "cvs/d.pdf", "cvs/e.pdf"])
+    queue.mark_extracted("cvs/b.pdf", "texte b")
+    queue.mark_extracted("cvs/c.pdf", "texte c")
+    queue.mark_embedded("cvs/c.pdf")
+    queue.mark_extracted("cvs/d.pdf", "texte d")
+    queue.mark_analyzed("cvs/d.pdf")
+    queue.mark_duplicate("cvs/e.pdf")
+    queue.close()
+
+    # Arrêt brutal puis nouveau passage : chaque CV reprend à l'étape atteinte
+    queue = _queue(tmp_path)
+    assert queue.pending() == [
+        ("cvs/a.pdf", "pending", None),
+        ("cvs/b.pdf", "extracted", "texte b"),
+        ("cvs/c.pdf", "embedded", "texte c"),  # texte gardé jusqu'à l'analyse
+    ]
+    assert queue.stats() == {
+        "pending": 1, "extracted": 1, "embedded": 1, "analyzed": 1, "failed": 0, "duplicate": 1,
+    }
+    queue.close()
+
+
+def test_failures_count_against_max_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2)
+    queue.add(["cvs/a.pdf", "cvs/b.pdf"])
+    queue.mark_extracted("cvs/a.pdf", "texte a")
+    queue.mark_failed("cvs/a.pdf", "embeddings", RuntimeError("boom"))
+    queue.mark_failed("cvs/b.pdf", "extraction", "format non pris en charge")
+
+    # Un échec : retenté, avec le texte déjà extrait
+    assert queue.pending() == [("cvs/a.pdf", "failed", "texte a"), ("cvs/b.pdf", "failed", None)]
+    assert queue.failures() == []
+
+    # max_attempts échecs : abandonné, listé dans failures()
+    queue.mark_failed("cvs/a.pdf", "analyse", "analyse échouée")
+    assert queue.pending() == [("cvs/b.pdf", "failed", None)]
+    assert queue.failures() == [("a.pdf", 2, "analyse", "analyse échouée")]
+
+    # retry_failed : compteur remis à zéro, de nouveau en file
+    assert queue.retry_failed() == 2
+    assert queue.failures() == []
+    assert [path for path, _, _ in queue.pending()] == ["cvs/a.pdf", "cvs/b.pdf"]
+    queue.close()
+
+
+def test_requeue_clears_text_and_attempts(tmp_path):
+    queue = _queue(tmp_path, max_attempts=1)
+    queue.add(["cvs/a.pdf", "cvs/b.pdf"])
+    queue.mark_extracted("cvs/a.pdf", "ancien texte")
+    queue.mark_failed("cvs/a.pdf", "embeddings", "boom")
+    queue.mark_analyzed("cvs/b.pdf")
+    assert queue.pending() == []
+
+    # Fichiers modifiés (ou nouveau) : de nouveau pending, depuis l'extraction
+    queue.requeue(["cvs/a.pdf", "cvs/b.pdf", "cvs/c.pdf"])
+    assert queue.pending() == [
+        ("cvs/a.pdf", "pending", None),
+        ("cvs/b.pdf", "pending", None),
+        ("cvs/c.pdf", "pending", None),
+    ]
+    assert queue.failures() == []
+    queue.close()
+
+
+def test_mark_analyzed_names_seeds_from_journal(tmp_path):
+    queue = _queue(tmp_path)
+    # CV déjà présents dans les résultats d'un ancien passage
+    queue.mark_analyzed_names(["a.pdf", "b.pdf"])
+    assert not queue.is_empty()
+    assert queue.add(["cvs/a.pdf", "cvs/b.pdf", "cvs/c.pdf"]) == 1
+    assert queue.pending() == [("cvs/c.pdf", "pending", None)]
+    assert queue.stats()["analyzed"] == 2
+    queue.close()
@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import sqlite3
+import argparse
+from threading import Lock
+
+import numpy as np
+
+from json_stream import iter_records, write_json_array
+
+
+# Stockage binaire des vecteurs de CV, à côté du fichier de résultats (cv2.json -> cv2.vectors/).
+# Un vecteur en liste JSON coûte ~20 caractères par flottant et doit être reconverti à chaque
+# lecture ; ici chaque espace (un par modèle d'embedding) est une matrice float32 (ou float16)
+# brute, lue par np.memmap sans copie. Toutes les matrices partagent le même numéro de ligne :
+# un résultat ne contient plus que "cv_vector_row" (+ l'index SQLite identifiant -> ligne).
+# Les lignes sont ajoutées en fin de fichier ; une ligne écrite mais non indexée (arrêt brutal)
+# est retirée à l'ouverture suivante. Chaque ajout ou remplacement reçoit un numéro de génération
+# croissant : un index dérivé (ann_index.py) retrouve les lignes modifiées depuis sa dernière mise à jour.
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def default_store_dir(results_file):
+    """
+    Dossier des vecteurs associé à un fichier de résultats : cv2.json -> cv2.vectors
+    """
+    return os.path.splitext(results_file)[0] + ".vectors"
+
+
+class VectorStore:
+    def __init__(self, store_dir, dtype="float32"):
+        """
+        dtype : "float32" ou "float16" (moitié moins de place, ~3 décimales significatives).
+        Le type d'un dossier existant est conservé.
+        """
+        self.store_dir = store_dir
+        self._lock = Lock()
+        self._matrices = {}
+
+        os.makedirs(store_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(store_dir, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS spaces (
+                name TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                position INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE,
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Dossiers créés avant le suivi des générations
+        columns = [column[1] for column in self._db.execute("PRAGMA table_info(records)").fetchall()]
+        if "generation" not in columns:
+            self._db.execute("ALTER TABLE records ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS records_generation ON records (generation)")
+        stored = self._db.execute("SELECT value FROM meta WHERE key = 'dtype'").fetchone()
+        if stored is None:
+            if dtype not in DTYPES:
+                raise ValueError(f"dtype non pris en charge : {dtype} (choix : {', '.join(DTYPES)})")
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('dtype', ?)", (dtype,))
+            stored = (dtype,)
+        self._db.commit()
+        self.dtype = DTYPES[stored[0]]
+
+        self._spaces = [
+            (name, dim) for name, dim in
+            self._db.execute("SELECT name, dim FROM spaces ORDER BY position").fetchall()
+        ]
+        self._rows = self._db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        self._truncate_unindexed()
+
+    @property
+    def spaces(self):
+        """
+        Noms des espaces (modèles), dans l'ordre de concaténation.
+        """
+        return [name for name, _ in self._spaces]
+
+    def __len__(self):
+        return self._rows
+
+    def _path(self, space):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", space)
+        extension = "f16" if self.dtype == np.float16 else "f32"
+        return os.path.join(self.store_dir, f"{safe_name}.{extension}")
+
+    def _row_bytes(self, dim):
+        return dim * np.dtype(self.dtype).itemsize
+
+    def _truncate_unindexed(self):
+        for space, dim in self._spaces:
+            path = self._path(space)
+            expected = self._rows * self._row_bytes(dim)
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+
+    def add(self, record_id, vectors, sync=True):
+        """
+        Enregistre les vecteurs {espace: vecteur} d'un résultat ; renvoie son numéro de ligne.
+        Un identifiant déjà présent garde sa ligne (vecteurs remplacés).
+        sync=False : pas de fsync par ligne (import en masse, suivi de flush()).
+        """
+        with self._lock:
+            if not self._spaces:
+                for position, (space, vector) in enumerate(vectors.items()):
+                    dim = int(np.asarray(vector).shape[-1])
+                    self._db.execute(
+                        "INSERT INTO spaces (name, dim, position) VALUES (?, ?, ?)", (space, dim, position)
+                    )
+                    self._spaces.append((space, dim))
+            if set(vectors) != set(self.spaces):
+                raise ValueError(f"espaces attendus : {self.spaces}, reçus : {list(vectors)}")
+
+            existing = self._db.execute("SELECT row FROM records WHERE id = ?", (record_id,)).fetchone()
+            row = existing[0] if existing else self._rows
+            for space, dim in self._spaces:
+                data = np.asarray(vectors[space], dtype=self.dtype).reshape(-1)
+                if data.shape[0] != dim:
+                    raise ValueError(f"dimension {data.shape[0]} au lieu de {dim} pour l'espace {space}")
+                with open(self._path(space), "r+b" if os.path.exists(self._path(space)) else "wb") as f:
+                    f.seek(row * self._row_bytes(dim))
+                    f.write(data.tobytes())
+                    if sync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            # Index mis à jour après l'écriture des vecteurs
+            generation = self._db.execute("SELECT COALESCE(MAX(generation), 0) + 1 FROM records").fetchone()[0]
+            if existing:
+                self._db.execute("UPDATE records SET generation = ? WHERE id = ?", (generation, record_id))
+            else:
+                self._db.execute(
+                    "INSERT INTO records (id, row, generation) VALUES (?, ?, ?)", (record_id, row, generation)
+                )
+                self._rows += 1
+            self._db.commit()
+            return row
+
+    def flush(self):
+        """
+        Force l'écriture sur disque des matrices (après des add(..., sync=False)).
+        """
+        with self._lock:
+            for space, _ in self._spaces:
+                with open(self._path(space), "r+b") as f:
+                    os.fsync(f.fileno())
+
+    @property
+    def generation(self):
+        """
+        Génération du dernier ajout ou remplacement (lue dans l'index : à jour même si un autre
+        processus écrit dans le dossier).
+        """
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(generation), 0) FROM records").fetchone()[0]
+
+    def rows_changed_since(self, generation):
+        """
+        Lignes ajoutées ou remplacées après la génération donnée.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT row FROM records WHERE generation > ?", (generation,)).fetchall()
+        return np.array([row for row, in rows], dtype=np.int64)
+
+    def row_of(self, record_id):
+        with self._lock:
+            row = self._db.execute("SELECT row FROM records WHERE id = ?", (record_id,)).fetchone()
+        return row[0] if row else None
+
+    def record_id(self, row):
+        """
+        Identifiant (file_name) enregistré à une ligne, ou None.
+        """
+        with self._lock:
+            record = self._db.execute("SELECT id FROM records WHERE row = ?", (int(row),)).fetchone()
+        return record[0] if record else None
+
+    def matrix(self, space):
+        """
+        Matrice (lignes x dim) d'un espace, mémoire-mappée en lecture seule (aucune copie).
+        """
+        with self._lock:
+            matrix = self._matrices.get(space)
+            if matrix is None or matrix.shape[0] != self._rows:
+                dim = dict(self._spaces)[space]
+                if self._rows == 0:
+                    return np.empty((0, dim), dtype=self.dtype)
+                matrix = np.memmap(self._path(space), dtype=self.dtype, mode="r", shape=(self._rows, dim))
+                self._matrices[space] = matrix
+            return matrix
+
+    def get(self, row, space=None):
+        """
+        Vecteur d'une ligne : vue sur la matrice d'un espace, ou concaténation de tous les espaces.
+        """
+        if space is not None:
+            return self.matrix(space)[row]
+        return np.concatenate([self.matrix(name)[row] for name in self.spaces])
+
+    def close(self):
+        with self._lock:
+            self._matrices.clear()
+            self._db.close()
+
+
+def load_vector(record, vector_store=None, space=None):
+    """
+    Vecteur d'un résultat, quel que soit son format :
+    - "cv_vector_row" : lu dans vector_store (tous les espaces concaténés, ou un seul) ;
+    - "cv_vector" historique : liste de flottants, ou {modèle: liste} concaténé dans l'ordre.
+    Renvoie None si le résultat n'a pas de vecteur.
+    """
+    row = record.get("cv_vector_row")
+    if row is not None:
+        if vector_store is None:
+            raise ValueError("cv_vector_row présent mais aucun dossier de vecteurs fourni")
+        return vector_store.get(row, space)
+
+    vector = record.get("cv_vector")
+    if isinstance(vector, dict):
+        if space is not None:
+            return np.asarray(vector[space], dtype=np.float32) if space in vector else None
+        vector = [x for values in vector.values() for x in values]
+    if not vector:
+        return None
+    return np.asarray(vector, dtype=np.float32)
+
+
+def open_store_for(results_file, dtype="float32"):
+    """
+    Ouvre le dossier de vecteurs d'un fichier de résultats s'il existe, sinon None.
+    """
+    store_dir = default_store_dir(results_file)
+    return VectorStore(store_dir, dtype=dtype) if os.path.isdir(store_dir) else None
+
+
+def externalize_vectors(results_file, output_file=None, dtype="float32"):
+    """
+    Déplace les "cv_vector" d'un fichier de résultats vers son dossier de vecteurs
+    et les remplace par "cv_vector_row". Renvoie le nombre de vecteurs déplacés.
+    """
+    output_file = output_file or results_file
+    vector_store = VectorStore(default_store_dir(output_file), dtype=dtype)
+    moved = 0
+
+    def records():
+        nonlocal moved
+        for record in iter_records(results_file):
+            vector = record.pop("cv_vector", None)
+            if vector:
+                vectors = vector if isinstance(vector, dict) else {"cv_vector": vector}
+                record["cv_vector_row"] = vector_store.add(
+                    record.get("file_name", str(moved)), vectors, sync=False
+                )
+                moved += 1
+            yield record
+
+    try:
+        if results_file.endswith(".jsonl"):
+            tmp_file = output_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                for record in records():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, output_file)
+        else:
+            write_json_array(output_file, records())
+        vector_store.flush()
+    finally:
+        vector_store.close()
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Déplace les vecteurs d'un fichier de résultats vers un stockage binaire mémoire-mappé."
+    )
+    parser.add_argument("results_file", help="Fichier de résultats (tableau JSON ou JSONL)")
+    parser.add_argument("output_file", nargs="?", help="Fichier réécrit (par défaut : results_file)")
+    parser.add_argument("--dtype", choices=sorted(DTYPES), default="float32")
+    args = parser.parse_args()
+
+    before = os.path.getsize(args.results_file)
+    count = externalize_vectors(args.results_file, args.output_file, dtype=args.dtype)
+    output_file = args.output_file or args.results_file
+    print(f"{count} vecteurs déplacés vers {default_store_dir(output_file)} ; "
+          f"{output_file} : {before / 2**20:.1f} Mo -> {os.path.getsize(output_file) / 2**20:.1f} Mo")
@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+
+
+# Surveillance d'un dossier de CV (mode démon) : les PDF/DOCX créés, modifiés ou déplacés dans le
+# dossier sont signalés dès que leur écriture est terminée.
+# - watchdog (inotify sous Linux) : aucun parcours du dossier, aucun réveil tant que rien n'arrive ;
+#   polling=True utilise l'observateur par scrutation (partages réseau, où inotify ne voit rien).
+# - Anti-rebond : un fichier n'est prêt qu'après debounce secondes sans nouvel événement, et si sa
+#   taille et sa date de modification n'ont pas changé depuis (copie ou téléchargement en cours).
+# - wait_ready() bloque jusqu'au prochain lot de fichiers prêts : les fichiers arrivés ensemble
+#   sont traités ensemble.
+
+DEFAULT_DEBOUNCE = 2.0
+CV_EXTENSIONS = (".pdf", ".docx")
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class CVWatcher:
+    def __init__(self, folder, debounce=DEFAULT_DEBOUNCE, extensions=CV_EXTENSIONS, polling=False):
+        self.folder = folder
+        self.debounce = debounce
+        self.extensions = extensions
+        self.polling = polling
+        self._pending = {}  # chemin -> (échéance, taille et date de modification)
+        self._ready = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def _accept(self, path):
+        name = os.path.basename(path)
+        # Fichiers verrous de Word (~$cv.docx) et fichiers cachés / temporaires
+        return name.endswith(self.extensions) and not name.startswith(("~$", "."))
+
+    def dispatch(self, event):
+        """
+        Appelé par l'observateur watchdog (dans sa thread) pour chaque événement du dossier.
+        """
+        if event.is_directory or event.event_type in ("deleted", "opened"):
+            return
+        path = getattr(event, "dest_path", None) if event.event_type == "moved" else event.src_path
+        if not path or not self._accept(path):
+            return
+        with self._condition:
+            self._pending[path] = (time.monotonic() + self.debounce, _signature(path))
+            self._condition.notify_all()
+
+    def _settle(self):
+        """
+        Thread d'anti-rebond : dort jusqu'à la prochaine échéance (indéfiniment si rien n'est en attente).
+        """
+        with self._condition:
+            while not self._stop.is_set():
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                deadline = min(due for due, _ in self._pending.values())
+                if deadline > now:
+                    self._condition.wait(deadline - now)
+                    continue
+                for path, (due, signature) in list(self._pending.items()):
+                    if due > now:
+                        continue
+                    current = _signature(path)
+                    if current is None:
+                        del self._pending[path]  # supprimé ou déplacé entre-temps
+                    elif current != signature:
+                        self._pending[path] = (now + self.debounce, current)  # écriture en cours
+                    else:
+                        del self._pending[path]
+                        self._ready.append(path)
+                if self._ready:
+                    self._condition.notify_all()
+
+    def start(self):
+        # Import différé : watchdog n'est nécessaire qu'en mode surveillance
+        if self.polling:
+            from watchdog.observers.polling import PollingObserver as Observer
+        else:
+            from watchdog.observers import Observer
+
+        self._observer = Observer()
+        self._observer.schedule(self, self.folder, recursive=False)
+        self._observer.start()
+        self._thread = threading.Thread(target=self._settle, name="cv-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """
+        Bloque jusqu'à ce qu'au moins un fichier soit prêt ; renvoie la liste des fichiers prêts
+        (vide si timeout expire ou si le watcher est arrêté).
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._ready or self._stop.is_set(), timeout)
+            ready, self._ready = self._ready, []
+        # Un fichier signalé plusieurs fois (création puis modification) n'est rendu qu'une fois
+        return list(dict.fromkeys(ready))
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
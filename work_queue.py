@@ -0,0 +1,216 @@
+import os
+import time
+import sqlite3
+import argparse
+from threading import Lock
+
+
+# File de travail persistante (SQLite en mode WAL) : l'état de chaque CV est enregistré à chaque étape.
+#   pending -> extracted -> embedded -> analyzed, ou failed (avec le nombre de tentatives),
+#   ou duplicate (doublon d'un CV déjà connu, voir dedup.py : terminé sans traitement).
+# - Reprise : un CV déjà extrait repart avec son texte prétraité (pas de nouvelle extraction) ;
+#   ses vecteurs sont resservis par le cache d'embeddings. Seuls les CV "analyzed" sont terminés.
+# - Un CV en échec est retenté aux passages suivants, jusqu'à max_attempts échecs ; il est ensuite
+#   ignoré (retry_failed() ou --retry-failed le remet en file).
+# - Les CV restants sont lus par requête sur l'index d'état : ni relecture du journal de résultats,
+#   ni parcours de tous les fichiers déjà traités.
+
+STATES = ("pending", "extracted", "embedded", "analyzed", "failed", "duplicate")
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def default_queue_path(output_file):
+    """
+    Chemin de la file associée à un fichier de sortie : cv2.json -> cv2.queue.sqlite
+    """
+    return os.path.splitext(output_file)[0] + ".queue.sqlite"
+
+
+class WorkQueue:
+    def __init__(self, db_file, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        max_attempts : nombre d'échecs au-delà duquel un CV n'est plus retenté.
+        """
+        self.db_file = db_file
+        self.max_attempts = max_attempts
+        self._lock = Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # En WAL, synchronous=NORMAL garde la base cohérente après un arrêt brutal
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                file_name TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                stage TEXT,
+                last_error TEXT,
+                text TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_state ON files (state)")
+        self._db.commit()
+
+    def is_empty(self):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def add(self, paths, state="pending"):
+        """
+        Ajoute les fichiers inconnus de la file (les autres gardent leur état).
+        Renvoie le nombre de fichiers ajoutés.
+        """
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO files (file_name, path, state, updated_at) VALUES (?, ?, ?, ?)",
+                ((os.path.basename(path), path, state, now) for path in paths),
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def requeue(self, paths):
+        """
+        Remet des fichiers nouveaux ou modifiés à l'état pending, quel que soit leur état
+        (texte extrait et compteur d'échecs effacés).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO files (file_name, path, state, updated_at) VALUES (?, ?, 'pending', ?)
+                ON CONFLICT (file_name) DO UPDATE SET path = excluded.path, state = 'pending', attempts = 0,
+                stage = NULL, last_error = NULL, text = NULL, updated_at = excluded.updated_at
+                """,
+                ((os.path.basename(path), path, now) for path in paths),
+            )
+            self._db.commit()
+
+    def mark_analyzed_names(self, file_names):
+        """
+        Enregistre comme terminés des CV déjà présents dans les résultats (reprise d'un ancien journal).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO files (file_name, path, state, updated_at) VALUES (?, ?, 'analyzed', ?)
+                ON CONFLICT (file_name) DO UPDATE SET state = 'analyzed', text = NULL, updated_at = excluded.updated_at
+                """,
+                ((file_name, file_name, now) for file_name in file_names),
+            )
+            self._db.commit()
+
+    def _set(self, path, state, text=None, keep_text=True):
+        with self._lock:
+            self._db.execute(
+                f"UPDATE files SET state = ?, text = {'COALESCE(?, text)' if keep_text else '?'}, "
+                "updated_at = ? WHERE file_name = ?",
+                (state, text, time.time(), os.path.basename(path)),
+            )
+            self._db.commit()
+
+    def mark_extracted(self, path, text):
+        """
+        Texte prétraité conservé jusqu'à l'analyse : une reprise n'a pas à refaire l'extraction.
+        """
+        self._set(path, "extracted", text)
+
+    def mark_embedded(self, path):
+        self._set(path, "embedded")
+
+    def mark_analyzed(self, path):
+        # Le résultat est dans le journal : le texte n'est plus utile
+        self._set(path, "analyzed", keep_text=False)
+
+    def mark_duplicate(self, path):
+        # Le lien vers l'original est dans l'index des doublons
+        self._set(path, "duplicate", keep_text=False)
+
+    def mark_failed(self, path, stage, error=None):
+        """
+        Compte un échec à l'étape stage ("extraction", "embeddings", "analyse"...).
+        Le texte déjà extrait est gardé pour la tentative suivante.
+        """
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE files SET state = 'failed', attempts = attempts + 1, stage = ?, last_error = ?,
+                updated_at = ? WHERE file_name = ?
+                """,
+                (stage, str(error) if error is not None else None, time.time(), os.path.basename(path)),
+            )
+            self._db.commit()
+
+    def pending(self):
+        """
+        CV à (re)traiter : [(chemin, état, texte prétraité ou None)]. Les CV en échec
+        max_attempts fois sont exclus.
+        """
+        with self._lock:
+            return self._db.execute(
+                """
+                SELECT path, state, text FROM files
+                WHERE state IN ('pending', 'extracted', 'embedded')
+                   OR (state = 'failed' AND attempts < ?)
+                ORDER BY file_name
+                """,
+                (self.max_attempts,),
+            ).fetchall()
+
+    def retry_failed(self):
+        """
+        Remet les CV abandonnés en file (compteur d'échecs remis à zéro). Renvoie leur nombre.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE files SET attempts = 0, updated_at = ? WHERE state = 'failed'", (time.time(),)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def failures(self):
+        """
+        CV abandonnés : [(nom, tentatives, étape, dernière erreur)].
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT file_name, attempts, stage, last_error FROM files "
+                "WHERE state = 'failed' AND attempts >= ? ORDER BY file_name",
+                (self.max_attempts,),
+            ).fetchall()
+
+    def stats(self):
+        """
+        Nombre de CV par état.
+        """
+        with self._lock:
+            counts = dict(self._db.execute("SELECT state, COUNT(*) FROM files GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="État de la file de traitement des CV.")
+    parser.add_argument("db_file", help="Fichier SQLite de la file (ex. cv2.queue.sqlite)")
+    parser.add_argument("--retry-failed", action="store_true", help="Remet en file les CV abandonnés")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_file):
+        print(f"Erreur: la file {args.db_file} n'existe pas.")
+        exit()
+
+    queue = WorkQueue(args.db_file, max_attempts=args.max_attempts)
+    print(", ".join(f"{state} : {count}" for state, count in queue.stats().items()))
+    for file_name, attempts, stage, last_error in queue.failures():
+        print(f"  {file_name} : {attempts} échecs ({stage}) {last_error or ''}")
+    if args.retry_failed:
+        print(f"{queue.retry_failed()} CV remis en file.")
+    queue.close()